@@ -0,0 +1,226 @@
+import math
+import time
+import array
+import struct
+import logging
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import Optional
+
+try:
+    import audioop  # Fast C RMS, removed from the stdlib in Python 3.13
+except ImportError:
+    audioop = None
+
+logger = logging.getLogger(__name__)
+
+# Ring header: write sequence number (int64)
+_SEQ_FORMAT = 'q'
+_SEQ_SIZE = struct.calcsize(_SEQ_FORMAT)
+
+
+def chunk_rms(data, sample_width: int = 2) -> float:
+    """RMS level of a chunk of signed 16-bit PCM."""
+    if audioop is not None:
+        return float(audioop.rms(data, sample_width))
+    samples = array.array('h')
+    samples.frombytes(bytes(data))
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+class EnergyVAD:
+    """Minimal energy-based voice activity detector with a hangover period."""
+
+    def __init__(self, threshold: float = 500.0, hangover_chunks: int = 2):
+        self.threshold = threshold
+        self.hangover_chunks = hangover_chunks
+        self._hangover = 0
+
+    def is_speech(self, data, reference_level: float = 0.0) -> bool:
+        """True if the chunk looks like speech. `reference_level` raises the threshold (e.g. for echo)."""
+        if chunk_rms(data) > self.threshold + reference_level:
+            self._hangover = self.hangover_chunks
+            return True
+        if self._hangover > 0:
+            self._hangover -= 1
+            return True
+        return False
+
+
+class SharedAudioRing:
+    """Fixed-size ring of PCM chunks in multiprocessing.shared_memory.
+
+    A single producer writes slots in order and bumps a sequence counter; the
+    consumer tracks its own read sequence and gets memoryviews straight into
+    shared memory, so chunks are never copied on the consumer side.
+    """
+
+    def __init__(self, slot_size: int, slots: int = 64, name: Optional[str] = None):
+        self.slot_size = slot_size
+        self.slots = slots
+        self._data_offset = _SEQ_SIZE
+        size = self._data_offset + slot_size * slots
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.buf = self.shm.buf
+        if self.owner:
+            struct.pack_into(_SEQ_FORMAT, self.buf, 0, 0)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def write_seq(self) -> int:
+        return struct.unpack_from(_SEQ_FORMAT, self.buf, 0)[0]
+
+    def write(self, data: bytes):
+        """Producer side: copy one chunk into the next slot and publish it."""
+        seq = self.write_seq
+        slot = seq % self.slots
+        start = self._data_offset + slot * self.slot_size
+        length = min(len(data), self.slot_size)
+        self.buf[start:start + length] = data[:length]
+        struct.pack_into(_SEQ_FORMAT, self.buf, 0, seq + 1)  # Publish after the data is in place
+
+    def slot_view(self, seq: int) -> memoryview:
+        slot = seq % self.slots
+        start = self._data_offset + slot * self.slot_size
+        return self.buf[start:start + self.slot_size]
+
+    def close(self):
+        self.buf = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # A consumer still holds a chunk view; the mapping is released when it is dropped
+            logger.warning("Shared audio ring closed while chunk views are still referenced.")
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class SharedAudioRingReader:
+    """Consumer side of a SharedAudioRing."""
+
+    def __init__(self, ring: SharedAudioRing, data_ready):
+        self.ring = ring
+        self.data_ready = data_ready
+        self.read_seq = ring.write_seq
+        self.dropped_chunks = 0
+
+    def next_chunk(self, timeout: float) -> Optional[memoryview]:
+        """Return a view of the next unread chunk, or None if nothing arrived within timeout.
+
+        The view stays valid until the producer wraps around the ring
+        (slots * chunk duration later), which is far longer than a recognizer step.
+        """
+        deadline = time.time() + timeout
+        while True:
+            write_seq = self.ring.write_seq
+            if write_seq - self.read_seq >= self.ring.slots:
+                # Consumer fell behind a full ring: skip to the oldest chunk still intact
+                oldest_safe = write_seq - self.ring.slots + 1  # The oldest slot is next to be overwritten
+                skipped = oldest_safe - self.read_seq
+                self.dropped_chunks += skipped
+                logger.warning(f"Capture ring overrun, dropped {skipped} chunk(s).")
+                self.read_seq = oldest_safe
+            if self.read_seq < write_seq:
+                seq = self.read_seq
+                self.read_seq += 1
+                return self.ring.slot_view(seq)
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            self.data_ready.acquire(timeout=remaining)
+
+    def discard_pending(self):
+        """Skip everything written so far."""
+        self.read_seq = self.ring.write_seq
+
+
+def _capture_process_main(ring_name: str, slots: int, slot_size: int, rate: int, channels: int,
+                          chunk: int, stop_event, data_ready):
+    """Entry point of the capture process: PyAudio -> shared ring."""
+    import pyaudio
+
+    ring = SharedAudioRing(slot_size, slots, name=ring_name)
+    pa = pyaudio.PyAudio()
+    stream = None
+    try:
+        stream = pa.open(format=pyaudio.paInt16, channels=channels, rate=rate,
+                         input=True, frames_per_buffer=chunk)
+        stream.start_stream()
+        while not stop_event.is_set():
+            try:
+                data = stream.read(chunk, exception_on_overflow=False)
+            except IOError as e:
+                if e.errno == pyaudio.paInputOverflowed:  # type: ignore
+                    continue
+                raise
+            ring.write(data)
+            data_ready.release()
+    finally:
+        if stream:
+            stream.stop_stream()
+            stream.close()
+        pa.terminate()
+        ring.close()
+
+
+class CaptureProcess:
+    """Runs microphone capture in a dedicated process.
+
+    Keeps stream.read out of the main interpreter so it no longer competes for
+    the GIL with Vosk decoding, frame processing and JSON parsing.
+    """
+
+    def __init__(self, rate: int = 16000, channels: int = 1, chunk: int = 4096,
+                 slots: int = 64):
+        self.rate = rate
+        self.channels = channels
+        self.chunk = chunk
+        self.slots = slots
+        # spawn: forking a process that already runs gRPC/PortAudio threads is unsafe
+        self._ctx = multiprocessing.get_context('spawn')
+        self.ring = None
+        self.process = None
+        self._stop_event = None
+        self._data_ready = None
+
+    def start(self) -> SharedAudioRingReader:
+        slot_size = self.chunk * self.channels * 2  # int16
+        self.ring = SharedAudioRing(slot_size, self.slots)
+        self._stop_event = self._ctx.Event()
+        self._data_ready = self._ctx.Semaphore(0)
+        self.process = self._ctx.Process(
+            target=_capture_process_main,
+            args=(self.ring.name, self.slots, slot_size, self.rate, self.channels, self.chunk,
+                  self._stop_event, self._data_ready),
+            name="beemo-audio-capture",
+            daemon=True
+        )
+        self.process.start()
+        logger.info(f"Audio capture process started (pid {self.process.pid}, ring {self.ring.name}).")
+        return SharedAudioRingReader(self.ring, self._data_ready)
+
+    def is_alive(self) -> bool:
+        return bool(self.process and self.process.is_alive())
+
+    def stop(self, timeout: float = 2.0):
+        if self._stop_event:
+            self._stop_event.set()
+        if self.process:
+            self.process.join(timeout=timeout)
+            if self.process.is_alive():
+                logger.warning("Audio capture process did not exit in time, terminating.")
+                self.process.terminate()
+            self.process = None
+        if self.ring:
+            self.ring.close()
+            self.ring = None
+        logger.info("Audio capture process stopped.")
@@ -0,0 +1,85 @@
+import io
+import logging
+
+from pydub import AudioSegment
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+try:
+    import miniaudio  # In-process MP3 decoder (no ffmpeg subprocess)
+    MINIAUDIO_AVAILABLE = True
+except ImportError:
+    miniaudio = None
+    MINIAUDIO_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+TARGET_LOUDNESS_DBFS = -20.0  # RMS loudness every clip is normalised to
+PEAK_CEILING_DBFS = -1.0      # Gain is limited so peaks stay below this
+
+_fallback_warned = False
+
+
+def check_mp3_decoder() -> bool:
+    """True if MP3s decode in-process. Otherwise warns, once, that every clip costs an ffmpeg process."""
+    global _fallback_warned
+    if not MINIAUDIO_AVAILABLE and not _fallback_warned:
+        _fallback_warned = True
+        logger.warning("miniaudio is not installed: every MP3 clip is decoded by a new ffmpeg process. "
+                       "Install it (pip install -r requirements.txt) to decode in-process.")
+    return MINIAUDIO_AVAILABLE
+
+
+def decode_mp3_bytes(data: bytes) -> AudioSegment:
+    """Decode MP3 bytes held in memory to an AudioSegment, without temp files.
+
+    Uses miniaudio in-process when available. Otherwise pydub pipes the bytes
+    through ffmpeg's stdin/stdout, which still avoids any disk I/O; passing the
+    codec skips pydub's extra ffprobe call.
+    """
+    if MINIAUDIO_AVAILABLE:
+        decoded = miniaudio.decode(data, output_format=miniaudio.SampleFormat.SIGNED16)
+        return AudioSegment(
+            data=decoded.samples.tobytes(),
+            sample_width=2,
+            frame_rate=decoded.sample_rate,
+            channels=decoded.nchannels
+        )
+    return AudioSegment.from_file(io.BytesIO(data), format='mp3', codec='mp3')
+
+
+def normalize_clip(segment: AudioSegment, rate: int, target_dbfs: float = TARGET_LOUDNESS_DBFS,
+                   peak_ceiling_dbfs: float = PEAK_CEILING_DBFS) -> AudioSegment:
+    """Convert a clip to the output format (int16 mono at `rate`) and normalise its loudness.
+
+    Done once when a clip is created or cached, so playback is a plain buffer
+    write and every engine, cached phrase and sound plays at the same level.
+    """
+    if segment.channels != 1:
+        segment = segment.set_channels(1)
+    if segment.sample_width != 2:
+        segment = segment.set_sample_width(2)
+    if segment.frame_rate != rate:
+        segment = segment.set_frame_rate(rate)
+
+    if NUMPY_AVAILABLE:
+        samples = np.frombuffer(segment.raw_data, dtype=np.int16).astype(np.float32)
+        if not samples.size:
+            return segment
+        rms = float(np.sqrt(np.mean(samples * samples)))
+        peak = float(np.max(np.abs(samples)))
+        if rms < 1.0:
+            return segment  # Silence: nothing to normalise
+        gain = min(32768.0 * 10 ** (target_dbfs / 20) / rms, 32767.0 * 10 ** (peak_ceiling_dbfs / 20) / peak)
+        normalized = np.clip(samples * gain, -32768, 32767).astype(np.int16)
+        return segment._spawn(normalized.tobytes())
+
+    if segment.rms == 0:
+        return segment
+    gain_db = min(target_dbfs - segment.dBFS, peak_ceiling_dbfs - segment.max_dBFS)
+    return segment.apply_gain(gain_db)
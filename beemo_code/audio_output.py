@@ -0,0 +1,192 @@
+import queue
+import time
+import logging
+import threading
+from typing import Callable, Optional
+
+import pyaudio
+
+from audio_capture import chunk_rms
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_SAMPLE_RATE = 24000  # gTTS's native rate; all clips are normalised to it before queueing
+
+
+class PlaybackHandle:
+    """Tracks one queued clip: completion, interruption and first-write time."""
+
+    def __init__(self, pcm: bytes, on_done: Optional[Callable[[bool], None]] = None):
+        self.pcm = pcm
+        self.on_done = on_done
+        self.done = threading.Event()
+        self.completed = False      # True if played to the end, False if stopped/flushed/failed
+        self.first_write_at = None  # Wall-clock time the first chunk reached the device
+        self.generation = 0         # AudioOutputService stop generation the clip was queued in
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.done.wait(timeout)
+
+    def _finish(self, completed: bool):
+        self.completed = completed
+        self.done.set()
+        if self.on_done:
+            try:
+                self.on_done(completed)
+            except Exception as e:
+                logger.warning(f"Playback completion callback failed: {e}")
+
+
+class AudioOutputService:
+    """Long-lived audio output: one PyAudio stream, a clip queue and a player thread.
+
+    Opening and closing the output device per utterance costs hundreds of
+    milliseconds on the Pi and can click; here the stream stays open in a fixed
+    format and clips are converted to it before being queued.
+    """
+
+    def __init__(self, rate: int = OUTPUT_SAMPLE_RATE, channels: int = 1, sample_width: int = 2, chunk_ms: int = 100,
+                 on_stream_open: Optional[Callable[[float], None]] = None):
+        self.rate = rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.chunk_bytes = int(rate * chunk_ms / 1000) * channels * sample_width
+        self.current_level = 0.0  # RMS of the chunk being played, used for echo suppression
+        self.on_stream_open = on_stream_open  # Called with the seconds each (re)open took
+        self._queue = queue.Queue()
+        # Bumped by stop(): a clip queued before a stop never plays, even if the player already dequeued it
+        self._generation = 0
+        self._generation_lock = threading.Lock()
+        self._playing = False
+        self._running = False
+        self._pa = None
+        self._stream = None
+        self._thread = None
+
+    def start(self) -> bool:
+        if self._running:
+            return True
+        try:
+            self._open_stream()
+        except Exception as e:
+            logger.error(f"Failed to open audio output stream: {e}")
+            return False
+        self._running = True
+        self._thread = threading.Thread(target=self._player_loop, name="audio-output", daemon=True)
+        self._thread.start()
+        logger.info(f"Audio output service started ({self.rate} Hz, {self.channels} ch, {self.sample_width * 8}-bit).")
+        return True
+
+    def _open_stream(self):
+        started = time.time()
+        if self._pa is None:
+            self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(
+            format=self._pa.get_format_from_width(self.sample_width),
+            channels=self.channels,
+            rate=self.rate,
+            output=True
+        )
+        if self.on_stream_open:
+            self.on_stream_open(time.time() - started)
+
+    def segment_to_pcm(self, segment) -> bytes:
+        """Raw PCM of a pydub AudioSegment in the service's output format.
+
+        Clips normalised with audio_codec.normalize_clip already match, so this
+        is just a buffer access; anything else is converted here.
+        """
+        if segment.frame_rate != self.rate:
+            segment = segment.set_frame_rate(self.rate)
+        if segment.channels != self.channels:
+            segment = segment.set_channels(self.channels)
+        if segment.sample_width != self.sample_width:
+            segment = segment.set_sample_width(self.sample_width)
+        return segment.raw_data
+
+    def play(self, pcm: bytes, on_done: Optional[Callable[[bool], None]] = None) -> PlaybackHandle:
+        """Queue PCM (already in the output format) for playback."""
+        handle = PlaybackHandle(pcm, on_done)
+        if not self._running:
+            logger.warning("Audio output service not running, dropping clip.")
+            handle._finish(False)
+            return handle
+        with self._generation_lock:
+            handle.generation = self._generation
+            self._queue.put(handle)
+        return handle
+
+    def stop(self):
+        """Stop the current clip within one chunk and flush everything queued."""
+        with self._generation_lock:
+            self._generation += 1
+        self.flush()
+
+    def flush(self):
+        """Drop queued clips that have not started playing."""
+        while True:
+            try:
+                handle = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if handle is not None:
+                handle._finish(False)
+
+    def is_busy(self) -> bool:
+        return self._playing or not self._queue.empty()
+
+    def _player_loop(self):
+        while self._running:
+            handle = self._queue.get()
+            if handle is None:
+                break
+            self._playing = True
+            completed = self._play_clip(handle)
+            self._playing = False
+            self.current_level = 0.0
+            handle._finish(completed)
+
+    def _play_clip(self, handle: PlaybackHandle) -> bool:
+        pcm = handle.pcm
+        for offset in range(0, len(pcm), self.chunk_bytes):
+            if handle.generation != self._generation or not self._running:
+                return False
+            chunk = pcm[offset:offset + self.chunk_bytes]
+            self.current_level = chunk_rms(chunk, self.sample_width)
+            try:
+                self._stream.write(chunk)
+            except Exception as e:
+                logger.error(f"Audio output write failed, reopening stream: {e}")
+                try:
+                    self._stream.close()
+                except Exception:
+                    pass
+                try:
+                    self._open_stream()
+                except Exception as reopen_error:
+                    logger.error(f"Could not reopen audio output stream: {reopen_error}")
+                    time.sleep(0.5)
+                return False
+            if handle.first_write_at is None:
+                handle.first_write_at = time.time()
+        return True
+
+    def close(self):
+        if not self._running:
+            return
+        self._running = False
+        self.stop()
+        self._queue.put(None)
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        if self._stream:
+            try:
+                self._stream.stop_stream()
+                self._stream.close()
+            except Exception as e:
+                logger.warning(f"Error closing audio output stream: {e}")
+            self._stream = None
+        if self._pa:
+            self._pa.terminate()
+            self._pa = None
+        logger.info("Audio output service stopped.")
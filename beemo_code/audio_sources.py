@@ -0,0 +1,137 @@
+import time
+import wave
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AudioInputSource:
+    """Where VoiceDetectionManager gets 16-bit mono PCM from."""
+
+    is_live = False  # True for real capture devices
+
+    def open(self):
+        raise NotImplementedError
+
+    def read(self, frames: int) -> bytes:
+        """Return `frames` frames of int16 PCM. Raises EOFError when the source is exhausted."""
+        raise NotImplementedError
+
+    def is_active(self) -> bool:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MicrophoneSource(AudioInputSource):
+    """Live microphone input through a PyAudio instance."""
+
+    is_live = True
+
+    def __init__(self, pa, rate: int, channels: int, chunk: int, sample_format):
+        self.pa = pa
+        self.rate = rate
+        self.channels = channels
+        self.chunk = chunk
+        self.sample_format = sample_format
+        self.stream = None
+
+    def open(self):
+        self.stream = self.pa.open(
+            format=self.sample_format,
+            channels=self.channels,
+            rate=self.rate,
+            input=True,
+            frames_per_buffer=self.chunk
+        )
+        self.stream.start_stream()
+
+    def read(self, frames: int) -> bytes:
+        return self.stream.read(frames, exception_on_overflow=False)
+
+    def is_active(self) -> bool:
+        return bool(self.stream and self.stream.is_active())
+
+    def close(self):
+        if self.stream:
+            try:
+                if self.stream.is_active():
+                    self.stream.stop_stream()
+                self.stream.close()
+            finally:
+                self.stream = None
+
+
+class FileAudioSource(AudioInputSource):
+    """Replays a WAV or raw int16 PCM file as if it came from the microphone.
+
+    pace=1.0 feeds in real time, pace=N feeds N times faster and pace=0 feeds
+    as fast as the consumer reads. Trailing silence is appended so the
+    recognizer's silence-based endpointing finishes the utterance.
+    """
+
+    def __init__(self, path: str, rate: int = 16000, pace: float = 1.0,
+                 trailing_silence_seconds: float = 3.0):
+        self.path = path
+        self.rate = rate
+        self.pace = pace
+        self.trailing_silence_seconds = trailing_silence_seconds
+        self._pcm = b""
+        self._pos = 0
+        self._silence_left = 0
+        self._fed_bytes = 0
+        self._active = False
+        self._started_at = None
+
+    @property
+    def duration_seconds(self) -> float:
+        return len(self._pcm) / (2.0 * self.rate)
+
+    def open(self):
+        if self.path.lower().endswith('.wav'):
+            with wave.open(self.path, 'rb') as wav:
+                if wav.getsampwidth() != 2 or wav.getnchannels() != 1 or wav.getframerate() != self.rate:
+                    raise ValueError(
+                        f"{self.path}: expected 16-bit mono {self.rate} Hz WAV, got "
+                        f"{wav.getsampwidth() * 8}-bit, {wav.getnchannels()} channel(s), {wav.getframerate()} Hz"
+                    )
+                self._pcm = wav.readframes(wav.getnframes())
+        else:
+            with open(self.path, 'rb') as raw:  # Raw PCM: int16 mono at self.rate
+                self._pcm = raw.read()
+        self._pos = 0
+        self._fed_bytes = 0
+        self._silence_left = int(self.trailing_silence_seconds * self.rate) * 2
+        self._started_at = time.time()
+        self._active = True
+        logger.info(f"Replaying {self.path} ({self.duration_seconds:.1f}s, pace {self.pace or 'max'}).")
+
+    def read(self, frames: int) -> bytes:
+        if not self._active:
+            raise EOFError(self.path)
+        size = frames * 2
+        if self._pos < len(self._pcm):
+            data = self._pcm[self._pos:self._pos + size]
+            self._pos += len(data)
+            data += b"\x00" * (size - len(data))
+        elif self._silence_left > 0:
+            data = b"\x00" * size
+            self._silence_left -= size
+        else:
+            self._active = False
+            raise EOFError(self.path)
+        self._fed_bytes += size
+
+        if self.pace:
+            # Sleep until this chunk would have finished arriving from a real microphone
+            delay = self._started_at + self._fed_bytes / (2.0 * self.rate) / self.pace - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        return data
+
+    def is_active(self) -> bool:
+        return self._active
+
+    def close(self):
+        self._active = False
@@ -9,19 +9,21 @@ import logging
 import pyaudio
 import vosk
 import io
+import collections
+import concurrent.futures
 import google.generativeai as genai
 import google.api_core.exceptions
 import firebase_admin
 from firebase_admin import credentials, firestore, db
 from pydub import AudioSegment
-from pydub.utils import make_chunks
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any, Callable, Iterable, Iterator, Union
 import subprocess
 from enum import Enum
-from gtts import gTTS
-import tempfile
-import RPi.GPIO as GPIO  # Add this import
+try:
+    import RPi.GPIO as GPIO  # Add this import
+except (ImportError, RuntimeError):  # Not on a Raspberry Pi (e.g. running voice_benchmark.py on a server)
+    GPIO = None
 
 
 FIREBASE_DATABASE_URL = "https://beemo-ccbba-default-rtdb.firebaseio.com/"
@@ -59,21 +61,60 @@ except ImportError as e:
 try:
     from emotions import BeemoEmotionDisplay
     EMOTIONS_AVAILABLE = True
-except ImportError as e:
+except (ImportError, RuntimeError) as e:
     print(f"⚠️ Emotions module not found: {e}. BEEMO will run without emotions.")
     EMOTIONS_AVAILABLE = False
     BeemoEmotionDisplay = None
 
+from speculation import SpeculativeIntentProcessor, tokenize
+from audio_capture import CaptureProcess, EnergyVAD
+from wake_word import WakeWordDetector
+from audio_sources import AudioInputSource, MicrophoneSource
+from tts_cache import TTSCache
+from speech_pipeline import (split_sentences, unspoken_remainder, StreamingSynthesizer, SpeechQueue,
+                             ResponseStreamSplitter, SentenceChannel, PRIORITY_URGENT, PRIORITY_NORMAL, PRIORITY_LOW)
+from audio_output import AudioOutputService, OUTPUT_SAMPLE_RATE
+from audio_codec import check_mp3_decoder, decode_mp3_bytes, normalize_clip
+from phrase_bank import PhraseBank, fixed_fragments
+from tts_engines import TTSEngineManager, GTTSEngine, ElevenLabsEngine, LocalTTSEngine
+from metrics import StageMetrics, LatencyTracker
+from intent_parser import LocalIntentParser
+from response_cache import ResponseCache, is_cacheable_query, device_state_fingerprint
+from conversation import ConversationManager
+from device_context import DeviceContextRanker
+from llm_client import AsyncLLMClient, LLMTimeout, LLMCancelled
+from llm_session import GeminiChatSession, build_contents
+from local_llm import LocalLLMPool, LLMBackendSelector, LocalLLMError
+from llm_tools import TOOLS, DeviceCall, LLMReply, ToolCall, build_reply, build_system_prompt, parse_response, split_parts
+
 # --- Constants ---
 
 VOSK_MODEL_PATH_DEFAULT = "/home/pi/beemo/robot/vosk-model-small-en-us-0.15/vosk-model-small-en-us-0.15"
+TTS_CACHE_DIR_DEFAULT = "/home/pi/beemo/robot/tts_cache"
+TTS_CACHE_MAX_BYTES = 100 * 1024 * 1024
+PHRASE_BANK_REFRESH_DELAY_SECONDS = 5.0  # Device syncs in quick succession trigger one phrase bank refresh
+HISTORY_BUDGET_TOKENS = 800         # Verbatim recent turns; older ones are summarised
+SUMMARY_BUDGET_TOKENS = 200
+DEVICE_CONTEXT_BUDGET_TOKENS = 300  # Per-request device list
+DEVICE_CONTEXT_TOP_K = 8
+SPEECH_METRICS_PATH_DEFAULT = "speech_metrics.json"
+BOOT_SOUND_PATH = "/home/pi/beemo/robot/boot.mp3"
+GEMINI_MODEL_NAME = 'gemini-1.5-flash-latest'
+LLM_DEADLINE_SECONDS = 15.0  # A command's Gemini work (stream plus any fallback request) is abandoned after this
+LLM_MIN_ATTEMPT_SECONDS = 1.0  # A fallback request is not started with less time than this left
+PREFETCH_WAIT_SECONDS = 0.5  # Longest wait for a speculative prefetch before fetching afresh
+SUMMARY_DEADLINE_SECONDS = 8.0  # Background history summaries; the extractive notes stay if this passes
+LOCAL_LLM_BACKEND = "llama"  # "stub" exercises the offline path without a model or network
+LOCAL_LLM_MODEL_PATH = "/home/pi/beemo/robot/models/qwen2.5-0.5b-instruct-q4_k_m.gguf"
 
 class VoiceDetectionManager:
     """Handles voice detection using Vosk model and microphone input.
-    Listens for commands directly without a wake word.
+    Listens for commands directly, or after the "Beemo" wake word when wake_word_enabled is set.
     """
 
-    def __init__(self, model_path: str = VOSK_MODEL_PATH_DEFAULT):
+    def __init__(self, model_path: str = VOSK_MODEL_PATH_DEFAULT, use_capture_process: bool = False,
+                 wake_word_enabled: bool = False,
+                 input_source: Optional[AudioInputSource] = None):
         self.logger = logging.getLogger(__name__)
         self.model_path = model_path
         self.model = None
@@ -89,11 +130,30 @@ class VoiceDetectionManager:
         self.RATE = 16000
 
         self._initialize_vosk()
-        self._initialize_audio_system() # Renamed for clarity
+        # A given input source (e.g. a recorded file) replaces the microphone entirely
+        self.input_source = input_source
+        if self.input_source is None:
+            self._initialize_audio_system() # Renamed for clarity
 
-        self.stream = None # Reference to the PyAudio stream
         self._audio_thread = None # Reference to the audio callback thread
 
+        # Optional capture in a separate process, handing chunks over through shared memory
+        self.use_capture_process = use_capture_process
+        self.capture_process = None
+        self._ring_reader = None
+
+        # Barge-in: chunks of user speech detected during playback, consumed before new audio
+        self._pre_roll = collections.deque()
+        self.command_in_progress = False
+        self.BARGE_IN_THRESHOLD = 700.0  # RMS above the echo estimate that counts as user speech
+
+        # Optional wake-word stage: the full recognizer only runs in a command window after "Beemo"
+        self.wake_word_detector = WakeWordDetector(self.model, self.RATE) if wake_word_enabled else None
+        self.COMMAND_WINDOW_SECONDS = 8
+
+        # Recogniser-side timing of the last listen_for_command call (see voice_benchmark.py)
+        self.last_listen_timing = {}
+
     def _initialize_vosk(self):
         """Initialize Vosk speech recognition model"""
         try:
@@ -139,16 +199,19 @@ class VoiceDetectionManager:
         return recognizer
 
     def _audio_callback(self):
-        """Audio callback function to capture microphone input and put it in a queue."""
-        if not self.stream:
+        """Audio callback function to capture input source audio and put it in a queue."""
+        if not self.input_source or not self.input_source.is_active():
             self.logger.error("Audio stream not available for callback.")
             return
 
         self.logger.debug("Audio callback thread started.")
         while self.is_listening:
             try:
-                data = self.stream.read(self.CHUNK, exception_on_overflow=False)
+                data = self.input_source.read(self.CHUNK)
                 self.audio_queue.put(data)
+            except EOFError:
+                self.logger.info("Audio input source exhausted.")
+                break
             except IOError as e:
                 if e.errno == pyaudio.paInputOverflowed: # type: ignore
                     self.logger.warning("Input overflowed. Skipping frame.")
@@ -168,22 +231,20 @@ class VoiceDetectionManager:
             self.logger.info("Already listening.")
             return True
 
-        if not self.microphone:
+        if not self.microphone and self.input_source is None:
             self.logger.error("PyAudio not initialized. Cannot start listening.")
             return False
         if not self.model:
             self.logger.error("Vosk model not loaded. Cannot start listening.")
             return False
 
+        if self.use_capture_process and self.input_source is None:
+            return self._start_capture_process()
+
         try:
-            self.stream = self.microphone.open(
-                format=self.FORMAT,
-                channels=self.CHANNELS,
-                rate=self.RATE,
-                input=True,
-                frames_per_buffer=self.CHUNK
-            )
-            self.stream.start_stream()
+            if self.input_source is None or self.input_source.is_live:
+                self.input_source = MicrophoneSource(self.microphone, self.RATE, self.CHANNELS, self.CHUNK, self.FORMAT)
+            self.input_source.open()
             self.is_listening = True
 
             self._audio_thread = threading.Thread(target=self._audio_callback)
@@ -195,13 +256,90 @@ class VoiceDetectionManager:
 
         except Exception as e:
             self.logger.error(f"Failed to start voice detection: {e}")
-            if self.stream:
-                self.stream.stop_stream()
-                self.stream.close()
-                self.stream = None
+            if self.input_source:
+                self.input_source.close()
             self.is_listening = False
             return False
 
+    def _start_capture_process(self) -> bool:
+        """Starts capture in a dedicated process writing into a shared-memory ring."""
+        try:
+            self.capture_process = CaptureProcess(
+                rate=self.RATE,
+                channels=self.CHANNELS,
+                chunk=self.CHUNK
+            )
+            self._ring_reader = self.capture_process.start()
+            self.is_listening = True
+            self.logger.info("Voice detection started (capture process running).")
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to start capture process: {e}")
+            if self.capture_process:
+                self.capture_process.stop()
+            self.capture_process = None
+            self._ring_reader = None
+            self.is_listening = False
+            return False
+
+    def _capture_active(self) -> bool:
+        """True if audio is currently being captured by either backend."""
+        if self.capture_process:
+            return self.capture_process.is_alive()
+        return bool(self.input_source and self.input_source.is_active())
+
+    def _next_audio_chunk(self, timeout: float):
+        """Next captured chunk; raises queue.Empty if none arrives within timeout."""
+        if self._pre_roll:
+            return self._pre_roll.popleft()
+        if self._ring_reader:
+            data = self._ring_reader.next_chunk(timeout)
+            if data is None:
+                raise queue.Empty
+            return data
+        return self.audio_queue.get(timeout=timeout)
+
+    def discard_pending_audio(self):
+        """Drop audio captured so far (e.g. Beemo's own voice picked up during playback)."""
+        if self._ring_reader:
+            self._ring_reader.discard_pending()
+        while not self.audio_queue.empty():
+            try:
+                self.audio_queue.get_nowait()
+            except queue.Empty:
+                break
+
+    def monitor_barge_in(self, playback_done: threading.Event, barge_in: threading.Event,
+                         reference_level: Callable[[], float], echo_coupling: float = 0.5):
+        """Runs while Beemo is speaking: drops echo chunks and sets barge_in on user speech.
+
+        Echo suppression is a simple level comparison: the mic chunk must exceed the
+        threshold plus the RMS of what is currently being played, scaled by echo_coupling.
+        The triggering chunk is kept so the next listen_for_command starts with it.
+        """
+        vad = EnergyVAD(self.BARGE_IN_THRESHOLD, hangover_chunks=0)
+        while not playback_done.is_set() and self.is_listening:
+            try:
+                data = self._next_audio_chunk(timeout=0.05)
+            except queue.Empty:
+                continue
+            if vad.is_speech(data, reference_level() * echo_coupling):
+                self._pre_roll.append(bytes(data))
+                self.logger.info("Barge-in detected: user speech during playback.")
+                barge_in.set()
+                return
+            # Anything else captured during playback is our own voice
+
+    @staticmethod
+    def _accept_waveform(recognizer: vosk.KaldiRecognizer, data) -> bool:
+        """Feed a chunk to Vosk; shared-memory views are passed through cffi without copying."""
+        if isinstance(data, memoryview):
+            try:
+                return recognizer.AcceptWaveform(vosk._ffi.from_buffer(data))
+            except (AttributeError, TypeError):
+                return recognizer.AcceptWaveform(bytes(data))
+        return recognizer.AcceptWaveform(data)
+
     def stop_listening(self):
         """Stops the microphone stream and audio processing callback."""
         if not self.is_listening:
@@ -210,6 +348,11 @@ class VoiceDetectionManager:
 
         self.is_listening = False # Signal callback thread to stop
 
+        if self.capture_process:
+            self._ring_reader = None
+            self.capture_process.stop()
+            self.capture_process = None
+
         if self._audio_thread and self._audio_thread.is_alive():
             self.logger.debug("Waiting for audio thread to join...")
             self._audio_thread.join(timeout=1.0) # Wait for thread to finish
@@ -217,14 +360,11 @@ class VoiceDetectionManager:
                 self.logger.warning("Audio thread did not join in time.")
         self._audio_thread = None
 
-        if self.stream:
+        if self.input_source:
             try:
-                if self.stream.is_active():
-                    self.stream.stop_stream()
-                self.stream.close()
+                self.input_source.close()
             except Exception as e:
                 self.logger.error(f"Error closing audio stream: {e}")
-            self.stream = None
 
         # Clear the queue
         while not self.audio_queue.empty():
@@ -235,31 +375,46 @@ class VoiceDetectionManager:
 
         self.logger.info("Voice detection stopped (audio capture ended).")
 
-    def listen_for_command(self, timeout: int = 10) -> Optional[str]:
+    def listen_for_command(self, timeout: int = 10,
+                           partial_callback: Optional[Callable[[str], None]] = None) -> Optional[str]:
         """
         Listens for a single spoken command.
         Reads from the audio_queue populated by _audio_callback.
+        partial_callback, if given, receives the running transcript each time Vosk's partial result changes.
         Returns the transcribed text or None if no command is detected within timeout.
+        Timing of the call, measured where the audio is consumed, is left in last_listen_timing.
         """
-        if not self.is_listening or not self.stream or not self.stream.is_active():
+        if not self.is_listening or not self._capture_active():
             self.logger.warning("Audio stream not active. Cannot listen for command.")
             # Try to restart it if it was stopped abruptly
             if not self.is_listening:
                  if not self.start_listening():
                     return None
-            elif not self.stream or not self.stream.is_active():
+            elif not self._capture_active():
                 self.logger.warning("Stream inactive, attempting to restart listening process.")
                 self.stop_listening() # Clean up first
                 if not self.start_listening():
                     return None
 
 
+        if self.wake_word_detector:
+            if not self._wait_for_wake_word(timeout):
+                return None
+            timeout = self.COMMAND_WINDOW_SECONDS  # Activation opens a fixed command window
+
+        self.last_listen_timing = {}
         local_recognizer = self._get_recognizer() # Fresh recognizer for each command
         self.logger.info(f"Listening for command (timeout: {timeout}s)...")
+        self.command_in_progress = True
+        window_audio_seconds = 0.0
+        window_cpu_start = time.thread_time()
 
         start_time = time.time()
         command_parts = []
+        last_partial_text = ""
         last_speech_time = start_time
+        decode_seconds = 0.0
+        consumed = []  # (audio seconds consumed so far, wall time), one entry per chunk
         silence_threshold = 2.0 # seconds of silence to consider command ended
 
         try:
@@ -268,7 +423,7 @@ class VoiceDetectionManager:
                     self.logger.info("Listening interrupted externally.")
                     break
                 try:
-                    data = self.audio_queue.get(timeout=0.1) # Wait briefly for audio data
+                    data = self._next_audio_chunk(timeout=0.1) # Wait briefly for audio data
                 except queue.Empty:
                     # No audio data, check for silence timeout if speech had started
                     if command_parts and (time.time() - last_speech_time > silence_threshold):
@@ -276,19 +431,27 @@ class VoiceDetectionManager:
                         break
                     continue # Continue waiting for audio or main timeout
 
-                if local_recognizer.AcceptWaveform(data):
-                    result = json.loads(local_recognizer.Result())
+                window_audio_seconds += len(data) / (2.0 * self.RATE)
+                decode_start = time.perf_counter()
+                accepted = self._accept_waveform(local_recognizer, data)
+                result = json.loads(local_recognizer.Result() if accepted else local_recognizer.PartialResult())
+                decode_seconds += time.perf_counter() - decode_start
+                consumed.append((window_audio_seconds, time.time()))
+                if accepted:
                     text = result.get('text', '').strip()
                     if text:
                         self.logger.debug(f"Recognized segment: {text}")
                         command_parts.append(text)
                         last_speech_time = time.time() # Reset silence timer on new speech
+                        self._notify_partial(partial_callback, ' '.join(command_parts))
                 else:
-                    partial_result = json.loads(local_recognizer.PartialResult())
-                    partial_text = partial_result.get('partial', '').strip()
+                    partial_text = result.get('partial', '').strip()
                     if partial_text:
                         # self.logger.debug(f"Partial: {partial_text}") # Can be noisy
                         last_speech_time = time.time() # Reset silence timer on partial speech
+                        if partial_text != last_partial_text:
+                            last_partial_text = partial_text
+                            self._notify_partial(partial_callback, ' '.join(command_parts + [partial_text]))
 
                 # If we have started capturing command parts, and then silence occurs
                 if command_parts and (time.time() - last_speech_time > silence_threshold):
@@ -296,7 +459,9 @@ class VoiceDetectionManager:
                     break
 
             # Process any final piece of audio
+            decode_start = time.perf_counter()
             final_result_text = json.loads(local_recognizer.FinalResult()).get('text', '').strip()
+            decode_seconds += time.perf_counter() - decode_start
             if final_result_text:
                 command_parts.append(final_result_text)
 
@@ -305,9 +470,22 @@ class VoiceDetectionManager:
             return None
         finally:
             # local_recognizer is local, no cleanup needed beyond this scope
-            pass
+            self.command_in_progress = False
+            if self.wake_word_detector:
+                self.wake_word_detector.record_command_window(
+                    window_audio_seconds, time.thread_time() - window_cpu_start)
+            self.last_listen_timing = {
+                'started_at': start_time,
+                'finished_at': time.time(),
+                'last_speech_at': last_speech_time if command_parts or last_partial_text else None,
+                'audio_seconds': window_audio_seconds,
+                'decode_seconds': decode_seconds,  # Inside Vosk only: excludes waiting for audio and endpointing
+                'consumed': consumed,
+            }
 
         command = ' '.join(command_parts).strip().lower()
+        if self.wake_word_detector:
+            command = self.wake_word_detector.strip_wake_word(command)
 
         if command:
             self.logger.info(f"Command recognized: {command}")
@@ -316,6 +494,40 @@ class VoiceDetectionManager:
             self.logger.info("No command recognized within timeout or just silence.")
             return None
 
+    def _wait_for_wake_word(self, timeout: float) -> bool:
+        """Runs only the keyword spotter until "Beemo" is heard or the timeout expires."""
+        self.logger.info(f"Waiting for wake word (timeout: {timeout}s)...")
+        start_time = time.time()
+        while time.time() - start_time < timeout and self.is_listening:
+            try:
+                data = self._next_audio_chunk(timeout=0.1)
+            except queue.Empty:
+                continue
+            if self.wake_word_detector.process(data):
+                # Replay the chunks around the wake word so the command start is not lost
+                self._pre_roll.extendleft(reversed(self.wake_word_detector.take_pre_roll()))
+                return True
+        return False
+
+    def set_input_source(self, input_source: AudioInputSource):
+        """Swap the audio input (e.g. the next recording in a benchmark run)."""
+        if self.is_listening:
+            self.stop_listening()
+        self.input_source = input_source
+
+    def get_wake_word_stats(self) -> Optional[Dict]:
+        """Duty-cycle and CPU figures of the wake-word stage, if enabled."""
+        return self.wake_word_detector.get_stats() if self.wake_word_detector else None
+
+    def _notify_partial(self, partial_callback: Optional[Callable[[str], None]], text: str):
+        """Forward a partial transcript without letting callback errors break listening."""
+        if not partial_callback:
+            return
+        try:
+            partial_callback(text)
+        except Exception as e:
+            self.logger.warning(f"Partial transcript callback failed: {e}")
+
     def cleanup(self):
         """Clean up resources"""
         self.stop_listening() # Ensures stream and thread are stopped
@@ -337,11 +549,21 @@ class DeviceManager:
         self.last_sync = None
         self.logger = logging.getLogger(__name__)
         self._sync_lock = threading.Lock()
+        self._device_index = []
+        self._device_index_sync = None
+        self.sync_callbacks = []  # Called with no arguments after every successful sync
 
     def sync_devices(self) -> bool:
         """Thread-safe device synchronization"""
         with self._sync_lock: # Ensure only one sync operation at a time
-            return self._sync_devices_internal()
+            synced = self._sync_devices_internal()
+        if synced:
+            for callback in self.sync_callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    self.logger.warning(f"Device sync callback failed: {e}")
+        return synced
 
     def _sync_devices_internal(self) -> bool:
         """Internal sync method with improved error handling"""
@@ -410,6 +632,7 @@ class DeviceManager:
                 self.logger.info(f"No device states found for user {self.user_id} to sync.")
                 self.locations_cache = {} # Clear cache if no devices found
                 self.device_mapping_cache = {}
+                self._device_index, self._device_index_sync = [], self.last_sync  # Empty until the next sync
                 return False # Indicate no devices were synced
 
         except firebase_admin.db.ApiCallError as e: # More specific exception for DB calls
@@ -498,6 +721,25 @@ class DeviceManager:
                     })
         return matching_devices
 
+    def get_device_index(self) -> List[Dict]:
+        """Flat list of devices with pre-tokenized names, rebuilt only after a sync."""
+        if self._device_index_sync != self.last_sync:
+            index = []
+            for location_id, loc_data in self.locations_cache.items():
+                for dev_id, dev_data in loc_data['devices'].items():
+                    index.append({
+                        'id': dev_id,
+                        'location_id': location_id,
+                        'location': loc_data['name'],
+                        'name': dev_data['name'],
+                        'type': dev_data['type'],
+                        'tokens': tokenize(dev_data['name']),
+                        'state': dev_data.get('state', {})
+                    })
+            self._device_index = index
+            self._device_index_sync = self.last_sync
+        return self._device_index
+
     def find_device_by_name(self, target_name_part: str) -> Optional[Dict]:
         """Find single device by name (returns the first match)."""
         devices = self.find_devices_by_name(target_name_part)
@@ -577,6 +819,7 @@ class EnhancedSmartHomeAI:
     """Enhanced smart home AI with direct voice commands and improved functionality"""
 
     def __init__(self):
+        self._init_started = time.time()
         self.logger = self._setup_logging()
 
         # Initialize emotion display first (before other components)
@@ -613,7 +856,8 @@ class EnhancedSmartHomeAI:
         # Gemini API Configuration
         self.gemini_api_key = GEMINI_API_KEY
         genai.configure(api_key=self.gemini_api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash-latest')
+        # Device control and services are declared as functions; the model returns typed calls
+        self.model = genai.GenerativeModel(GEMINI_MODEL_NAME, tools=TOOLS)
         self.logger.info("Gemini API configured successfully")
 
         # ElevenLabs Configuration
@@ -626,6 +870,14 @@ class EnhancedSmartHomeAI:
             "xi-api-key": ELEVENLABS_API_KEY
         }
 
+        check_mp3_decoder()
+        # TTS engines in order of preference; slow or unreachable ones are failed over automatically
+        self.tts_engines = TTSEngineManager([
+            GTTSEngine(lang='en'),
+            ElevenLabsEngine(self.elevenlabs_api_key, self.elevenlabs_voice_id, self.elevenlabs_api_url),
+            LocalTTSEngine()  # espeak-ng, or piper if a model is configured; works offline
+        ])
+
         # Firebase Configuration - Using static values
         self.firebase_web_api_key = FIREBASE_WEB_API_KEY
         self.firebase_email = FIREBASE_EMAIL
@@ -642,11 +894,59 @@ class EnhancedSmartHomeAI:
         self.firestore_db_client = None
         self.firebase_rtdb_client = None
         self.device_manager = None
-        self.conversation_history = []
+        # Token-budgeted history: recent turns verbatim, older ones in a rolling summary
+        self.conversation = ConversationManager(
+            history_budget_tokens=HISTORY_BUDGET_TOKENS,
+            summary_budget_tokens=SUMMARY_BUDGET_TOKENS,
+            summarizer=self._summarize_conversation
+        )
+        self.device_ranker = DeviceContextRanker(top_k=DEVICE_CONTEXT_TOP_K, budget_tokens=DEVICE_CONTEXT_BUDGET_TOKENS)
 
         self.voice_mode_enabled = True # Flag to control if voice mode attempts initialization
+        self.audio_capture_process_enabled = False # Capture audio in a separate process (shared-memory ring)
+        self.wake_word_enabled = False # Only run full recognition after "Beemo" is heard
         self.running = True
 
+        # Speculative processing of partial transcripts while the user is still talking
+        self.speculation_enabled = True
+        self.speculator = None
+        self._speculation = {'devices': {}, 'services': {}}
+
+        # Simple device commands are parsed locally and skip the LLM round trip
+        self.local_intents_enabled = True
+        self.intent_parser = None
+        self.command_stats = {'total': 0, 'local': 0}
+        self.local_command_latency = LatencyTracker()  # Command received -> response ready
+        self.llm_command_latency = LatencyTracker()
+
+        # Stream Gemini output and speak completed sentences while the rest is generated
+        self.llm_streaming_enabled = True
+        self.last_time_to_first_word = None
+        self.last_llm_error = None
+
+        # Blocking Gemini calls go through an asyncio client: deadline, p90 hedging, cancellation
+        self.llm_client = AsyncLLMClient(self._generate_reply, deadline=LLM_DEADLINE_SECONDS, hedge=True)
+        self._llm_cancel = threading.Event()  # Set on barge-in or a newer command; checked by streams
+
+        # One chat per conversation: static prompt as system_instruction (or a context cache), history reused
+        self.llm_session_enabled = True
+        self.chat_session = GeminiChatSession(GEMINI_MODEL_NAME, tools=TOOLS) if self.llm_session_enabled else None
+
+        # Offline fallback: a small local model kept warm in a worker process, chosen by availability and latency
+        self.local_llm = LocalLLMPool(backend=LOCAL_LLM_BACKEND, model_path=LOCAL_LLM_MODEL_PATH)
+        if self.local_llm.available():
+            self.local_llm.start()
+        else:
+            self.logger.info("No local LLM available; Gemini only.")
+            self.local_llm = None
+        self.llm_selector = LLMBackendSelector(['gemini', 'local'])
+
+        # Several tool calls in one LLM response run side by side
+        self.tool_executor = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="tool-call")
+
+        # Repeated questions are answered from a cache; never used for device-control responses
+        self.response_cache = ResponseCache(max_entries=256, ttl_seconds=6 * 3600)  # Exact normalised matches only
+
         # Initialize additional services
         self.weather_service = WeatherService()
         self.news_service = NewsService()
@@ -670,6 +970,7 @@ class EnhancedSmartHomeAI:
         self.platform_commands = {
             "switch": self._switch_mode,
             "status": self._platform_status,
+            "metrics": self._platform_metrics,
             "help": self._platform_help,
             "reboot": self._platform_reboot,
             "shutdown": self._platform_shutdown
@@ -677,7 +978,54 @@ class EnhancedSmartHomeAI:
 
         self.tts_lock = threading.Lock()  # Add a lock to synchronize TTS and command input
 
+        # Barge-in: keep listening while speaking and cut playback when the user talks
+        self.barge_in_enabled = True
+        self.ECHO_COUPLING = 0.5  # Fraction of the playback level expected to leak into the mic
+        self.PLAYBACK_CHUNK_MS = 100  # Playback can be cut at this granularity
+        self.barge_in_count = 0
+
+        # Stage timings (synthesis, decode, stream open, first chunk, total) for speech and sounds
+        self.speech_metrics = StageMetrics()
+
+        # One long-lived output stream for all speech and sounds
+        self.audio_output = AudioOutputService(
+            rate=OUTPUT_SAMPLE_RATE, channels=1, sample_width=2, chunk_ms=self.PLAYBACK_CHUNK_MS,
+            on_stream_open=lambda seconds: self.speech_metrics.record('audio.stream_open', seconds)
+        )
+        if not self.audio_output.start():
+            self.logger.warning("Audio output unavailable; responses will only be printed.")
+
+        # Boot sound plays while Firebase login, the Vosk model load and device sync run
+        threading.Thread(target=self.play_boot_sound, name="boot-sound", daemon=True).start()
+
+        # Persistent cache of synthesized speech so repeated phrases play instantly and offline
+        try:
+            self.tts_cache = TTSCache(TTS_CACHE_DIR_DEFAULT, TTS_CACHE_MAX_BYTES)
+        except Exception as e:
+            self.logger.warning(f"TTS cache unavailable, every utterance will be synthesized: {e}")
+            self.tts_cache = None
+
+        # Pre-rendered fixed phrases and device names, assembled without any TTS call
+        try:
+            self.phrase_bank = PhraseBank()
+        except Exception as e:
+            self.logger.warning(f"Phrase bank unavailable: {e}")
+            self.phrase_bank = None
+        self._phrase_bank_lock = threading.Lock()
+        self._phrase_bank_build_lock = threading.Lock()
+        self._phrase_bank_timer = None  # Debounces refreshes after device syncs
+
+        # Sentence-level streaming: synthesize sentence N+1 while sentence N plays
+        self.streaming_synthesizer = StreamingSynthesizer(self._synthesize_segment)
+        self.last_time_to_first_audio = None
+
+        # Non-blocking speech: callers get a Future and carry on while the queue speaks
+        self.speech_queue = SpeechQueue(self._speak_item)
+
         self._initialize_system()
+        time_to_ready = time.time() - self._init_started
+        self.speech_metrics.record('boot.time_to_ready', time_to_ready)
+        self.logger.info(f"Initialization finished in {time_to_ready:.1f} s")
 
     def _setup_logging(self) -> logging.Logger:
         """Setup enhanced logging configuration"""
@@ -697,17 +1045,20 @@ class EnhancedSmartHomeAI:
 
         if not self._initialize_firebase_and_auth():
             self.logger.error("Critical: Firebase initialization or authentication failed. Cannot proceed.")
-            self.speak_or_print("Error: Could not connect to Firebase services or authenticate. Please check configuration and network.")
+            self.speak_async("Error: Could not connect to Firebase services or authenticate. Please check configuration and network.", PRIORITY_URGENT)
             self.user_id = None
             return
 
         if self.voice_mode_enabled:
             try:
-                self.voice_manager = VoiceDetectionManager()
+                self.voice_manager = VoiceDetectionManager(
+                    use_capture_process=self.audio_capture_process_enabled,
+                    wake_word_enabled=self.wake_word_enabled
+                )
                 self.logger.info("VoiceDetectionManager initialized.")
             except Exception as e:
                 self.logger.warning(f"VoiceDetectionManager failed to initialize: {e}. Voice input will be disabled.", exc_info=True)
-                self.speak_or_print("Warning: Voice input could not be set up. Falling back to text mode if possible.")
+                self.speak_async("Warning: Voice input could not be set up. Falling back to text mode if possible.")
                 self.voice_manager = None
         else:
             self.logger.info("Voice mode is disabled by configuration.")
@@ -724,9 +1075,14 @@ class EnhancedSmartHomeAI:
             else:
                 self.logger.warning("DeviceManager initialized, but initial sync failed or found no devices.")
             self._setup_system_prompt()
+            self._setup_speculation()
+            if self.local_intents_enabled:
+                self.intent_parser = LocalIntentParser(self.device_manager.get_device_index)
+            self.device_manager.sync_callbacks.append(self._schedule_phrase_bank_refresh)
+            self._schedule_phrase_bank_refresh(delay=0.0)
         else:
             self.logger.error("Cannot initialize DeviceManager: Missing user_id or DB clients.")
-            self.speak_or_print("Error: Could not set up device management.")
+            self.speak_async("Error: Could not set up device management.")
 
         self.logger.info("System initialization complete.")
 
@@ -833,121 +1189,166 @@ class EnhancedSmartHomeAI:
 
     def _setup_system_prompt(self):
         """Setup enhanced system prompt with better context awareness."""
-        current_time_str = datetime.now().strftime('%I:%M %p on %A, %B %d, %Y')
-
         location_name = "your current home"
         if self.device_manager and self.device_manager.current_location_id and \
            self.device_manager.locations_cache.get(self.device_manager.current_location_id):
             location_name = self.device_manager.locations_cache[self.device_manager.current_location_id]['name']
 
-        system_content = f"""You are Beemo, a friendly and intelligent smart home assistant. You can control devices and have natural conversations.
-
-Current Context:
-
-Time: {current_time_str}
-
-Location: {location_name}
-
-Your Capabilities:
-
-Control smart home devices using natural language
-
-Get weather information for any city or current location
-
-Fetch latest news (general or by category)
-
-Tell jokes
-
-Determine current location
-
-Answer questions and engage in conversation
-
-Remember context from earlier in the conversation
-
-When handling weather requests:
-
-For specific cities: SERVICE_REQUEST: {{"service": "weather", "params": {{"city": "city_name"}}}}
-
-For current location: SERVICE_REQUEST: {{"service": "weather", "params": {{"location": "current"}}}}
-
-Special Instructions:
-
-When you detect a device control intent, include a JSON block in your response like this:
-DEVICE_CONTROL: {{"device": "device_name", "action": "turn_on/turn_off/set", "value": "optional_value"}}
-
-When you detect a request for weather, news, jokes, or location, include a SERVICE_REQUEST block:
-SERVICE_REQUEST: {{"service": "weather/news/joke/location", "params": {{"city": "city_name"}} }}
-
-Maintain conversation context and remember recent device states.
-
-Be natural and friendly in your responses, while being efficient with device control. Your primary response to the user should NOT contain the DEVICE_CONTROL block, that's for programmatic use.
-"""
-        if self.device_manager:
-            device_summary_for_prompt = []
-            raw_summary = self.device_manager.get_device_summary(include_offline=True)
-            if raw_summary:
-                for loc in raw_summary:
-                    loc_devices_parts = []
-                    for dev in loc['devices']:
-                        loc_devices_parts.append(f"{dev['name']} (type: {dev['type']}, ID: {dev['id']})")
-                    device_summary_for_prompt.append(f"In {loc['location']}: {'; '.join(loc_devices_parts)}")
-
-                devices_context = "\nAvailable Devices Overview:\n" + "\n".join(device_summary_for_prompt)
-                max_device_context_len = 2000
-                if len(devices_context) > max_device_context_len:
-                    devices_context = devices_context[:max_device_context_len] + "\n... (device list truncated)"
-                system_content += devices_context
-            else:
-                system_content += "\nNo smart home devices are currently synced or available."
-        else:
-            system_content += "\nDevice manager not available. Cannot list devices."
-
-
-        self.conversation_history = [{"role": "system", "content": system_content}]
+        system_content = build_system_prompt(datetime.now(), location_name)
+        # Devices are not listed here: each request gets only the devices relevant to it (_device_context)
+        self.conversation.reset(system_content)
+        if self.chat_session:
+            try:
+                self.chat_session.reset(system_content)
+            except Exception as e:  # e.g. an SDK without system_instruction support
+                self.logger.warning(f"Persistent chat session unavailable, rebuilding contents per request: {e}")
+                self.chat_session = None
         self.logger.info("System prompt configured for LLM.")
         self.logger.debug(f"System prompt content:\n{system_content[:500]}...")
 
+    def _device_context(self, user_input: str) -> str:
+        """Device list for one request: the top-ranked devices for this utterance."""
+        if not self.device_manager:
+            return "Device manager not available. Cannot list devices."
+        return self.device_ranker.build(user_input, self.device_manager.get_device_index())
+
+    def _summarize_conversation(self, previous_summary: str, turns: List[Dict]) -> str:
+        """Rewrite the rolling history summary with the turns that just left the window."""
+        transcript = "\n".join(f"{'User' if t['role'] == 'user' else 'Beemo'}: {t['content']}" for t in turns)
+        prompt = (
+            "Update this summary of a conversation between a user and Beemo, a smart home assistant. "
+            "Keep facts, preferences and device changes that may matter later; at most 5 short lines.\n\n"
+            f"Current summary:\n{previous_summary or '(empty)'}\n\nNew turns:\n{transcript}"
+        )
+        response = self.model.generate_content(
+            prompt, tool_config={'function_calling_config': {'mode': 'NONE'}},
+            request_options={'timeout': SUMMARY_DEADLINE_SECONDS})
+        return response.text
 
-    def call_openrouter(self, messages: List[Dict]) -> str:
-        """Call the Gemini API for LLM completion (backward-compatible)."""
-        if not self.gemini_api_key or not self.model:
-            self.logger.error("Gemini API key not set or model not initialized.")
-            return "I'm sorry, I can't process requests right now (AI service not configured)."
-
-        system_instruction_text = None
-        conversation_messages = messages
-
-        # Extract the system prompt, if it exists.
-        if messages and messages[0]["role"] == "system":
-            system_instruction_text = messages[0]["content"]
-            conversation_messages = messages[1:]
-
-        # Build the Gemini-formatted conversation list.
-        gemini_contents = []
-        is_first_user_message = True
-
-        for msg in conversation_messages:
-            role = "model" if msg["role"] == "assistant" else "user"
-            content = msg["content"]
 
-            # Instead of a special parameter, prepend system instructions to the first user message.
-            if role == "user" and is_first_user_message and system_instruction_text:
-                content = f"{system_instruction_text}\n\n---\n\nUser Question: {content}"
-                is_first_user_message = False  # Ensure it only happens once
+    def _schedule_phrase_bank_refresh(self, delay: float = PHRASE_BANK_REFRESH_DELAY_SECONDS):
+        """Refresh the phrase bank in the background once device syncs have settled for `delay` seconds."""
+        if not self.phrase_bank:
+            return
+        with self._phrase_bank_lock:
+            if self._phrase_bank_timer:
+                self._phrase_bank_timer.cancel()
+            self._phrase_bank_timer = threading.Timer(delay, self._refresh_phrase_bank)
+            self._phrase_bank_timer.name = "phrase-bank-build"
+            self._phrase_bank_timer.daemon = True
+            self._phrase_bank_timer.start()
+
+    def _refresh_phrase_bank(self):
+        """Pre-render fixed phrases and the names of new or renamed devices. Runs on the timer thread."""
+        if not self.phrase_bank or not self.device_manager or not self.running:
+            return
+        with self._phrase_bank_build_lock:  # A build still running from an earlier sync finishes first
+            device_names = [dev['name'] for dev in self.device_manager.get_device_index()]
+            missing = [text for text in fixed_fragments(device_names) if not self.phrase_bank.has(text)]
+            if not missing:
+                return
+            self.logger.info(f"Pre-rendering {len(missing)} phrase bank fragment(s) in the background.")
+            try:
+                self.phrase_bank.build(missing, self._synthesize_tts)
+            except Exception as e:
+                self.logger.warning(f"Phrase bank refresh failed: {e}")
 
-            gemini_contents.append({"role": role, "parts": [{"text": content}]})
+    def _setup_speculation(self):
+        """Create the speculative intent processor used on partial voice transcripts."""
+        if not self.speculation_enabled or not self.device_manager:
+            return
+        self.speculator = SpeculativeIntentProcessor(
+            device_index_provider=self.device_manager.get_device_index,
+            service_prefetchers={
+                'weather': self._fetch_current_location_weather,
+                'news': lambda: self.news_service.get_news(country='us', category=None, max_articles=5),
+                'joke': self.joke_service.get_joke,
+                'location': self.location_service.get_location,
+            }
+        )
+        self.logger.info("Speculative intent processing enabled.")
+
+    def _fetch_current_location_weather(self):
+        """Weather for the current location, falling back to a default city."""
+        location = self.location_service.get_location()
+        if location and isinstance(location, dict):
+            return self.weather_service.get_weather(
+                lat=location.get('latitude'),
+                lon=location.get('longitude')
+            )
+        return self.weather_service.get_weather(city="London")  # Default fallback
+
+    def _prefetched(self, service_type: str):
+        """Return a speculatively prefetched service result confirmed by the final transcript."""
+        future = self._speculation['services'].get(service_type)
+        # Wait a little: the prefetch started while the user was talking, so it is usually done; otherwise fetch afresh
+        result = SpeculativeIntentProcessor.prefetched_result(future, timeout=PREFETCH_WAIT_SECONDS)
+        if result is not None and self.speculator:
+            self.speculator.stats['prefetch_hits'] += 1
+            self.logger.info(f"Using speculatively prefetched '{service_type}' result.")
+        return result
+
+    def _build_gemini_contents(self, messages: List[Dict]) -> List[Dict]:
+        """Convert chat messages to Gemini contents for the model returned by _llm_model()."""
+        if self.chat_session:
+            return self.chat_session.contents(messages)
+        # Stateless: the system prompt is folded into the first user turn
+        return build_contents(messages)
+
+    def _llm_model(self):
+        if self.chat_session and self.chat_session.model:
+            return self.chat_session.model
+        return self.model
+
+    @staticmethod
+    def _remaining(deadline_at: Optional[float]) -> float:
+        """Seconds left before a command's LLM deadline; a full deadline when none was set."""
+        return LLM_DEADLINE_SECONDS if deadline_at is None else deadline_at - time.time()
+
+    def _generate_reply(self, request: Tuple[List[Dict], float]) -> LLMReply:
+        """One blocking Gemini call for (contents, timeout). Raises on errors; run through self.llm_client."""
+        gemini_contents, timeout = request
+        response = self._llm_model().generate_content(gemini_contents, request_options={'timeout': timeout})
+        if self.chat_session:
+            self.chat_session.record_usage(response)
+        return parse_response(response)
+
+    def call_openrouter(self, messages: List[Dict], deadline_at: Optional[float] = None) -> LLMReply:
+        """Call the Gemini API for LLM completion. Errors come back as a reply whose text is an apology.
+
+        `deadline_at` (time.time()) is the command's deadline; without it the request gets a full LLM_DEADLINE_SECONDS.
+        """
+        if not self.gemini_api_key or not self.model:
+            self.logger.error("Gemini API key not set or model not initialized.")
+            self.last_llm_error = "not configured"
+            return LLMReply("I'm sorry, I can't process requests right now (AI service not configured).")
 
+        self.last_llm_error = None
+        gemini_contents = self._build_gemini_contents(messages)
         if not gemini_contents:
             self.logger.error("No user content found to send to Gemini.")
-            return "I'm sorry, I could not determine your query."
+            self.last_llm_error = "no content"
+            return LLMReply("I'm sorry, I could not determine your query.")
 
-        try:
-            # The gemini_contents list now has the system prompt baked into the first user turn.
-            # Call generate_content WITHOUT the system_instruction parameter.
-            response = self.model.generate_content(gemini_contents)
-            return response.text
+        remaining = self._remaining(deadline_at)
+        if remaining < LLM_MIN_ATTEMPT_SECONDS:
+            self.last_llm_error = LLMTimeout(f"only {max(remaining, 0.0):.1f}s left for the LLM request")
+            self.logger.warning(f"Gemini API request skipped: {self.last_llm_error}")
+            return LLMReply("I'm sorry, that took too long. Please try again.")
 
+        try:
+            return self.llm_client.request((gemini_contents, remaining), deadline=remaining)
+
+        except LLMCancelled as e:
+            self.last_llm_error = e
+            self.logger.info("LLM request cancelled.")
+            return LLMReply()
+        except LLMTimeout as e:
+            self.last_llm_error = e
+            self.logger.warning(f"Gemini API request timed out: {e}")
+            return LLMReply("I'm sorry, that took too long. Please try again.")
         except google.api_core.exceptions.NotFound as e:
+            self.last_llm_error = e
             self.logger.error(f"Gemini API request failed (NotFound): {e}", exc_info=True)
             configured_model_name_str = self.model.model_name if self.model else "None"
             try:
@@ -959,10 +1360,127 @@ Be natural and friendly in your responses, while being efficient with device con
                     self.logger.warning("The configured model was not found in the available list.")
             except Exception as list_models_exception:
                 self.logger.error(f"Failed to list available models: {list_models_exception}")
-            return f"I'm sorry, the AI model ('{configured_model_name_str}') could not be found or is not supported. Please check logs."
+            return LLMReply(f"I'm sorry, the AI model ('{configured_model_name_str}') could not be found or is not supported. Please check logs.")
         except Exception as e:
+            self.last_llm_error = e
             self.logger.error(f"Gemini API request failed: {e}", exc_info=True)
-            return f"I'm sorry, there was an error communicating with the AI service ({type(e).__name__}). Check library compatibility."
+            return LLMReply(f"I'm sorry, there was an error communicating with the AI service ({type(e).__name__}). Check library compatibility.")
+
+    def cancel_llm(self, reason: str = ""):
+        """Abandon LLM work in flight: blocking requests and any response still streaming."""
+        self._llm_cancel.set()
+        self.llm_client.cancel_all(reason)
+
+    def stream_openrouter(self, messages: List[Dict], deadline_at: Optional[float] = None) -> Iterator[Tuple[str, List]]:
+        """Stream a Gemini completion as (text, raw function calls) per chunk. Raises on API errors (unlike call_openrouter).
+
+        The stream is read through self.llm_client, so the deadline and
+        cancel_llm() apply while waiting for a chunk, not only between chunks.
+        """
+        if not self.gemini_api_key or not self.model:
+            raise RuntimeError("Gemini API key not set or model not initialized.")
+        gemini_contents = self._build_gemini_contents(messages)
+        if not gemini_contents:
+            raise ValueError("No user content found to send to Gemini.")
+        remaining = self._remaining(deadline_at)
+        if remaining <= 0:
+            raise LLMTimeout("no time left for the LLM stream")
+        model = self._llm_model()
+        chunks = self.llm_client.stream(
+            lambda: model.generate_content(gemini_contents, stream=True, request_options={'timeout': remaining}),
+            deadline=remaining)
+        chunk = None
+        for chunk in chunks:
+            if self._llm_cancel.is_set():
+                raise LLMCancelled("LLM stream cancelled")
+            text, calls = split_parts(chunk)
+            if text or calls:
+                yield text, calls
+        if self.chat_session and chunk is not None:
+            self.chat_session.record_usage(chunk)  # The last chunk carries the usage for the whole response
+
+    def _stream_llm_response(self, messages: List[Dict], deadline_at: Optional[float] = None) -> Tuple[LLMReply, str]:
+        """Stream the LLM response, speaking completed sentences as they arrive.
+
+        Returns (reply, text already queued for speech). Function calls are
+        collected from the chunks and parsed once the stream ends. Falls back
+        to a blocking call if streaming fails before anything was spoken; the
+        fallback only gets the time left before `deadline_at`. A cancelled
+        stream returns only the text received so far, without calls.
+        """
+        started = time.time()
+        self.last_llm_error = None
+        splitter = ResponseStreamSplitter()
+        raw_calls = []
+        channel = None
+        try:
+            for text, calls in self.stream_openrouter(messages, deadline_at):
+                if not splitter.raw and not raw_calls:
+                    self.speech_metrics.record('llm.first_token', time.time() - started)
+                raw_calls.extend(calls)
+                sentences = splitter.feed(text)
+                if sentences and channel is None:
+                    self.last_time_to_first_word = time.time() - started
+                    self.speech_metrics.record('llm.first_sentence', self.last_time_to_first_word)
+                    self.logger.info(f"Time to first word: {self.last_time_to_first_word * 1000:.0f} ms")
+                    channel = SentenceChannel()
+                    self.speak_async(channel)
+                for sentence in sentences:
+                    channel.put(sentence)
+            sentences = splitter.finish()
+            if sentences and channel is None:
+                channel = SentenceChannel()
+                self.speak_async(channel)
+            for sentence in sentences:
+                channel.put(sentence)
+        except LLMCancelled as e:
+            self.logger.info("Gemini stream cancelled.")
+            self.last_llm_error = e
+            return LLMReply(splitter.spoken), splitter.spoken
+        except Exception as e:
+            self.logger.error(f"Gemini streaming failed: {e}", exc_info=True)
+            self.last_llm_error = e
+            if not splitter.spoken:
+                return self.call_openrouter(messages, deadline_at), ""
+        finally:
+            if channel is not None:
+                channel.close()
+        self.speech_metrics.record('llm.total', time.time() - started)
+        return build_reply(splitter.raw, raw_calls), splitter.spoken
+
+
+    def _query_llm(self, messages: List[Dict]) -> Tuple[LLMReply, str]:
+        """Ask the LLM backends in the selector's order; the local model covers Gemini outages.
+
+        Returns (reply, text already queued for speech), like _stream_llm_response.
+        """
+        available = ['gemini'] + (['local'] if self.local_llm and self.local_llm.ready() else [])
+        reply, spoken_text = None, ""
+        deadline_at = time.time() + LLM_DEADLINE_SECONDS  # Shared by every backend tried for this command
+        for backend in self.llm_selector.order(available):
+            started = time.time()
+            if backend == 'local':
+                try:
+                    local_reply = self.local_llm.generate(
+                        messages, timeout=max(LLM_MIN_ATTEMPT_SECONDS, self._remaining(deadline_at)))
+                except LocalLLMError as e:
+                    self.logger.warning(f"Local LLM failed: {e}")
+                    self.llm_selector.record('local', time.time() - started, False)
+                    continue
+                self.llm_selector.record('local', time.time() - started, True)
+                self.logger.info(f"Answered by the local model in {(time.time() - started) * 1000:.0f} ms.")
+                return local_reply, ""
+
+            if self.llm_streaming_enabled:
+                reply, spoken_text = self._stream_llm_response(messages, deadline_at)
+            else:
+                reply, spoken_text = self.call_openrouter(messages, deadline_at), ""
+            if isinstance(self.last_llm_error, LLMCancelled):
+                return reply, spoken_text
+            self.llm_selector.record('gemini', time.time() - started, self.last_llm_error is None)
+            if self.last_llm_error is None or spoken_text:
+                return reply, spoken_text
+        return reply or LLMReply("I'm sorry, I can't reach my language model right now."), spoken_text
 
 
     def _switch_mode(self, args=None):
@@ -990,13 +1508,45 @@ Be natural and friendly in your responses, while being efficient with device con
             "firebase_connected": bool(self.user_id and self.firebase_rtdb_client),
             "devices_synced": bool(self.device_manager and self.device_manager.last_sync)
         }
+        if self.voice_manager and self.voice_manager.wake_word_detector:
+            status["wake_word"] = self.voice_manager.get_wake_word_stats()
+        if self.tts_cache:
+            status["tts_cache"] = self.tts_cache.get_stats()
+        if self.response_cache:
+            status["response_cache"] = self.response_cache.get_stats()
+        status["conversation"] = self.conversation.get_stats()
+        status["llm_client"] = self.llm_client.get_stats()
+        if self.chat_session:
+            status["chat_session"] = self.chat_session.get_stats()
+        status["llm_backends"] = self.llm_selector.get_stats()
+        if self.local_llm:
+            status["local_llm"] = self.local_llm.get_stats()
+        status["device_context"] = self.device_ranker.get_stats()
+        status["tts_engines"] = self.tts_engines.get_stats()
+        if self.phrase_bank:
+            status["phrase_bank"] = self.phrase_bank.get_stats()
+        status["speech_metrics"] = self.speech_metrics.get_stats()
+        total = self.command_stats['total']
+        status["local_intents"] = {
+            **self.command_stats,
+            "local_share": round(self.command_stats['local'] / total, 3) if total else 0.0,
+            "local_latency": self.local_command_latency.get_stats(),
+            "llm_latency": self.llm_command_latency.get_stats(),
+            "parser": self.intent_parser.get_stats() if self.intent_parser else None,
+        }
         return json.dumps(status, indent=2)
 
+    def _platform_metrics(self, args=None):
+        """Dump speech latency metrics to a JSON file"""
+        path = args[0] if args else SPEECH_METRICS_PATH_DEFAULT
+        return f"Speech metrics written to {self.speech_metrics.dump(path)}"
+
     def _platform_help(self, args=None):
         """Display available platform commands"""
         commands = {
             "switch": "Switch between assistant and platform modes",
             "status": "Display system status",
+            "metrics": "Write speech latency metrics to a file (metrics [path])",
             "help": "Show this help message",
             "reboot": "Reboot the system",
             "shutdown": "Shutdown the system"
@@ -1022,11 +1572,11 @@ Be natural and friendly in your responses, while being efficient with device con
 
     def process_platform_command(self, command_str):
         """Process commands in platform mode"""
-        parts = command_str.lower().strip().split()
+        parts = command_str.strip().split()
         if not parts:
             return "No command provided. Type 'help' for available commands."
 
-        command = parts[0]
+        command = parts[0].lower()  # Arguments (e.g. file paths) keep their case
         args = parts[1:] if len(parts) > 1 else None
 
         response = None
@@ -1101,115 +1651,57 @@ Be natural and friendly in your responses, while being efficient with device con
                 self.speak_or_print("Sorry, there was an error processing your platform command.")
                 return
 
+        self.cancel_llm("new command")  # Anything still in flight belongs to an older command
+        self._llm_cancel.clear()
+        self.last_llm_error = None
+        self.command_stats['total'] += 1
+        started = time.time()
+        if self._handle_local_intent(user_input, command_doc, command_ref, started):
+            return
+
         # Continue with normal command processing
         self.logger.info(f"User command: {user_input}")
-        self.conversation_history.append({"role": "user", "content": user_input})
-
-        current_conversation = [self.conversation_history[0]] + self.conversation_history[-12:]
 
-        ai_response_raw = self.call_openrouter(current_conversation)
-        self.logger.info(f"LLM Raw Response: {ai_response_raw}")
-
-        human_readable_response = ai_response_raw
+        # Looked up first so a hit skips building the request; keyed on the previous question for follow-ups
+        cacheable = self.response_cache is not None and is_cacheable_query(user_input)
+        previous_question = self.conversation.last_user_turn()
+        fingerprint = device_state_fingerprint(self.device_manager.get_device_index()) if self.device_manager else ""
+        cached_reply = self.response_cache.get(user_input, fingerprint, previous_question) if cacheable else None
+        self.conversation.add("user", user_input)
+        if cached_reply:
+            self.logger.info("Answered from the response cache.")
+            reply, spoken_text = cached_reply, ""
+        else:
+            current_conversation = self.conversation.build_messages(
+                self._device_context(user_input), inline_context=self.chat_session is not None)
+            reply, spoken_text = self._query_llm(current_conversation)
+        self.logger.info(f"LLM response: {reply.text!r}, tool calls: {reply.calls}")
+        if isinstance(self.last_llm_error, LLMCancelled):
+            # The user interrupted: keep what was said, skip tool calls and the rest of the answer
+            interrupted_response = reply.text or "(interrupted)"
+            command_doc.update({
+                'ai_response': interrupted_response,
+                'interrupted': True,
+                'emotion_displayed': self.emotion_display.current_emotion if self.emotion_display else None
+            })
+            command_ref.set(command_doc)
+            self.llm_command_latency.record(time.time() - started)
+            self.conversation.add("assistant", interrupted_response)
+            return
 
-        if "DEVICE_CONTROL:" in ai_response_raw:
-            try:
-                control_part = ai_response_raw.split("DEVICE_CONTROL:")[1].strip()
-                json_start_index = control_part.find('{')
-                json_end_index = control_part.rfind('}')
-
-                if json_start_index != -1 and json_end_index != -1 and json_start_index < json_end_index:
-                    json_str = control_part[json_start_index : json_end_index+1]
-                    self.logger.debug(f"Extracted JSON for device control: {json_str}")
-                    control_data_list = json.loads(json_str)
-                    human_readable_response = ai_response_raw.split("DEVICE_CONTROL:")[0].strip()
-
-                    if not isinstance(control_data_list, list):
-                        control_data_list = [control_data_list]
-
-                    control_feedback_parts = []
-                    for control_data in control_data_list:
-                        if isinstance(control_data, dict):
-                            device_name_or_id = control_data.get('device', '')
-                            action = control_data.get('action', '')
-                            value = control_data.get('value', None)
-
-                            if device_name_or_id and action:
-                                success, msg = self._execute_device_command(device_name_or_id, action, value)
-                                control_feedback_parts.append(msg)
-                            else:
-                                control_feedback_parts.append(f"Skipped invalid control command: {control_data}")
-                        else:
-                             control_feedback_parts.append(f"Skipped non-dict control entry: {control_data}")
+        # Device control has side effects, so those responses are always generated fresh; local answers are stopgaps
+        if cacheable and not cached_reply and not self.last_llm_error and not reply.has_side_effects and not reply.errors \
+                and reply.source != "local":
+            self.response_cache.put(user_input, fingerprint, reply, previous_question)
 
-                    feedback_summary = ". ".join(control_feedback_parts)
-                    if not human_readable_response:
-                        human_readable_response = feedback_summary if feedback_summary else "Okay, I've processed that."
-                    else:
-                         human_readable_response += f" ({feedback_summary})"
-                else:
-                    self.logger.warning("DEVICE_CONTROL found, but JSON block is malformed or missing.")
-                    if "DEVICE_CONTROL:" in human_readable_response:
-                         human_readable_response = human_readable_response.split("DEVICE_CONTROL:")[0].strip()
-
-            except json.JSONDecodeError as e:
-                self.logger.error(f"Error parsing JSON from LLM for device control: {e}. Raw part: '{control_part}'")
-                human_readable_response = ai_response_raw.split("DEVICE_CONTROL:")[0].strip()
-                human_readable_response += " (I tried to control a device but had trouble understanding the details.)"
-            except Exception as e:
-                self.logger.error(f"Error processing device control instructions: {e}", exc_info=True)
-                human_readable_response += " (An error occurred while trying to control a device.)"
-
-        if "SERVICE_REQUEST:" in ai_response_raw:
-            try:
-                service_part = ai_response_raw.split("SERVICE_REQUEST:")[1].strip()
-                json_start = service_part.find('{')
-                json_end = service_part.rfind('}')
-                if json_start != -1 and json_end != -1:
-                    service_data = json.loads(service_part[json_start:json_end+1])
-                    service_type = service_data.get('service')
-                    params = service_data.get('params', {})
-
-                    service_response = None
-                    if service_type == 'weather':
-                        if 'city' in params:
-                            service_response = self.weather_service.get_weather(city=params['city'])
-                        elif 'location' in user_input.lower():
-                            # If user asks for "my location" or "current location"
-                            try:
-                                location = self.location_service.get_location()
-                                if location and isinstance(location, dict):
-                                    service_response = self.weather_service.get_weather(
-                                        lat=location.get('latitude'),
-                                        lon=location.get('longitude')
-                                    )
-                                else:
-                                    service_response = self.weather_service.get_weather(city="London")  # Default fallback
-                            except Exception as e:
-                                self.logger.error(f"Error getting location for weather: {e}")
-                                service_response = "I couldn't determine your location. Please specify a city name."
-                    elif service_type == 'news':
-                        service_response = self.news_service.get_news(
-                            country=params.get('country', 'us'),
-                            category=params.get('category'),
-                            max_articles=params.get('max_articles', 5)
-                        )
-                    elif service_type == 'joke':
-                        service_response = self.joke_service.get_joke()
-                    elif service_type == 'location':
-                        service_response = self.location_service.get_location()
-
-                    if service_response:
-                        human_readable_response = service_response
-                        # Update conversation history with the actual response
-                        self.conversation_history[-1]["content"] = human_readable_response
-
-            except json.JSONDecodeError as e:
-                self.logger.error(f"Error parsing service request JSON: {e}")
-                human_readable_response = "I had trouble understanding the service request format."
-            except Exception as e:
-                self.logger.error(f"Error processing service request: {e}")
-                human_readable_response = f"Sorry, I had trouble with that request: {str(e)}"
+        additions = []  # Spoken after the model's own text: tool results, notes
+        if reply.calls:
+            additions = [result for result in self._dispatch_tool_calls(reply.calls, user_input) if result]
+        if reply.errors and not reply.calls:
+            additions.append("I had trouble understanding the details of that request.")
+        human_readable_response = " ".join([reply.text.strip()] + additions).strip()
+        if not human_readable_response:
+            human_readable_response = "Okay, I've processed that."
 
         # Show appropriate emotion based on response type
         if self.emotion_display:
@@ -1233,24 +1725,172 @@ Be natural and friendly in your responses, while being efficient with device con
             'emotion_displayed': self.emotion_display.current_emotion if self.emotion_display else None
         })
         command_ref.set(command_doc)
+        self.llm_command_latency.record(time.time() - started)
+
+        # Bookkeeping below runs while the response plays; the main loop waits before listening again
+        if spoken_text:
+            # Streamed sentences are already queued; only unstreamed text and device feedback etc. remain
+            unspoken = unspoken_remainder(reply.text, spoken_text)
+            if unspoken is None:
+                self.logger.warning("Streamed text does not match the final reply; not repeating it.")
+                unspoken = ""
+            remainder = " ".join([unspoken] + additions).strip()
+            if remainder:
+                self.speak_async(remainder)
+        else:
+            self.speak_async(human_readable_response)
+        self.conversation.add("assistant", human_readable_response)
+
+    def _handle_local_intent(self, user_input: str, command_doc: Dict, command_ref, started: float) -> bool:
+        """Execute a locally parsed device command without the LLM. Returns False if the parser is not confident."""
+        if not self.intent_parser:
+            return False
+        commands = self.intent_parser.parse(user_input)
+        if not commands:
+            return False
+
+        results = self._execute_device_commands([(cmd['device'], cmd['action'], cmd['value']) for cmd in commands])
+        response = " ".join(msg for _, msg in results)
+        elapsed = time.time() - started
+        self.command_stats['local'] += 1
+        self.local_command_latency.record(elapsed)
+        self.logger.info(f"Handled locally in {elapsed * 1000:.0f} ms: {commands}")
+
+        if self.emotion_display:
+            self.emotion_display.trigger_emotion('success' if all(ok for ok, _ in results) else 'error')
+        command_doc.update({
+            'ai_response': response,
+            'handled_locally': True,
+            'emotion_displayed': self.emotion_display.current_emotion if self.emotion_display else None
+        })
+        command_ref.set(command_doc)
 
-        self.speak_or_print(human_readable_response)
-        self.conversation_history.append({"role": "assistant", "content": human_readable_response})
+        self.speak_async(response)
+        # Keep the exchange in the history so follow-ups to the LLM have context
+        self.conversation.add("user", user_input)
+        self.conversation.add("assistant", response)
+        return True
 
-        if len(self.conversation_history) > 13:
-            self.conversation_history = [self.conversation_history[0]] + self.conversation_history[-12:]
+    def _dispatch_tool_calls(self, calls: List[ToolCall], user_input: str) -> List[str]:
+        """Run the tool calls of one reply concurrently; results come back in call order.
+
+        All device calls go out as one batch (a single RTDB write) next to the service calls.
+        """
+        device_calls = [call for call in calls if isinstance(call, DeviceCall)]
+        device_batch = None
+        if device_calls:
+            device_batch = self.tool_executor.submit(
+                self._execute_device_commands, [(call.device, call.action, call.value) for call in device_calls])
+        service_futures = {id(call): self.tool_executor.submit(self._run_tool_call, call, user_input)
+                           for call in calls if not isinstance(call, DeviceCall)}
+        try:
+            device_results = iter(device_batch.result()) if device_batch else iter(())
+        except Exception as e:
+            self.logger.error(f"Device batch failed: {e}", exc_info=True)
+            device_results = iter([(False, "An error occurred while trying to control a device.")] * len(device_calls))
+        return [next(device_results)[1] if isinstance(call, DeviceCall) else service_futures[id(call)].result()
+                for call in calls]
+
+    def _run_tool_call(self, call: ToolCall, user_input: str) -> Optional[str]:
+        """Text to speak for one service call (device calls are batched in _dispatch_tool_calls)."""
+        try:
+            response = self._get_service_response(call.service, call.params, user_input)
+            return str(response) if response else None
+        except Exception as e:
+            self.logger.error(f"Tool call {call} failed: {e}", exc_info=True)
+            return f"Sorry, I had trouble with that request: {str(e)}"
+
+    def _get_service_response(self, service_type: str, params: Dict, user_input: str):
+        """Answer a service call, reusing speculative prefetches when they match."""
+        service_response = None
+        if service_type == 'weather':
+            if 'city' in params:
+                service_response = self.weather_service.get_weather(city=params['city'])
+            else:
+                # No city: the weather where Beemo is
+                try:
+                    service_response = self._prefetched('weather') or self._fetch_current_location_weather()
+                except Exception as e:
+                    self.logger.error(f"Error getting location for weather: {e}")
+                    service_response = "I couldn't determine your location. Please specify a city name."
+        elif service_type == 'news':
+            if not params.get('category') and params.get('country', 'us') == 'us' and params.get('max_articles', 5) == 5:
+                service_response = self._prefetched('news')
+            if not service_response:
+                service_response = self.news_service.get_news(
+                    country=params.get('country', 'us'),
+                    category=params.get('category'),
+                    max_articles=params.get('max_articles', 5)
+                )
+        elif service_type == 'joke':
+            service_response = self._prefetched('joke') or self.joke_service.get_joke()
+        elif service_type == 'location':
+            service_response = self._prefetched('location') or self.location_service.get_location()
+        return service_response
 
     def _execute_device_command(self, device_name_or_id: str, action: str, value: Any) -> Tuple[bool, str]:
         """Executes a command on a device."""
+        return self._execute_device_commands([(device_name_or_id, action, value)])[0]
+
+    def _execute_device_commands(self, commands: List[Tuple[str, str, Any]]) -> List[Tuple[bool, str]]:
+        """Execute several device commands with a single RTDB round trip.
+
+        Every (device, action, value) is resolved and validated first; the
+        valid ones are then written in one multi-path update under the user's
+        device_states. Returns a (success, message) per command, in order.
+        """
         if not self.device_manager:
-            return False, "Device manager not available."
+            return [(False, "Device manager not available.")] * len(commands)
+
+        all_devices = self._all_devices()
+        results = [None] * len(commands)
+        pending = []  # (index, device, state updates, success message)
+        for i, (device_name_or_id, action, value) in enumerate(commands):
+            resolved = self._resolve_device_command(device_name_or_id, action, value, all_devices)
+            if isinstance(resolved, str):
+                results[i] = (False, resolved)
+            else:
+                pending.append((i,) + resolved)
+        if not pending:
+            return results
 
-        target_device = None
-        all_devices = [] # Build a flat list of all devices for easier ID lookup
+        multi_path_update = {}
+        for _, target_device, state_updates, _ in pending:
+            for field_name, field_value in state_updates.items():
+                multi_path_update[f"{target_device['location_id']}/{target_device['id']}/{field_name}"] = field_value
+
+        started = time.time()
+        try:
+            self.firebase_rtdb_client.reference(f'device_states/{self.user_id}').update(multi_path_update)
+        except Exception as e:
+            names = ", ".join(dev['name'] for _, dev, _, _ in pending)
+            self.logger.error(f"Failed to update device state in Firebase for {names}: {e}", exc_info=True)
+            for i, target_device, _, _ in pending:
+                results[i] = (False, f"Failed to control {target_device['name']} due to a database error.")
+            return results
+        self.speech_metrics.record('device.update', time.time() - started)
+
+        for i, target_device, state_updates, success_msg in pending:
+            self.logger.info(f"Successfully updated state for {target_device['name']}: {state_updates}")
+            target_device.setdefault('state', {}).update(state_updates)
+            self.device_ranker.record_use(target_device['id'])
+            results[i] = (True, success_msg)
+        if len(pending) > 1:
+            self.logger.info(f"Updated {len(pending)} devices in one RTDB write ({(time.time() - started) * 1000:.0f} ms).")
+        return results
+
+    def _all_devices(self) -> List[Dict]:
+        """Flat list of all cached devices with their location_id, sharing the cached state dicts."""
+        all_devices = []
         for loc_id, loc_data in self.device_manager.locations_cache.items():
             for dev_id, dev_data in loc_data['devices'].items():
                 all_devices.append({'id': dev_id, 'location_id': loc_id, **dev_data}) # Add location_id here
+        return all_devices
 
+    def _resolve_device_command(self, device_name_or_id: str, action: str, value: Any,
+                                all_devices: List[Dict]) -> Union[str, Tuple[Dict, Dict, str]]:
+        """Find the target device and the state change for one command. Returns an error message on failure."""
+        target_device = None
         for dev in all_devices:
             if dev['id'] == device_name_or_id:
                 target_device = dev
@@ -1259,8 +1899,14 @@ Be natural and friendly in your responses, while being efficient with device con
         if not target_device:
             matching_devices = self.device_manager.find_devices_by_name(device_name_or_id)
             if not matching_devices:
-                return False, f"Device '{device_name_or_id}' not found."
-            if len(matching_devices) > 1:
+                return f"Device '{device_name_or_id}' not found."
+            # Devices the user named: resolved from the partial transcript and confirmed by the final one
+            spoken = [dev for dev in matching_devices if dev['id'] in self._speculation['devices']]
+            if len(matching_devices) > 1 and len(spoken) == 1:
+                target_device = spoken[0]
+                self.logger.info(f"Multiple devices match '{device_name_or_id}'; using '{target_device['name']}', "
+                                 f"which the user named.")
+            elif len(matching_devices) > 1:
                 target_device = matching_devices[0]
                 self.logger.warning(f"Multiple devices match '{device_name_or_id}', using first match: {target_device['name']}")
             else:
@@ -1271,7 +1917,7 @@ Be natural and friendly in your responses, while being efficient with device con
         location_id = target_device.get('location_id')
         if not location_id:
              self.logger.error(f"Could not determine location_id for device {device_id}. Aborting command.")
-             return False, f"Internal error: Missing location for device {target_device['name']}."
+             return f"Internal error: Missing location for device {target_device['name']}."
         device_friendly_name = target_device['name']
 
         self.logger.info(f"Executing action '{action}' on device '{device_friendly_name}' (ID: {device_id}) with value '{value}'")
@@ -1295,16 +1941,16 @@ Be natural and friendly in your responses, while being efficient with device con
                         state_updates['isOn'] = True
                     success_msg = f"Set brightness of {device_friendly_name} to {brightness_val}%."
                 else:
-                    return False, "Brightness value must be between 0 and 100."
+                    return "Brightness value must be between 0 and 100."
             except (ValueError, TypeError):
-                return False, "Invalid brightness value. Must be a number."
+                return "Invalid brightness value. Must be a number."
         elif action == "set_temperature" and target_device['type'] == 'thermostat':
             try:
                 temp_val = float(value)
                 state_updates['thermostatTemperatureSetpoint'] = temp_val
                 success_msg = f"Set {device_friendly_name} to {temp_val}°C."
             except (ValueError, TypeError):
-                return False, "Invalid temperature value."
+                return "Invalid temperature value."
         elif action == "lock" and target_device['type'] == 'lock':
             state_updates['isLocked'] = True
             success_msg = f"Locked {device_friendly_name}."
@@ -1312,111 +1958,212 @@ Be natural and friendly in your responses, while being efficient with device con
             state_updates['isLocked'] = False
             success_msg = f"Unlocked {device_friendly_name}."
         else:
-            return False, f"Action '{action}' is not supported for device type '{target_device['type']}' or is unknown."
+            return f"Action '{action}' is not supported for device type '{target_device['type']}' or is unknown."
 
         if not state_updates:
-            return False, "No valid state update derived from command."
+            return "No valid state update derived from command."
+        return target_device, state_updates, success_msg
 
-        try:
-            device_ref = self.firebase_rtdb_client.reference(f'device_states/{self.user_id}/{location_id}/{device_id}')
-            device_ref.update(state_updates)
-            self.logger.info(f"Successfully updated state for {device_friendly_name}: {state_updates}")
-            if self.device_manager and target_device:
-                target_device.get('state', {}).update(state_updates)
+    def speak_or_print(self, text: str) -> bool:
+        """Speak text through the TTS engines, streaming sentence by sentence. Blocks until done."""
+        self.logger.info(f"Beemo says: {text}")
 
-            return True, success_msg
-        except Exception as e:
-            self.logger.error(f"Failed to update device {device_friendly_name} state in Firebase: {e}", exc_info=True)
-            return False, f"Failed to control {device_friendly_name} due to a database error."
+        if not text.strip():
+            return True
 
+        return self._speak_sentences(split_sentences(text), text)
 
-    def speak_or_print(self, text: str):
-        """Speak text using Google Text-to-Speech with direct playback."""
-        self.logger.info(f"Beemo says: {text}")
+    def speak_async(self, text: Union[str, Iterable[str]], priority: int = PRIORITY_NORMAL) -> concurrent.futures.Future:
+        """Queue text for speech and return at once.
 
-        if not text.strip():
-            return
+        `text` may also be an iterable of sentences still being produced (e.g. a
+        SentenceChannel fed from a streaming LLM response). The Future resolves
+        to True if everything was played to the end, False if it was
+        interrupted or failed. Lower priorities are spoken first.
+        """
+        return self.speech_queue.submit(text, priority)
+
+    def _speak_item(self, item: Union[str, Iterable[str]]) -> bool:
+        if isinstance(item, str):
+            return self.speak_or_print(item)
+        return self._speak_sentences(item)
 
-        temp_file = None
-        p = None
-        stream = None
+    def _wait_for_speech(self):
+        """Block until queued and ongoing speech has finished, e.g. before listening."""
+        self.speech_queue.wait_idle()
+        with self.tts_lock:
+            pass
+
+    def _synthesize_segment(self, text: str) -> Tuple[AudioSegment, bool]:
+        """Audio for one sentence and whether it was cached: phrase-bank assembly first, then cached or fresh TTS."""
+        if self.phrase_bank:
+            started = time.time()
+            assembled = self.phrase_bank.assemble(text)
+            if assembled is not None:
+                self.speech_metrics.record('speech.assemble', time.time() - started, cache_hit=True)
+                return assembled, True
+        timings = {}
+        audio_segment = self._synthesize_tts(text, timings)
+        cache_hit = timings.pop('cache_hit')
+        for stage, seconds in timings.items():
+            self.speech_metrics.record(f'speech.{stage}', seconds, cache_hit)
+        return audio_segment, cache_hit
+
+    def _synthesize_tts(self, text: str, timings: Optional[Dict] = None) -> AudioSegment:
+        """Synthesize text to an AudioSegment, using the TTS cache when possible.
+
+        `timings` receives 'cache_hit' and the seconds spent per stage.
+        """
+        timings = {} if timings is None else timings
+        candidates = self.tts_engines.candidates()
+        if self.tts_cache:
+            # Cached audio from a preferred engine beats fresh audio from a fallback one
+            for engine in self.tts_engines.engines:
+                cached = self.tts_cache.get(self._tts_cache_key(text, engine))
+                if cached:
+                    # Cached as decoded WAV: no network and no ffmpeg decode
+                    started = time.time()
+                    audio_segment = AudioSegment.from_file(io.BytesIO(cached[0]), format=cached[1])
+                    timings.update(cache_hit=True, decode=time.time() - started)
+                    return audio_segment
+                if engine is candidates[0]:
+                    break
+
+        timings['cache_hit'] = False
+        audio_segment, engine = self.tts_engines.synthesize(text, candidates, timings)
+        # Convert and level once here, so cached and fresh clips play without per-play conversion
+        started = time.time()
+        audio_segment = normalize_clip(audio_segment, self.audio_output.rate)
+        timings['normalize'] = time.time() - started
+
+        if self.tts_cache:
+            wav_buffer = io.BytesIO()
+            audio_segment.export(wav_buffer, format='wav')
+            self.tts_cache.put(self._tts_cache_key(text, engine), wav_buffer.getvalue(), 'wav')
+        return audio_segment
+
+    def _tts_cache_key(self, text: str, engine) -> str:
+        # Entries are stored normalised to the output format, which is part of the key
+        return TTSCache.make_key(text, 'en', engine.voice, engine.name, profile=f"s16-mono-{self.audio_output.rate}-norm")
+
+    def _speak_sentences(self, sentences: Iterable[str], text: str = "") -> bool:
+        """Queue sentences on the audio output as they are synthesized; N+1 is synthesized while N plays.
 
+        Returns True if every sentence was played to the end.
+        """
         with self.tts_lock:  # Block other speech or listening while TTS is running
+            started = time.time()
+            handles = []
+            completed = True
+            all_cached = True
+            barge_in, playback_done, monitor = self._start_barge_in_monitor()
+            synthesis = self.streaming_synthesizer.stream(sentences)
             try:
-                # Create gTTS instance
-                tts = gTTS(text=text, lang='en')
-
-                # Create a temporary file for the audio
-                temp_file = tempfile.NamedTemporaryFile(suffix='.mp3', delete=False)
-                temp_filename = temp_file.name
-                temp_file.close()  # Close the file handle immediately
-
-                # Save the speech to the temporary file
-                tts.save(temp_filename)
-
-                # Load the audio file with pydub
-                audio_segment = AudioSegment.from_mp3(temp_filename)
-
-                # Initialize PyAudio
-                p = pyaudio.PyAudio()
-                stream = p.open(
-                    format=p.get_format_from_width(audio_segment.sample_width),
-                    channels=audio_segment.channels,
-                    rate=audio_segment.frame_rate,
-                    output=True
-                )
+                for sentence, result in synthesis:
+                    if barge_in.is_set():
+                        break
+                    if result is None:
+                        print(f"Beemo (TTS Error): {sentence}")
+                        completed = False
+                        continue
+                    audio_segment, cache_hit = result
+                    all_cached = all_cached and cache_hit
+                    handles.append(self.audio_output.play(self.audio_output.segment_to_pcm(audio_segment)))
+
+                # Wait for the last sentence to finish; the barge-in monitor stops playback itself
+                while handles and not handles[-1].wait(timeout=0.05):
+                    if barge_in.is_set():
+                        break
 
-                # Play audio in chunks
-                audio_chunks = make_chunks(audio_segment, 250)  # 250ms chunks
-                for chunk in audio_chunks:
-                    stream.write(chunk._data)
+                if barge_in.is_set():
+                    self.barge_in_count += 1
+                    self.cancel_llm("barge-in")  # Stop generating the rest of an interrupted answer
+                    self.speech_queue.cancel_pending()  # Queued speech (e.g. tool results) belongs to the interrupted answer
+                    self.logger.info("Playback interrupted by user speech.")
+                completed = completed and not barge_in.is_set() and all(h.completed for h in handles)
+
+                first_audio_at = next((h.first_write_at for h in handles if h.first_write_at), None)
+                if first_audio_at:
+                    self.last_time_to_first_audio = first_audio_at - started
+                    self.speech_metrics.record('speech.first_chunk', self.last_time_to_first_audio, all_cached)
+                    self.logger.info(f"Time to first audio: {self.last_time_to_first_audio * 1000:.0f} ms")
+                if completed and handles:
+                    self.speech_metrics.record('speech.total', time.time() - started, all_cached)
 
             except Exception as e:
-                self.logger.error(f"TTS (gTTS) processing/playback error: {e}", exc_info=True)
+                self.logger.error(f"TTS processing/playback error: {e}", exc_info=True)
                 print(f"Beemo (TTS Error): {text}")
+                self.audio_output.stop()
+                completed = False
             finally:
-                # Clean up resources in reverse order of creation
-                if stream:
-                    stream.stop_stream()
-                    stream.close()
-                if p:
-                    p.terminate()
-                # Wait a tiny bit before trying to delete the file
-                time.sleep(0.1)
-                if temp_file:
-                    try:
-                        os.unlink(temp_filename)
-                    except Exception as e:
-                        self.logger.warning(f"Could not delete temporary file {temp_filename}: {e}")
+                synthesis.close()  # Stop synthesizing sentences that will not be played
+                playback_done.set()
+                if monitor:
+                    # The ring reader is not thread-safe: the monitor must stop reading before the listener resumes
+                    monitor.join(timeout=1.0)
+                if self.voice_manager and not barge_in.is_set():
+                    self.voice_manager.discard_pending_audio()
             print("Beemo finished speaking.")  # Print after TTS playback is complete
+        return completed
+
+    def _start_barge_in_monitor(self) -> Tuple[threading.Event, threading.Event, Optional[threading.Thread]]:
+        """Start watching the microphone for user speech while audio plays.
+
+        Returns the barge-in and playback-done events and the monitor thread
+        (None if barge-in is off), which the caller joins after setting playback_done.
+        """
+        barge_in = threading.Event()
+        playback_done = threading.Event()
+        thread = None
+        if self.barge_in_enabled and self.voice_manager and self.voice_manager.is_listening \
+                and not self.voice_manager.command_in_progress:
+            def monitor():
+                self.voice_manager.monitor_barge_in(
+                    playback_done, barge_in, lambda: self.audio_output.current_level, self.ECHO_COUPLING)
+                if barge_in.is_set():
+                    self.audio_output.stop()  # Cut playback within one output chunk
+
+            thread = threading.Thread(target=monitor, name="barge-in-monitor", daemon=True)
+            thread.start()
+        return barge_in, playback_done, thread
+
+    def _load_boot_sound_pcm(self) -> Tuple[bytes, bool]:
+        """Boot sound as output-format PCM, and whether it came from the PCM cache.
+
+        The MP3 is decoded and normalised once; the PCM is kept next to it and
+        reused until the MP3 changes.
+        """
+        pcm_path = f"{os.path.splitext(BOOT_SOUND_PATH)[0]}.{self.audio_output.rate}.pcm"
+        if os.path.exists(pcm_path) and os.path.getmtime(pcm_path) >= os.path.getmtime(BOOT_SOUND_PATH):
+            with open(pcm_path, 'rb') as f:
+                return f.read(), True
+
+        with open(BOOT_SOUND_PATH, 'rb') as f:
+            audio_segment = normalize_clip(decode_mp3_bytes(f.read()), self.audio_output.rate)
+        pcm = self.audio_output.segment_to_pcm(audio_segment)
+        try:
+            with open(pcm_path + ".tmp", 'wb') as f:
+                f.write(pcm)
+            os.replace(pcm_path + ".tmp", pcm_path)
+        except OSError as e:
+            self.logger.warning(f"Could not cache decoded boot sound: {e}")
+        return pcm, False
 
     def play_boot_sound(self):
         """Play boot sound on startup"""
-        boot_sound_path = "/home/pi/beemo/robot/boot.mp3"
-        if not os.path.exists(boot_sound_path):
-            self.logger.warning(f"Boot sound file not found at {boot_sound_path}")
+        if not os.path.exists(BOOT_SOUND_PATH):
+            self.logger.warning(f"Boot sound file not found at {BOOT_SOUND_PATH}")
             return
 
         try:
-            audio_segment = AudioSegment.from_mp3(boot_sound_path)
-            p = pyaudio.PyAudio()
-            stream = p.open(
-                format=p.get_format_from_width(audio_segment.sample_width),
-                channels=audio_segment.channels,
-                rate=audio_segment.frame_rate,
-                output=True
-            )
-
-            try:
-                # Play audio in chunks
-                audio_chunks = make_chunks(audio_segment, 250)
-                for chunk in audio_chunks:
-                    stream.write(chunk._data)
-            finally:
-                stream.stop_stream()
-                stream.close()
-                p.terminate()
-
+            started = time.time()
+            pcm, cache_hit = self._load_boot_sound_pcm()
+            self.speech_metrics.record('boot.decode', time.time() - started, cache_hit)
+            handle = self.audio_output.play(pcm)
+            handle.wait()
+            if handle.first_write_at:
+                self.speech_metrics.record('boot.first_chunk', handle.first_write_at - started)
+            self.speech_metrics.record('boot.total', time.time() - started)
         except Exception as e:
             self.logger.error(f"Error playing boot sound: {e}", exc_info=True)
 
@@ -1424,10 +2171,10 @@ Be natural and friendly in your responses, while being efficient with device con
         """Main loop for the AI to listen and respond."""
         if not self.user_id:
             self.logger.error("User not authenticated. AI cannot run.")
-            self.speak_or_print("I'm sorry, I couldn't log you in. Please check the configuration.")
+            self.speak_async("I'm sorry, I couldn't log you in. Please check the configuration.", PRIORITY_URGENT).result()
             return
 
-        # Start with bootup animation and sound
+        # Start with bootup animation (the boot sound already played during initialization)
         if self.emotion_display:
             try:
                 self.emotion_display.startup_sequence()
@@ -1436,22 +2183,20 @@ Be natural and friendly in your responses, while being efficient with device con
             except Exception as e:
                 self.logger.error(f"Error during emotion display startup: {e}")
 
-        # Play boot sound
-        self.play_boot_sound()
-
-        self.speak_or_print(f"Hello! I'm Beemo, your smart home assistant. How can I help you today?")
+        # Greet while the microphone is being opened; the loop waits for speech before listening
+        self.speak_async("Hello! I'm Beemo, your smart home assistant. How can I help you today?", PRIORITY_LOW)
 
         if self.voice_manager:
             if not self.voice_manager.start_listening():
-                self.speak_or_print("Warning: I'm having trouble accessing the microphone for continuous listening.")
+                self.speak_async("Warning: I'm having trouble accessing the microphone for continuous listening.", PRIORITY_LOW)
                 if self.emotion_display:
                     self.emotion_display.display_animation('sad', loop=1)
             else:
-                self.speak_or_print("I'm listening for your commands.")
+                self.speak_async("I'm listening for your commands.", PRIORITY_LOW)
                 if self.emotion_display:
                     self.emotion_display.display_animation('happy', loop=1)
         else:
-            self.speak_or_print("Voice input is not available. Please use text input.")
+            self.speak_async("Voice input is not available. Please use text input.", PRIORITY_LOW)
             if self.emotion_display:
                 self.emotion_display.display_animation('neutral', loop=1)
 
@@ -1466,21 +2211,27 @@ Be natural and friendly in your responses, while being efficient with device con
                     if self.voice_manager and self.voice_manager.is_listening:
                         self.logger.info("Waiting for voice command...")
                         # Block listening while TTS is running
-                        with self.tts_lock:
-                            pass  # Wait for any ongoing TTS to finish before listening
-                        command_text = self.voice_manager.listen_for_command(timeout=15)
+                        self._wait_for_speech()
+                        if self.speculator:
+                            self.speculator.begin()
+                        command_text = self.voice_manager.listen_for_command(
+                            timeout=15,
+                            partial_callback=self.speculator.on_partial if self.speculator else None
+                        )
                         if command_text:
                             user_input = command_text
+                            if self.speculator:
+                                self._speculation = self.speculator.commit(command_text)
                         else:
+                            if self.speculator:
+                                self.speculator.discard()
                             continue
                     else:
                         # For text input, also block until TTS is done
-                        with self.tts_lock:
-                            pass
+                        self._wait_for_speech()
                         user_input = input("You: ").strip()
                 else:  # Platform mode
-                    with self.tts_lock:
-                        pass
+                    self._wait_for_speech()
                     user_input = input("platform> ").strip()
 
                 if not user_input:
@@ -1500,6 +2251,7 @@ Be natural and friendly in your responses, while being efficient with device con
                         self.running = False
                         break
                     self.process_command(user_input)
+                    self._speculation = {'devices': {}, 'services': {}}
                 else:  # Platform mode
                     if user_input.lower() in ["exit", "quit"]:
                         response = self._switch_mode()  # Switch back to assistant mode
@@ -1543,13 +2295,17 @@ Be natural and friendly in your responses, while being efficient with device con
                 if remote_cmd == "restart":
                     self.logger.info("Remote restart command received from app.")
                     self._save_beemo_status_to_firestore(online=False, last_command="restart")
-                    self.speak_or_print("Restarting as requested from the app.")
+                    self.cancel_llm("remote restart")
+                    self.speech_queue.cancel_pending()
+                    self.speak_async("Restarting as requested from the app.", PRIORITY_URGENT)
                     self.shutdown()
                     os.execv(sys.executable, ['python'] + sys.argv)
                 elif remote_cmd == "shutdown":
                     self.logger.info("Remote shutdown command received from app.")
                     self._save_beemo_status_to_firestore(online=False, last_command="shutdown")
-                    self.speak_or_print("Shutting down as requested from the app.")
+                    self.cancel_llm("remote shutdown")
+                    self.speech_queue.cancel_pending()
+                    self.speak_async("Shutting down as requested from the app.", PRIORITY_URGENT)
                     self.running = False
                     self.shutdown()
                     os._exit(0)
@@ -1631,10 +2387,40 @@ Be natural and friendly in your responses, while being efficient with device con
                 self.emotion_display.trigger_emotion('shutdown')
                 time.sleep(1)  # Give time for shutdown animation
                 self.emotion_display.cleanup()
-                GPIO.cleanup()  # Clean up GPIO
+                if GPIO:
+                    GPIO.cleanup()  # Clean up GPIO
             except Exception as e:
                 self.logger.error(f"Error cleaning up emotion display: {e}")
 
+        if self.speculator:
+            self.speculator.shutdown()
+            self.speculator = None
+        with self._phrase_bank_lock:
+            if self._phrase_bank_timer:
+                self._phrase_bank_timer.cancel()
+
+        if self.tts_cache:
+            self.logger.info(f"TTS cache stats: {self.tts_cache.get_stats()}")
+        self.logger.info(f"TTS engine stats: {self.tts_engines.get_stats()}")
+        try:
+            self.speech_metrics.dump(SPEECH_METRICS_PATH_DEFAULT)
+        except OSError as e:
+            self.logger.warning(f"Could not write speech metrics: {e}")
+        # Pending speech (e.g. a goodbye) is drained first: it still needs the TTS engines and audio output
+        if self.speech_queue:
+            self.speech_queue.close(timeout=10.0)
+
+        self.tts_engines.shutdown()
+        self.tool_executor.shutdown(wait=False)
+        self.llm_client.close()
+        if self.chat_session:
+            self.chat_session.close()
+        if self.local_llm:
+            self.local_llm.close()
+
+        if self.audio_output:
+            self.audio_output.close()
+
         # Cleanup voice manager
         if self.voice_manager:
             self.logger.info("Cleaning up VoiceDetectionManager...")
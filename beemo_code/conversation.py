@@ -0,0 +1,139 @@
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4  # Rough average for English text with Gemini's tokenizer
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate; good enough for budgeting without a network call."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class ConversationManager:
+    """Chat history held to a fixed token budget.
+
+    Recent turns are kept verbatim. When they exceed `history_budget_tokens`,
+    the oldest exchanges are folded into a rolling summary: immediately as a
+    short extractive note, then, if a `summarizer` is given, rewritten by it
+    in the background. The system prompt is assembled per request from the
+    static prompt, the summary and request-specific context (e.g. the devices
+    relevant to the utterance), so the prompt size does not grow with the home.
+    """
+
+    def __init__(self, system_prompt: str = "", history_budget_tokens: int = 800,
+                 summary_budget_tokens: int = 200, min_recent_turns: int = 2,
+                 summarizer: Optional[Callable[[str, List[Dict]], str]] = None):
+        self.system_prompt = system_prompt
+        self.history_budget_tokens = history_budget_tokens
+        self.summary_budget_tokens = summary_budget_tokens
+        self.min_recent_turns = min_recent_turns
+        self.summarizer = summarizer
+        self.turns = []      # [{"role": "user"|"assistant", "content": str}], oldest first
+        self.summary = ""
+        self._summary_generation = 0  # Bumped on every fold so stale background summaries are dropped
+        self._lock = threading.Lock()
+        self.stats = {'compactions': 0, 'summaries': 0, 'summary_failures': 0}
+
+    def reset(self, system_prompt: Optional[str] = None):
+        with self._lock:
+            if system_prompt is not None:
+                self.system_prompt = system_prompt
+            self.turns = []
+            self.summary = ""
+            self._summary_generation += 1
+
+    def add(self, role: str, content: str):
+        with self._lock:
+            self.turns.append({"role": role, "content": content})
+            folded = self._compact()
+        if folded and self.summarizer:
+            threading.Thread(target=self._summarize, args=(folded,), name="history-summary", daemon=True).start()
+
+    def _turn_tokens(self) -> int:
+        return sum(estimate_tokens(t["content"]) for t in self.turns)
+
+    def _compact(self) -> List[Dict]:
+        """Move the oldest turns into the summary until the history fits. Returns the folded turns."""
+        folded = []
+        while self._turn_tokens() > self.history_budget_tokens and len(self.turns) > self.min_recent_turns:
+            folded.append(self.turns.pop(0))
+        while folded and self.turns and self.turns[0]["role"] == "assistant":
+            folded.append(self.turns.pop(0))  # Gemini expects the history to start with a user turn
+        if not folded:
+            return []
+        self.stats['compactions'] += 1
+        notes = [f"{'User' if t['role'] == 'user' else 'Beemo'}: {self._first_sentence(t['content'])}" for t in folded]
+        self.summary = self._fit_summary("\n".join(filter(None, [self.summary] + notes)))
+        self._summary_generation += 1
+        return folded
+
+    @staticmethod
+    def _first_sentence(text: str, max_chars: int = 120) -> str:
+        text = " ".join(text.split())
+        for end in ('. ', '? ', '! '):
+            if end in text:
+                text = text.split(end)[0] + end.strip()
+                break
+        return text if len(text) <= max_chars else text[:max_chars].rstrip() + "..."
+
+    def _fit_summary(self, summary: str) -> str:
+        """Drop the oldest summary lines until it fits its budget."""
+        lines = summary.split("\n")
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > self.summary_budget_tokens:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    def _summarize(self, folded: List[Dict]):
+        with self._lock:
+            generation = self._summary_generation
+            previous = self.summary
+        try:
+            new_summary = self.summarizer(previous, folded)
+        except Exception as e:
+            self.stats['summary_failures'] += 1
+            logger.warning(f"Conversation summary failed, keeping extractive notes: {e}")
+            return
+        if not new_summary:
+            return
+        with self._lock:
+            if generation == self._summary_generation:  # Nothing folded meanwhile
+                self.summary = self._fit_summary(new_summary.strip())
+                self.stats['summaries'] += 1
+
+    def last_user_turn(self) -> str:
+        """The most recent user turn still in the history, or ""."""
+        with self._lock:
+            return next((t["content"] for t in reversed(self.turns) if t["role"] == "user"), "")
+
+    def build_messages(self, context: str = "", inline_context: bool = False) -> List[Dict]:
+        """System message (prompt + summary + context) followed by the recent turns.
+
+        With `inline_context`, the system message is only the static prompt and
+        the summary and context are prepended to the newest user turn instead,
+        so earlier turns and the system prompt stay the same across requests.
+        """
+        with self._lock:
+            parts = []
+            if self.summary:
+                parts.append(f"Summary of the earlier conversation:\n{self.summary}")
+            if context:
+                parts.append(context)
+            turns = [dict(t) for t in self.turns]
+            if not inline_context:
+                return [{"role": "system", "content": "\n\n".join([self.system_prompt] + parts)}] + turns
+            if parts and turns and turns[-1]["role"] == "user":
+                turns[-1]["content"] = "\n\n".join(parts) + f"\n\n---\n\nUser: {turns[-1]['content']}"
+            return [{"role": "system", "content": self.system_prompt}] + turns
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self.stats,
+                'turns': len(self.turns),
+                'history_tokens': self._turn_tokens(),
+                'summary_tokens': estimate_tokens(self.summary),
+                'system_tokens': estimate_tokens(self.system_prompt),
+            }
@@ -0,0 +1,182 @@
+import math
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from conversation import estimate_tokens
+from speculation import tokenize
+
+# Utterance words that point at a device type even when no device is named
+TYPE_KEYWORDS = {
+    'light': {'light', 'lights', 'lamp', 'lamps', 'bright', 'brightness', 'dim', 'dark'},
+    'thermostat': {'thermostat', 'temperature', 'warm', 'warmer', 'cold', 'colder', 'hot', 'heat', 'heating', 'cool', 'degrees'},
+    'lock': {'lock', 'unlock', 'locked', 'door', 'doors'},
+    'fan': {'fan', 'fans', 'breeze'},
+    'tv': {'tv', 'television', 'watch'},
+    'plug': {'plug', 'socket', 'outlet'},
+    'speaker': {'speaker', 'music', 'volume'},
+}
+IGNORED_WORDS = {'the', 'a', 'an', 'my', 'in', 'on', 'of', 'to', 'and', 'is', 'are', 'room'}
+# Words that make a request about a group of devices rather than one
+QUANTIFIER_WORDS = {'all', 'every', 'everything', 'each', 'whole', 'entire', 'both'}
+
+NAME_WEIGHT = 3.0
+ROOM_WEIGHT = 1.5
+TYPE_WEIGHT = 1.0
+RECENCY_WEIGHT = 1.0
+RECENCY_HALF_LIFE_SECONDS = 15 * 60
+
+
+def describe_state(device: Dict) -> str:
+    state = device.get('state', {})
+    parts = []
+    if 'isOn' in state:
+        parts.append('ON' if state['isOn'] else 'OFF')
+    if 'brightness' in state:
+        parts.append(f"{state['brightness']}% bright")
+    if 'thermostatTemperatureSetpoint' in state:
+        parts.append(f"set to {state['thermostatTemperatureSetpoint']}°C")
+    if 'isLocked' in state:
+        parts.append('locked' if state['isLocked'] else 'unlocked')
+    return ", ".join(parts)
+
+
+class DeviceContextRanker:
+    """Chooses which devices go into the prompt for one utterance.
+
+    Devices are scored by overlap between the utterance and the device name
+    and room, by type keywords ("warmer" -> thermostat) and by how recently
+    they were controlled. Only the top-k that fit the token budget are listed,
+    so the devices the user talks about are never lost to truncation.
+
+    A broad request ("all", "everything", or a room or type without a
+    specific device name) lists every device in the named rooms and of the
+    named types instead, since the model can only control devices it can
+    name. If they do not fit the budget as full lines, they are listed as
+    name and ID only, then as IDs grouped by room and type.
+    """
+
+    def __init__(self, top_k: int = 8, budget_tokens: int = 300):
+        self.top_k = top_k
+        self.budget_tokens = budget_tokens
+        self._last_used = {}  # device id -> time it was last controlled
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'broad_requests': 0, 'devices_listed': 0}
+
+    def record_use(self, device_id: str):
+        with self._lock:
+            self._last_used[device_id] = time.time()
+
+    def _recency(self, device_id: str, now: float) -> float:
+        used_at = self._last_used.get(device_id)
+        if used_at is None:
+            return 0.0
+        return math.exp(-math.log(2) * (now - used_at) / RECENCY_HALF_LIFE_SECONDS)
+
+    def score(self, words: set, device: Dict, now: Optional[float] = None) -> float:
+        now = now or time.time()
+        name_tokens = [t for t in device['tokens'] if t not in IGNORED_WORDS]
+        room_tokens = [t for t in tokenize(device.get('location', '')) if t not in IGNORED_WORDS]
+        score = 0.0
+        if name_tokens:
+            score += NAME_WEIGHT * sum(t in words for t in name_tokens) / len(name_tokens)
+        if room_tokens:
+            score += ROOM_WEIGHT * sum(t in words for t in room_tokens) / len(room_tokens)
+        dev_type = (device.get('type') or '').lower()
+        if any(t in dev_type and words & keywords for t, keywords in TYPE_KEYWORDS.items()):
+            score += TYPE_WEIGHT
+        return score + RECENCY_WEIGHT * self._recency(device['id'], now)
+
+    def rank(self, utterance: str, devices: List[Dict]) -> List[Tuple[float, Dict]]:
+        """All devices with their scores, best first (ties keep index order)."""
+        words = set(tokenize(utterance)) - IGNORED_WORDS
+        now = time.time()
+        with self._lock:
+            scored = [(self.score(words, dev, now), i, dev) for i, dev in enumerate(devices)]
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(score, dev) for score, _, dev in scored]
+
+    @staticmethod
+    def _room_tokens(device: Dict) -> List[str]:
+        return [t for t in tokenize(device.get('location', '')) if t not in IGNORED_WORDS]
+
+    def broad_matches(self, utterance: str, devices: List[Dict]) -> Optional[List[Dict]]:
+        """Devices a broad request refers to, or None if the request is not broad."""
+        words = set(tokenize(utterance)) - IGNORED_WORDS
+        type_words = set().union(*TYPE_KEYWORDS.values())
+        rooms = {dev.get('location', '') for dev in devices
+                 if self._room_tokens(dev) and all(t in words for t in self._room_tokens(dev))}
+        types = {t for t, keywords in TYPE_KEYWORDS.items() if words & keywords}
+
+        def specific_name(dev: Dict) -> bool:
+            distinctive = [t for t in dev['tokens']
+                           if t not in IGNORED_WORDS and t not in type_words and t not in self._room_tokens(dev)]
+            return bool(distinctive) and all(t in words for t in distinctive)
+
+        quantified = bool(words & QUANTIFIER_WORDS)
+        if not quantified and (not (rooms or types) or any(specific_name(dev) for dev in devices)):
+            return None
+        return [dev for dev in devices
+                if (not rooms or dev.get('location', '') in rooms)
+                and (not types or any(t in (dev.get('type') or '').lower() for t in types))]
+
+    def _fit(self, header: str, lines: List[str]) -> Optional[List[str]]:
+        """`lines` if all of them fit the budget under `header`, else None."""
+        used = estimate_tokens(header) + sum(estimate_tokens(line) for line in lines)
+        return lines if used <= self.budget_tokens else None
+
+    @staticmethod
+    def _line(dev: Dict) -> str:
+        state = describe_state(dev)
+        return f"- {dev['name']} in {dev.get('location', '?')} (type: {dev['type']}, ID: {dev['id']}{', ' + state if state else ''})"
+
+    def _build_broad(self, matches: List[Dict], total: int) -> str:
+        header = "Every device matching this request:"
+        groups = {}
+        for dev in matches:
+            groups.setdefault((dev.get('location', '?'), dev['type']), []).append(dev['id'])
+        lines = self._fit(header, [self._line(dev) for dev in matches]) or \
+            self._fit(header, [f"- {dev['name']} (ID: {dev['id']})" for dev in matches]) or \
+            self._fit(header, [f"- {room}, {dev_type}: {', '.join(ids)}" for (room, dev_type), ids in groups.items()])
+        if lines is None:  # Even the IDs do not fit: counts only, the model has to ask
+            header = "Too many devices match this request to list; by room and type:"
+            lines = [f"- {room}: {len(ids)} {dev_type}" for (room, dev_type), ids in groups.items()]
+        self.stats['broad_requests'] += 1
+        self.stats['devices_listed'] += len(matches)
+        if total > len(matches):
+            lines.append(f"({total - len(matches)} other devices do not match this request.)")
+        return "\n".join([header] + lines)
+
+    def build(self, utterance: str, devices: List[Dict]) -> str:
+        """Prompt section listing the devices relevant to this utterance."""
+        if not devices:
+            return "No smart home devices are currently synced or available."
+        self.stats['requests'] += 1
+        matches = self.broad_matches(utterance, devices)
+        if matches:
+            return self._build_broad([dev for _, dev in self.rank(utterance, matches)], len(devices))
+        ranked = self.rank(utterance, devices)
+        relevant = any(score > 0 for score, _ in ranked)
+        header = "Devices most relevant to this request:" if relevant else "Some of the available devices:"
+        lines, used = [], estimate_tokens(header)
+        for score, dev in ranked[:self.top_k]:
+            if relevant and score <= 0:
+                break
+            line = self._line(dev)
+            if used + estimate_tokens(line) > self.budget_tokens:
+                break
+            lines.append(line)
+            used += estimate_tokens(line)
+        omitted = len(devices) - len(lines)
+        if omitted:
+            lines.append(f"({omitted} other devices not listed; they can still be controlled by name.)")
+        self.stats['devices_listed'] += len(lines) - (1 if omitted else 0)
+        return "\n".join([header] + lines)
+
+    def get_stats(self) -> Dict:
+        requests = self.stats['requests']
+        return {
+            **self.stats,
+            'avg_devices_listed': round(self.stats['devices_listed'] / requests, 1) if requests else 0.0,
+            'top_k': self.top_k,
+        }
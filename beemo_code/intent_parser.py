@@ -0,0 +1,179 @@
+import re
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from speculation import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Words that may surround a command without changing it
+FILLER_WORDS = {'please', 'could', 'can', 'would', 'you', 'will', 'hey', 'beemo', 'bmo', 'now', 'for', 'me', 'just', 'kindly'}
+# Words that may appear in a device phrase without naming the device
+DEVICE_FILLER_WORDS = {'the', 'my', 'in', 'on', 'of', 'at', 'room', 'all'}
+
+_NUMBER_WORDS = {
+    'zero': 0, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7, 'eight': 8,
+    'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12, 'thirteen': 13, 'fourteen': 14, 'fifteen': 15,
+    'sixteen': 16, 'seventeen': 17, 'eighteen': 18, 'nineteen': 19, 'twenty': 20, 'thirty': 30,
+    'forty': 40, 'fifty': 50, 'sixty': 60, 'seventy': 70, 'eighty': 80, 'ninety': 90,
+}
+_NUMBER = r"(?P<value>\d+(?:\.\d+)?|(?:(?:a|one) hundred|[a-z]+(?: [a-z]+)?)(?: point [a-z]+)?)"
+
+# (action, pattern) in priority order; "set" covers both brightness and temperature
+_PATTERNS = [
+    ('turn_on', re.compile(r"^(?:turn|switch|power) on (?P<device>.+)$")),
+    ('turn_on', re.compile(r"^(?:turn|switch|power) (?P<device>.+) on$")),
+    ('turn_off', re.compile(r"^(?:turn|switch|power|shut) off (?P<device>.+)$")),
+    ('turn_off', re.compile(r"^(?:turn|switch|power|shut) (?P<device>.+) off$")),
+    ('lock', re.compile(r"^lock (?P<device>.+)$")),
+    ('unlock', re.compile(r"^unlock (?P<device>.+)$")),
+    ('set_brightness', re.compile(r"^(?:set|dim|change|make) (?:the )?brightness (?:of|on|for) (?P<device>.+) to " + _NUMBER + r"(?: ?%| percent)?$")),
+    ('set_brightness', re.compile(r"^(?:dim|brighten) (?P<device>.+) to " + _NUMBER + r"(?: ?%| percent)?$")),
+    ('set_brightness', re.compile(r"^(?:set|change|make) (?P<device>.+?) (?:brightness )?to " + _NUMBER + r"(?: ?%| percent)$")),
+    ('set_temperature', re.compile(r"^(?:set|change|make) (?:the )?temperature (?:of|on|for|in) (?P<device>.+) to " + _NUMBER + r"(?: ?degrees?(?: celsius)?| ?°c)?$")),
+    ('set_temperature', re.compile(r"^(?:set|change|make) (?P<device>.+?) (?:temperature )?to " + _NUMBER + r"(?: ?degrees?(?: celsius)?| ?°c)$")),
+    ('set', re.compile(r"^(?:set|change|make) (?P<device>.+?) to " + _NUMBER + r"$")),
+]
+
+BRIGHTNESS_RANGE = (0, 100)
+TEMPERATURE_RANGE = (5, 35)
+
+
+def words_to_number(text: str) -> Optional[float]:
+    """Parse digits or spoken numbers up to one hundred ("seventy two", "twenty point five")."""
+    text = text.strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    whole, _, fraction = text.partition(' point ')
+    words = whole.split()
+    if words in (['a', 'hundred'], ['one', 'hundred'], ['hundred']):
+        value = 100.0
+    elif len(words) == 1 and words[0] in _NUMBER_WORDS:
+        value = float(_NUMBER_WORDS[words[0]])
+    elif len(words) == 2 and words[0] in _NUMBER_WORDS and words[1] in _NUMBER_WORDS \
+            and _NUMBER_WORDS[words[0]] >= 20 and _NUMBER_WORDS[words[0]] % 10 == 0 and _NUMBER_WORDS[words[1]] < 10:
+        value = float(_NUMBER_WORDS[words[0]] + _NUMBER_WORDS[words[1]])
+    else:
+        return None
+    if fraction:
+        if fraction not in _NUMBER_WORDS or _NUMBER_WORDS[fraction] > 9:
+            return None
+        value += _NUMBER_WORDS[fraction] / 10.0
+    return value
+
+
+class LocalIntentParser:
+    """Deterministic parser for simple device commands, so they skip the LLM round trip.
+
+    Handles turn_on, turn_off, set_brightness, set_temperature, lock and unlock
+    against the device index, including "X and Y" lists. It only returns a
+    parse when every command maps to exactly one device whose type supports
+    the action; anything ambiguous or unknown returns None and goes to the LLM.
+    """
+
+    def __init__(self, device_index_provider: Callable[[], List[Dict]]):
+        self.device_index_provider = device_index_provider
+        self.stats = {'attempts': 0, 'parsed': 0, 'ambiguous': 0}
+
+    def parse(self, text: str) -> Optional[List[Dict]]:
+        """Return [{'device', 'name', 'action', 'value'}, ...] for a confident parse, else None."""
+        self.stats['attempts'] += 1
+        devices = self.device_index_provider() or []
+        if not devices:
+            return None
+        words = [w for w in re.findall(r"[a-z0-9.%°]+", text.lower().replace("'", "")) if w not in FILLER_WORDS]
+        normalized = " ".join(words).strip(". ")
+        if not normalized:
+            return None
+
+        commands = []
+        previous_action = None
+        for clause in re.split(r"\s*(?:,|\band\b|\bthen\b)\s*", normalized):
+            if not clause:
+                continue
+            parsed = self._parse_clause(clause)
+            if parsed is None and previous_action in ('turn_on', 'turn_off', 'lock', 'unlock'):
+                # "turn off the kitchen light and the fan": the verb carries over
+                parsed = (previous_action, clause, None)
+            if parsed is None:
+                return None
+            action, device_phrase, value = parsed
+            command = self._resolve(action, device_phrase, value, devices)
+            if command is None:
+                return None
+            commands.append(command)
+            previous_action = action
+
+        if commands:
+            self.stats['parsed'] += 1
+        return commands or None
+
+    @staticmethod
+    def _parse_clause(clause: str) -> Optional[Tuple[str, str, Optional[float]]]:
+        for action, pattern in _PATTERNS:
+            match = pattern.match(clause)
+            if not match:
+                continue
+            value = None
+            if 'value' in match.groupdict():
+                value = words_to_number(match.group('value'))
+                if value is None:
+                    return None
+            return action, match.group('device'), value
+        return None
+
+    def _resolve(self, action: str, device_phrase: str, value: Optional[float], devices: List[Dict]) -> Optional[Dict]:
+        phrase_tokens = [t for t in tokenize(device_phrase) if t not in DEVICE_FILLER_WORDS]
+        if not phrase_tokens:
+            return None
+        phrase = " ".join(phrase_tokens)
+
+        candidates = []
+        for dev in devices:
+            name_tokens = [t for t in dev['tokens'] if t not in DEVICE_FILLER_WORDS]
+            if not name_tokens:
+                continue
+            location_tokens = set(tokenize(dev.get('location', '')))
+            if " ".join(name_tokens) == phrase:
+                candidates.append((2, dev))
+            elif all(t in phrase_tokens for t in name_tokens) and \
+                    all(t in name_tokens or t in location_tokens for t in phrase_tokens):
+                # "bedroom lamp" for a device "Lamp" in the Bedroom
+                candidates.append((1, dev))
+        if not candidates:
+            return None
+        best_score = max(score for score, _ in candidates)
+        best = [dev for score, dev in candidates if score == best_score]
+        if len(best) > 1:
+            self.stats['ambiguous'] += 1
+            logger.debug(f"Local intent: '{device_phrase}' matches {len(best)} devices, deferring to the LLM")
+            return None
+        dev = best[0]
+        dev_type = (dev.get('type') or '').lower()
+
+        if action == 'set':
+            if dev_type == 'thermostat':
+                action = 'set_temperature'
+            elif 'light' in dev_type or 'brightness' in dev.get('state', {}):
+                action = 'set_brightness'
+            else:
+                return None
+
+        if action in ('lock', 'unlock') and dev_type != 'lock':
+            return None
+        if action == 'set_temperature':
+            if dev_type != 'thermostat' or not TEMPERATURE_RANGE[0] <= value <= TEMPERATURE_RANGE[1]:
+                return None
+        if action == 'set_brightness':
+            if not BRIGHTNESS_RANGE[0] <= value <= BRIGHTNESS_RANGE[1] or value != int(value):
+                return None
+            if 'light' not in dev_type and 'brightness' not in dev.get('state', {}):
+                return None
+            value = int(value)
+
+        return {'device': dev['id'], 'name': dev['name'], 'action': action, 'value': value}
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+LLM request benchmark
+Replays a scripted conversation in both request modes and compares them:
+  rebuild  - contents rebuilt every turn, system prompt folded into the first user turn
+  session  - persistent GeminiChatSession (system_instruction, reused history)
+
+Both modes use the system prompt b.py sends (llm_tools.build_system_prompt).
+
+Offline (default) it reports the contents build time, estimated request tokens
+and how many of them form a prefix identical to the previous request. These
+are estimates (4 characters per token) of what the server could cache, not
+what it did. With --live it sends every turn to Gemini and reports the
+measured latency and the prompt and cached token counts from usage_metadata;
+only those show whether the stable prefix was actually reused.
+
+Usage:
+    python llm_benchmark.py [--script utterances.txt] [--devices 30] [--live --api-key KEY]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from conversation import ConversationManager, estimate_tokens
+from device_context import DeviceContextRanker
+from speculation import tokenize
+from llm_session import GeminiChatSession, build_contents
+from llm_tools import TOOLS, build_system_prompt, parse_response
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = 'gemini-1.5-flash-latest'
+
+DEFAULT_SCRIPT = [
+    "hi beemo, how are you today",
+    "turn on the living room lamp",
+    "what's the weather like in Paris",
+    "set the bedroom thermostat to 21 degrees",
+    "tell me a joke",
+    "which lights are still on",
+    "dim the kitchen light to 30 percent",
+    "what did I ask you to do with the thermostat",
+    "lock the front door",
+    "what can you help me with",
+]
+
+ROOMS = ['Living Room', 'Bedroom', 'Kitchen', 'Office', 'Hallway', 'Garage']
+TYPES = [('Lamp', 'light', {'isOn': False, 'brightness': 80}), ('Thermostat', 'thermostat', {'thermostatTemperatureSetpoint': 20}),
+         ('Front Door', 'lock', {'isLocked': True}), ('Fan', 'fan', {'isOn': False}), ('Light', 'light', {'isOn': True})]
+
+
+def synthetic_devices(count: int) -> List[Dict]:
+    devices = []
+    for i in range(count):
+        name, dev_type, state = TYPES[i % len(TYPES)]
+        room = ROOMS[(i // len(TYPES)) % len(ROOMS)]
+        full_name = f"{room} {name}" if i >= len(TYPES) or name != 'Front Door' else name
+        devices.append({'id': f"dev{i:03d}", 'name': full_name, 'location': room, 'type': dev_type,
+                        'state': dict(state), 'tokens': tokenize(full_name)})
+    return devices
+
+
+def request_texts(system_instruction: Optional[str], contents: List[Dict]) -> List[str]:
+    """The request as the list of texts the server sees, in order."""
+    texts = [system_instruction] if system_instruction else []
+    return texts + [part['text'] for turn in contents for part in turn['parts']]
+
+
+def shared_prefix_tokens(previous: List[str], current: List[str]) -> int:
+    tokens = 0
+    for before, now in zip(previous, current):
+        if before != now:
+            break
+        tokens += estimate_tokens(now)
+    return tokens
+
+
+def run_mode(mode: str, script: List[str], devices: List[Dict], live: bool, system_prompt: str) -> List[Dict]:
+    conversation = ConversationManager(system_prompt)
+    ranker = DeviceContextRanker()
+    session = GeminiChatSession(MODEL_NAME, tools=TOOLS) if mode == 'session' else None
+    if session:
+        session.reset(system_prompt)
+    stateless_model = None
+    if live and not session:
+        import google.generativeai as genai
+        stateless_model = genai.GenerativeModel(MODEL_NAME, tools=TOOLS)
+
+    results, previous = [], []
+    for turn, utterance in enumerate(script, 1):
+        conversation.add("user", utterance)
+        context = ranker.build(utterance, devices)
+
+        started = time.perf_counter()
+        messages = conversation.build_messages(context, inline_context=session is not None)
+        contents = session.contents(messages) if session else build_contents(messages)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        texts = request_texts(system_prompt if session else None, contents)
+        result = {
+            'mode': mode,
+            'turn': turn,
+            'build_ms': round(build_ms, 3),
+            'est_request_tokens': sum(estimate_tokens(t) for t in texts),
+            'est_stable_prefix_tokens': shared_prefix_tokens(previous, texts),
+        }
+        previous = texts
+
+        reply = "Okay."
+        if live:
+            model = session.model if session else stateless_model
+            started = time.perf_counter()
+            response = model.generate_content(contents)
+            result['latency_s'] = round(time.perf_counter() - started, 3)
+            usage = getattr(response, 'usage_metadata', None)
+            result['prompt_tokens'] = getattr(usage, 'prompt_token_count', None)
+            result['cached_tokens'] = getattr(usage, 'cached_content_token_count', None) or 0
+            reply = parse_response(response).text.strip() or "Okay."
+        conversation.add("assistant", reply)
+        results.append(result)
+    return results
+
+
+def summarize(results: List[Dict]) -> Dict:
+    summary = {}
+    for mode in sorted({r['mode'] for r in results}):
+        rows = [r for r in results if r['mode'] == mode]
+        request_tokens = sum(r['est_request_tokens'] for r in rows)
+        stable_tokens = sum(r['est_stable_prefix_tokens'] for r in rows)
+        summary[mode] = {
+            'turns': len(rows),
+            'build_ms_mean': round(sum(r['build_ms'] for r in rows) / len(rows), 3),
+            'est_request_tokens_mean': round(request_tokens / len(rows)),
+            'est_stable_prefix_share': round(stable_tokens / request_tokens, 3) if request_tokens else 0.0,
+        }
+        latencies = sorted(r['latency_s'] for r in rows if r.get('latency_s') is not None)
+        if latencies:
+            prompt_tokens = sum(r['prompt_tokens'] or 0 for r in rows)
+            cached_tokens = sum(r['cached_tokens'] for r in rows)
+            summary[mode].update({
+                'latency_p50': latencies[len(latencies) // 2],
+                'latency_max': latencies[-1],
+                'prompt_tokens_mean': round(prompt_tokens / len(rows)),
+                'prompt_tokens_total': prompt_tokens,
+                'cached_tokens_total': cached_tokens,  # Measured: usage_metadata.cached_content_token_count
+                'cached_turns': sum(1 for r in rows if r['cached_tokens']),
+                'cached_token_share': round(cached_tokens / prompt_tokens, 3) if prompt_tokens else 0.0,
+            })
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare rebuilt-contents and persistent-session LLM requests.")
+    parser.add_argument('--script', help="Text file with one user utterance per line (default: built-in script)")
+    parser.add_argument('--devices', type=int, default=30, help="Number of synthetic devices in the home")
+    parser.add_argument('--live', action='store_true', help="Send every turn to Gemini and measure latency and usage")
+    parser.add_argument('--api-key', default=os.environ.get('GEMINI_API_KEY'), help="Gemini API key for --live")
+    parser.add_argument('--output', help="Write per-turn results and summary as JSON to this file")
+    args = parser.parse_args()
+
+    script = DEFAULT_SCRIPT
+    if args.script:
+        with open(args.script) as f:
+            script = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    if not script:
+        print("No utterances to replay.")
+        sys.exit(1)
+    if args.live:
+        if not args.api_key:
+            print("--live needs --api-key or GEMINI_API_KEY.")
+            sys.exit(1)
+        import google.generativeai as genai
+        genai.configure(api_key=args.api_key)
+
+    devices = synthetic_devices(args.devices)
+    system_prompt = build_system_prompt(datetime.now())
+    results = []
+    for mode in ('rebuild', 'session'):
+        for result in run_mode(mode, script, devices, args.live, system_prompt):
+            results.append(result)
+            print(json.dumps(result))
+
+    summary = summarize(results)
+    print(json.dumps({'summary': summary}, indent=2))
+    if args.live:
+        for mode, stats in summary.items():
+            print(f"{mode}: {stats['cached_tokens_total']} of {stats['prompt_tokens_total']} prompt tokens "
+                  f"served from the server cache ({stats['cached_token_share']:.0%}, measured).")
+    else:
+        print("Token counts are offline estimates; run with --live for the measured cached_content_token_count.")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'results': results, 'summary': summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
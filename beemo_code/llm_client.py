@@ -0,0 +1,315 @@
+import time
+import queue
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from metrics import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+
+class LLMTimeout(Exception):
+    """Raised when no response arrived before the request's deadline."""
+
+
+class LLMCancelled(Exception):
+    """Raised when a request was cancelled (barge-in or a newer command)."""
+
+
+class LLMBusy(LLMTimeout):
+    """Raised at once when every worker is still held by earlier, abandoned calls."""
+
+
+class AsyncLLMClient:
+    """asyncio front end for a blocking LLM call, with deadlines, hedging and cancellation.
+
+    The client owns an event loop on a background thread. Synchronous code
+    uses `request()` or `submit()`; coroutines on that loop can await
+    `complete()`. Each call runs in a worker thread. Once `min_samples`
+    latencies are known, a request that has not answered within the
+    `hedge_percentile` latency gets a second, identical request and the first
+    answer wins. A blocking SDK call cannot be interrupted: on timeout or
+    cancellation its thread finishes in the background and the result is
+    dropped. Such abandoned calls keep their worker until the SDK's own
+    timeout ends them, so workers are counted: a hedge is only sent when one
+    is free, and a request that finds none fails at once with LLMBusy
+    instead of queueing behind them until its deadline. Timed-out calls add
+    no latency sample, so a slow period does not push the hedge delay up to
+    the deadline and switch hedging off.
+
+    `stream()` gives a streaming call the same deadline, cancellation and
+    worker accounting: the blocking iterator is read on a worker thread and
+    the caller waits on its chunks with a timeout. A stream is hedged on its
+    opening: with no first chunk by the p90 time to first chunk, a second
+    stream is opened and the first to produce output is read.
+    """
+
+    def __init__(self, call: Callable[[Any], Any], deadline: float = 15.0, hedge: bool = True,
+                 hedge_percentile: float = 90, min_samples: int = 5, min_hedge_delay: float = 0.5,
+                 max_workers: int = 8):
+        self.call = call
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.min_hedge_delay = min_hedge_delay
+        self.latency = LatencyTracker()
+        self.first_item_latency = LatencyTracker()  # Streams: time until the first item arrives
+        self.stats = {'requests': 0, 'hedged': 0, 'hedge_wins': 0, 'hedges_skipped': 0, 'timeouts': 0,
+                      'cancelled': 0, 'errors': 0, 'busy': 0, 'streams': 0}
+        self.max_workers = max_workers
+        self._running = 0  # Calls holding a worker, abandoned ones included
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-call")
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-client", daemon=True)
+        self._thread.start()
+        self._inflight = set()  # Futures of requests submitted from other threads
+        self._streams = set()   # Cancel events of the streams being read
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def hedge_delay(self, latency: Optional[LatencyTracker] = None) -> Optional[float]:
+        """Seconds to wait before hedging, or None while hedging is off or latency is unknown.
+
+        `latency` defaults to the request latencies; streams pass their time to first item.
+        """
+        latency = self.latency if latency is None else latency
+        if not self.hedge or len(latency) < self.min_samples:
+            return None
+        return max(self.min_hedge_delay, latency.percentile(self.hedge_percentile))
+
+    def _reserve_worker(self) -> bool:
+        with self._lock:
+            if self._running >= self.max_workers:
+                return False
+            self._running += 1
+            return True
+
+    def _release_worker(self, _future=None):
+        with self._lock:
+            self._running -= 1
+
+    def _start(self, fn: Callable, *args) -> concurrent.futures.Future:
+        """Run `fn` on a worker reserved by the caller; the worker is released when it returns or is cancelled."""
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._release_worker)
+        return future
+
+    def free_workers(self) -> int:
+        with self._lock:
+            return self.max_workers - self._running
+
+    async def complete(self, payload: Any, deadline: Optional[float] = None) -> Any:
+        """Run one request. Raises LLMTimeout (LLMBusy), asyncio.CancelledError or the call's own error."""
+        deadline = deadline or self.deadline
+        started = time.monotonic()
+        self.stats['requests'] += 1
+        if not self._reserve_worker():
+            self.stats['busy'] += 1
+            raise LLMBusy(f"all {self.max_workers} LLM workers are held by abandoned calls")
+        attempts = [asyncio.wrap_future(self._start(self.call, payload))]
+        try:
+            hedge_delay = self.hedge_delay()
+            if hedge_delay is not None and hedge_delay < deadline:
+                done, _ = await asyncio.wait(attempts, timeout=hedge_delay)
+                if not done:
+                    if self._reserve_worker():
+                        self.stats['hedged'] += 1
+                        logger.info(f"LLM request slower than p{self.hedge_percentile:g} ({hedge_delay:.1f}s); sending a hedged request.")
+                        attempts.append(asyncio.wrap_future(self._start(self.call, payload)))
+                    else:
+                        self.stats['hedges_skipped'] += 1
+            result, winner = await self._first_success(attempts, started + deadline)
+        except LLMTimeout:
+            self.stats['timeouts'] += 1
+            raise LLMTimeout(f"no LLM response within {deadline:.1f}s") from None
+        except asyncio.CancelledError:
+            self.stats['cancelled'] += 1
+            raise
+        except Exception:
+            self.stats['errors'] += 1
+            raise
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+        self.latency.record(time.monotonic() - started)
+        if winner > 0:
+            self.stats['hedge_wins'] += 1
+        return result
+
+    @staticmethod
+    async def _first_success(attempts: List[asyncio.Future], ends_at: float) -> Tuple[Any, int]:
+        """Result and index of the first attempt that succeeds; the last error if all fail."""
+        pending = set(attempts)
+        last_error = None
+        while pending:
+            remaining = ends_at - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for attempt in done:
+                if attempt.exception() is None:
+                    return attempt.result(), attempts.index(attempt)
+                last_error = attempt.exception()
+        if last_error is not None and not pending:
+            raise last_error
+        raise LLMTimeout("no LLM response before the deadline")
+
+    def submit(self, payload: Any, deadline: Optional[float] = None) -> concurrent.futures.Future:
+        """Start a request from any thread; the future can be cancelled."""
+        future = asyncio.run_coroutine_threadsafe(self.complete(payload, deadline), self._loop)
+        with self._lock:
+            self._inflight.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def stream(self, open_stream: Callable[[], Iterable], deadline: Optional[float] = None) -> Iterator:
+        """Yield the items of the blocking stream returned by `open_stream()`, read on a worker thread.
+
+        If no item has arrived by the hedge delay of the time to first item, a
+        second stream is opened and whichever produces first is read; the
+        other is abandoned. Raises LLMTimeout (LLMBusy) once `deadline` seconds
+        have passed since the call, LLMCancelled after cancel_all(), or the
+        stream's own error. Closing the generator early abandons the stream.
+        """
+        deadline = deadline or self.deadline
+        started = time.monotonic()
+        ends_at = started + deadline
+        self.stats['streams'] += 1
+        if not self._reserve_worker():
+            self.stats['busy'] += 1
+            raise LLMBusy(f"all {self.max_workers} LLM workers are held by abandoned calls")
+        items = queue.Queue()  # (attempt, more, item or error)
+        cancelled = threading.Event()
+        with self._lock:
+            self._streams.add(cancelled)
+
+        def pump(attempt: int, stop: threading.Event):
+            try:
+                for item in open_stream():
+                    if stop.is_set() or cancelled.is_set():
+                        return
+                    items.put((attempt, True, item))
+                items.put((attempt, False, None))
+            except Exception as e:
+                items.put((attempt, False, e))
+
+        stops = [threading.Event()]
+        self._start(pump, 0, stops[0])
+        hedge_delay = self.hedge_delay(self.first_item_latency)
+        hedge_at = started + hedge_delay if hedge_delay is not None and hedge_delay < deadline else None
+        winner, failed = None, 0
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= ends_at:
+                    self.stats['timeouts'] += 1
+                    raise LLMTimeout(f"LLM stream still running after {deadline:.1f}s")
+                if hedge_at is not None and now >= hedge_at:
+                    hedge_at = None
+                    if self._reserve_worker():
+                        self.stats['hedged'] += 1
+                        logger.info(f"No LLM stream output after p{self.hedge_percentile:g} ({hedge_delay:.1f}s); "
+                                    f"opening a hedged stream.")
+                        stops.append(threading.Event())
+                        self._start(pump, 1, stops[1])
+                    else:
+                        self.stats['hedges_skipped'] += 1
+                wait = min(ends_at, hedge_at if hedge_at is not None else ends_at) - now
+                try:
+                    attempt, more, item = items.get(timeout=max(0.0, min(wait, 0.1)))
+                except queue.Empty:
+                    attempt, more, item = None, True, None  # Nothing yet; check the cancel flag and the deadline
+                if cancelled.is_set():
+                    self.stats['cancelled'] += 1
+                    raise LLMCancelled("LLM stream cancelled")
+                if attempt is None:
+                    continue
+                if winner is None:
+                    if not more and item is not None:
+                        failed += 1
+                        if failed < len(stops):
+                            continue  # The other attempt may still succeed
+                        hedge_at = None
+                    else:
+                        winner = attempt
+                        hedge_at = None
+                        self.first_item_latency.record(time.monotonic() - started)
+                        if winner > 0:
+                            self.stats['hedge_wins'] += 1
+                        for other, stop in enumerate(stops):
+                            if other != winner:
+                                stop.set()
+                elif attempt != winner:
+                    continue
+                if not more:
+                    if item is not None:
+                        self.stats['errors'] += 1
+                        raise item
+                    return
+                yield item
+        finally:
+            cancelled.set()  # Stops the workers at their next item
+            with self._lock:
+                self._streams.discard(cancelled)
+
+    def _forget(self, future: concurrent.futures.Future):
+        with self._lock:
+            self._inflight.discard(future)
+
+    def request(self, payload: Any, deadline: Optional[float] = None) -> Any:
+        """Blocking request. Raises LLMTimeout, LLMCancelled or the call's own error."""
+        try:
+            return self.submit(payload, deadline).result()
+        except concurrent.futures.CancelledError:
+            raise LLMCancelled("LLM request cancelled")
+
+    def cancel_all(self, reason: str = "") -> int:
+        """Cancel every request and stream in flight. Returns how many were cancelled."""
+        with self._lock:
+            futures = list(self._inflight)
+            streams = list(self._streams)
+        cancelled = sum(1 for future in futures if future.cancel())
+        for stream_cancelled in streams:
+            stream_cancelled.set()
+        cancelled += len(streams)
+        if cancelled:
+            logger.info(f"Cancelled {cancelled} LLM request(s){f' ({reason})' if reason else ''}.")
+        return cancelled
+
+    def get_stats(self) -> Dict:
+        p90 = self.latency.percentile(90)
+        hedge_delay = self.hedge_delay()
+        stream_hedge_delay = self.hedge_delay(self.first_item_latency)
+        return {
+            **self.stats,
+            **self.latency.get_stats(),
+            'p90_ms': round(p90 * 1000, 1) if p90 is not None else None,
+            'hedge_delay_ms': round(hedge_delay * 1000, 1) if hedge_delay is not None else None,
+            'stream_hedge_delay_ms': round(stream_hedge_delay * 1000, 1) if stream_hedge_delay is not None else None,
+            'workers_busy': self.max_workers - self.free_workers(),
+        }
+
+    async def _cancel_tasks(self):
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self):
+        """Stop the loop and abandon calls still running. Safe to call more than once."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            asyncio.run_coroutine_threadsafe(self._cancel_tasks(), self._loop).result(timeout=1.0)
+        except Exception as e:
+            logger.warning(f"LLM client tasks did not stop cleanly: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=1.0)
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,144 @@
+import logging
+import datetime
+from typing import Dict, List, Optional
+
+try:
+    import google.generativeai as genai
+    GENAI_AVAILABLE = True
+except ImportError:  # Offline tools (llm_benchmark.py) only need build_contents and contents()
+    genai = None
+    GENAI_AVAILABLE = False
+
+from conversation import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Explicit context caching is refused below the model's minimum prompt size
+CONTEXT_CACHE_MIN_TOKENS = 4096
+CONTEXT_CACHE_TTL_SECONDS = 3600
+
+
+def to_gemini_turn(message: Dict) -> Dict:
+    role = "model" if message["role"] == "assistant" else "user"
+    return {"role": role, "parts": [{"text": message["content"]}]}
+
+
+def build_contents(messages: List[Dict]) -> List[Dict]:
+    """Gemini contents for a stateless request: the system prompt is folded into the first user turn."""
+    system_instruction_text = None
+    conversation_messages = messages
+    if messages and messages[0]["role"] == "system":
+        system_instruction_text = messages[0]["content"]
+        conversation_messages = messages[1:]
+
+    gemini_contents = []
+    is_first_user_message = True
+    for msg in conversation_messages:
+        turn = to_gemini_turn(msg)
+        if turn["role"] == "user" and is_first_user_message and system_instruction_text:
+            turn["parts"][0]["text"] = f"{system_instruction_text}\n\n---\n\nUser Question: {msg['content']}"
+            is_first_user_message = False
+        gemini_contents.append(turn)
+    return gemini_contents
+
+
+class GeminiChatSession:
+    """One Gemini chat per conversation.
+
+    The static system prompt and the tool declarations are bound to the model
+    once, as system_instruction or, when the prompt is large enough, as an
+    explicit context cache. The converted history is kept between requests,
+    so a turn only converts the messages added since the last one. The
+    per-request context (summary, relevant devices) travels on the newest
+    user turn only; the rest of the request stays identical from turn to
+    turn, which is what the server's prefix caching needs.
+    """
+
+    def __init__(self, model_name: str, tools: Optional[List] = None,
+                 cache_min_tokens: int = CONTEXT_CACHE_MIN_TOKENS, cache_ttl_seconds: int = CONTEXT_CACHE_TTL_SECONDS):
+        self.model_name = model_name
+        self.tools = tools
+        self.cache_min_tokens = cache_min_tokens
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.system_prompt = None
+        self.model = None
+        self._cache = None
+        self._synced = []   # Conversation turns already converted, oldest first
+        self._history = []  # Their Gemini contents
+        self.stats = {'requests': 0, 'history_rebuilds': 0, 'turns_converted': 0,
+                      'prompt_tokens': 0, 'cached_tokens': 0, 'usage_reports': 0}
+
+    def reset(self, system_prompt: str):
+        """Start a new conversation bound to `system_prompt`. Without the Gemini SDK only the history is kept."""
+        self._drop_cache()
+        self.system_prompt = system_prompt
+        self._synced, self._history = [], []
+        self.model = None
+        if not GENAI_AVAILABLE:
+            return
+        if estimate_tokens(system_prompt) >= self.cache_min_tokens and hasattr(genai, 'caching'):
+            try:
+                self._cache = genai.caching.CachedContent.create(
+                    model=self.model_name, system_instruction=system_prompt, tools=self.tools,
+                    ttl=datetime.timedelta(seconds=self.cache_ttl_seconds))
+                self.model = genai.GenerativeModel.from_cached_content(self._cache)
+                logger.info(f"System prompt cached on the server ({self._cache.name}).")
+            except Exception as e:
+                logger.warning(f"Context caching unavailable, using system_instruction: {e}")
+                self._cache = None
+        if self.model is None:
+            self.model = genai.GenerativeModel(self.model_name, tools=self.tools, system_instruction=system_prompt)
+
+    def _drop_cache(self):
+        if self._cache is not None:
+            try:
+                self._cache.delete()
+            except Exception as e:
+                logger.debug(f"Could not delete context cache: {e}")
+            self._cache = None
+
+    def contents(self, messages: List[Dict]) -> List[Dict]:
+        """Gemini contents for `messages` = [system, *history, newest user turn with its context]."""
+        if messages and messages[0]["role"] == "system":
+            if messages[0]["content"] != self.system_prompt:
+                self.reset(messages[0]["content"])
+            messages = messages[1:]
+        if not messages:
+            return []
+        self._sync(messages[:-1])
+        self.stats['requests'] += 1
+        return self._history + [to_gemini_turn(messages[-1])]
+
+    def _sync(self, turns: List[Dict]):
+        """Convert only the turns added since the last request; a fold or reset rewrites from scratch."""
+        known = len(self._synced)
+        if turns[:known] != self._synced:
+            self._synced, self._history, known = [], [], 0
+            self.stats['history_rebuilds'] += 1
+        for turn in turns[known:]:
+            self._synced.append(dict(turn))
+            self._history.append(to_gemini_turn(turn))
+            self.stats['turns_converted'] += 1
+
+    def record_usage(self, response):
+        """Add a response's token usage (prompt and cached prompt tokens) to the stats."""
+        usage = getattr(response, 'usage_metadata', None)
+        if not usage or not getattr(usage, 'prompt_token_count', 0):
+            return
+        self.stats['usage_reports'] += 1
+        self.stats['prompt_tokens'] += usage.prompt_token_count
+        self.stats['cached_tokens'] += getattr(usage, 'cached_content_token_count', 0) or 0
+
+    def get_stats(self) -> Dict:
+        reports = self.stats['usage_reports']
+        return {
+            **self.stats,
+            'context_cache': self._cache.name if self._cache is not None else None,
+            'history_turns': len(self._history),
+            'avg_prompt_tokens': round(self.stats['prompt_tokens'] / reports) if reports else None,
+            'cached_share': round(self.stats['cached_tokens'] / self.stats['prompt_tokens'], 3)
+            if self.stats['prompt_tokens'] else 0.0,
+        }
+
+    def close(self):
+        self._drop_cache()
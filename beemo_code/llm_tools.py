@@ -0,0 +1,203 @@
+import logging
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+DEVICE_ACTIONS = ('turn_on', 'turn_off', 'set_brightness', 'set_temperature', 'lock', 'unlock')
+NEWS_CATEGORIES = ('business', 'entertainment', 'general', 'health', 'science', 'sports', 'technology')
+
+# Gemini function declarations; the model returns function_call parts instead of marker text
+FUNCTION_DECLARATIONS = [
+    {
+        "name": "control_device",
+        "description": "Change the state of one smart home device. Call once per device; "
+                       "several calls may be made in one response.",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "device": {"type": "STRING", "description": "Device ID from the device list, or its exact name."},
+                "action": {"type": "STRING", "enum": list(DEVICE_ACTIONS)},
+                "value": {"type": "NUMBER", "description": "Brightness 0-100 or temperature in °C, for set_* actions."},
+            },
+            "required": ["device", "action"],
+        },
+    },
+    {
+        "name": "get_weather",
+        "description": "Current weather for a city, or for the user's current location when no city is given.",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "city": {"type": "STRING", "description": "City name; omit for the current location."},
+            },
+        },
+    },
+    {
+        "name": "get_news",
+        "description": "Latest news headlines.",
+        "parameters": {
+            "type": "OBJECT",
+            "properties": {
+                "category": {"type": "STRING", "enum": list(NEWS_CATEGORIES)},
+                "country": {"type": "STRING", "description": "Two-letter country code, default us."},
+            },
+        },
+    },
+    {"name": "get_joke", "description": "Tell a joke."},
+    {"name": "get_location", "description": "The user's current location."},
+]
+TOOLS = [{"function_declarations": FUNCTION_DECLARATIONS}]
+
+SYSTEM_PROMPT_TEMPLATE = """You are Beemo, a friendly and intelligent smart home assistant. You can control devices and have natural conversations.
+
+Current Context:
+
+Time: {time}
+
+Location: {location}
+
+Your Capabilities:
+
+Control smart home devices using natural language
+
+Get weather information for any city or current location
+
+Fetch latest news (general or by category)
+
+Tell jokes
+
+Determine current location
+
+Answer questions and engage in conversation
+
+Remember context from earlier in the conversation
+
+Special Instructions:
+
+Use the provided functions to control devices (control_device, one call per device, using the device IDs listed below) and to get the weather, news, jokes or the current location. Several functions may be called in one response.
+
+Alongside a function call, reply with at most one short sentence; the results are read out to the user after it.
+
+Maintain conversation context and remember recent device states.
+
+Be natural and friendly in your responses, while being efficient with device control.
+"""
+
+SERVICE_FUNCTIONS = {'get_weather': 'weather', 'get_news': 'news', 'get_joke': 'joke', 'get_location': 'location'}
+
+
+def build_system_prompt(now: datetime, location_name: str = "your current home") -> str:
+    """The static system prompt. Devices are not listed: each request carries only the ones relevant to it."""
+    return SYSTEM_PROMPT_TEMPLATE.format(time=now.strftime('%I:%M %p on %A, %B %d, %Y'), location=location_name)
+
+
+class ToolCallError(ValueError):
+    """Raised when a function call from the model does not match its declaration."""
+
+
+@dataclass
+class DeviceCall:
+    device: str
+    action: str
+    value: Optional[float] = None
+
+
+@dataclass
+class ServiceCall:
+    service: str  # 'weather', 'news', 'joke' or 'location', as understood by _get_service_response
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+ToolCall = Union[DeviceCall, ServiceCall]
+
+
+@dataclass
+class LLMReply:
+    """One model response: the text to speak and the tool calls to run."""
+    text: str = ""
+    calls: List[ToolCall] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)  # Calls that were dropped as invalid
+    source: str = "gemini"  # Backend that produced the reply ("gemini" or "local")
+
+    @property
+    def has_side_effects(self) -> bool:
+        return any(isinstance(call, DeviceCall) for call in self.calls)
+
+
+def _args_dict(args) -> Dict[str, Any]:
+    """Function call args arrive as a proto map; plain dicts are accepted too (tests, cached replies)."""
+    if args is None:
+        return {}
+    return {key: args[key] for key in args}
+
+
+def parse_function_call(name: str, args) -> ToolCall:
+    """Validate one function call against FUNCTION_DECLARATIONS. Raises ToolCallError."""
+    args = _args_dict(args)
+    if name == 'control_device':
+        device = str(args.get('device') or '').strip()
+        action = str(args.get('action') or '').strip().lower()
+        if not device:
+            raise ToolCallError("control_device without a device")
+        if action not in DEVICE_ACTIONS:
+            raise ToolCallError(f"control_device with unknown action '{action}'")
+        value = args.get('value')
+        if action in ('set_brightness', 'set_temperature'):
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                raise ToolCallError(f"{action} on '{device}' needs a numeric value, got {value!r}")
+        else:
+            value = None
+        return DeviceCall(device=device, action=action, value=value)
+
+    if name in SERVICE_FUNCTIONS:
+        params = {}
+        if name == 'get_weather':
+            city = str(args.get('city') or '').strip()
+            params = {'city': city} if city else {'location': 'current'}
+        elif name == 'get_news':
+            category = args.get('category')
+            if category and category not in NEWS_CATEGORIES:
+                raise ToolCallError(f"get_news with unknown category '{category}'")
+            params = {'country': str(args.get('country') or 'us').lower(), 'category': category or None}
+        return ServiceCall(service=SERVICE_FUNCTIONS[name], params=params)
+
+    raise ToolCallError(f"unknown function '{name}'")
+
+
+def split_parts(response) -> Tuple[str, List[Tuple[str, Any]]]:
+    """Text and raw (name, args) function calls of a response or stream chunk.
+
+    Reads the parts directly: `response.text` raises as soon as a part is a
+    function call.
+    """
+    texts, calls = [], []
+    for candidate in getattr(response, 'candidates', None) or []:
+        content = getattr(candidate, 'content', None)
+        for part in getattr(content, 'parts', None) or []:
+            function_call = getattr(part, 'function_call', None)
+            if function_call is not None and getattr(function_call, 'name', ''):
+                calls.append((function_call.name, function_call.args))
+            elif getattr(part, 'text', ''):
+                texts.append(part.text)
+        break  # Only the first candidate is used
+    return "".join(texts), calls
+
+
+def build_reply(text: str, raw_calls: List[Tuple[str, Any]]) -> LLMReply:
+    """Typed reply from collected text and raw calls; invalid calls are logged and reported in `errors`."""
+    reply = LLMReply(text=text)
+    for name, args in raw_calls:
+        try:
+            reply.calls.append(parse_function_call(name, args))
+        except ToolCallError as e:
+            logger.warning(f"Ignoring invalid tool call from the LLM: {e}")
+            reply.errors.append(str(e))
+    return reply
+
+
+def parse_response(response) -> LLMReply:
+    return build_reply(*split_parts(response))
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+Offline LLM fallback
+A small local model (llama.cpp, CPU only) kept warm in worker processes, used
+when Gemini is unreachable or slower than the local model. Run as a script with
+--worker to start one worker; it reads JSON requests from stdin and writes JSON
+replies to stdout, one per line.
+
+Backends:
+    llama  - llama-cpp-python with a GGUF model (optional dependency)
+    stub   - deterministic rule-based stand-in, no weights, no network (testing)
+
+Usage:
+    python local_llm.py --backend stub "turn off the kitchen light"
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import queue
+import argparse
+import logging
+import collections
+import threading
+import subprocess
+import importlib.util
+from typing import Dict, List, Optional, Tuple
+
+from llm_tools import FUNCTION_DECLARATIONS, LLMReply, build_reply
+from metrics import LatencyTracker
+
+LLAMA_CPP_AVAILABLE = importlib.util.find_spec("llama_cpp") is not None
+
+STDERR_TAIL_LINES = 20  # Worker stderr lines kept for error reports
+
+logger = logging.getLogger(__name__)
+
+# The local model answers in this JSON shape instead of Gemini function calls
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "say": {"type": "string"},
+        "calls": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string", "enum": [d["name"] for d in FUNCTION_DECLARATIONS]},
+                    "args": {"type": "object"},
+                },
+                "required": ["name"],
+            },
+        },
+    },
+    "required": ["say"],
+}
+
+
+def tool_instructions() -> str:
+    lines = ['Answer only with JSON: {"say": "<short reply>", "calls": [{"name": "<function>", "args": {...}}]}.',
+             "Functions:"]
+    for declaration in FUNCTION_DECLARATIONS:
+        params = declaration.get("parameters", {}).get("properties", {})
+        args = ", ".join(f"{name}{'=' + '|'.join(spec['enum']) if 'enum' in spec else ''}" for name, spec in params.items())
+        lines.append(f"- {declaration['name']}({args}): {declaration['description']}")
+    return "\n".join(lines)
+
+
+class LocalLLMError(Exception):
+    """Raised when the local model is unavailable, crashed or timed out."""
+
+
+# --- Worker side -------------------------------------------------------------
+
+class LlamaCppModel:
+    name = "llama"
+
+    def __init__(self, model_path: str, n_ctx: int = 2048, threads: Optional[int] = None):
+        from llama_cpp import Llama
+        self.llm = Llama(model_path=model_path, n_ctx=n_ctx, n_threads=threads or os.cpu_count(), verbose=False)
+        self.instructions = tool_instructions()
+
+    def generate(self, messages: List[Dict], max_tokens: int) -> Tuple[str, List[Tuple[str, Dict]]]:
+        chat = [{"role": m["role"], "content": m["content"]} for m in messages]
+        if chat and chat[0]["role"] == "system":
+            chat[0]["content"] += "\n\n" + self.instructions
+        else:
+            chat.insert(0, {"role": "system", "content": self.instructions})
+        result = self.llm.create_chat_completion(
+            messages=chat, max_tokens=max_tokens, temperature=0.2,
+            response_format={"type": "json_object", "schema": RESPONSE_SCHEMA})
+        data = json.loads(result["choices"][0]["message"]["content"])
+        return data.get("say", ""), [(c.get("name", ""), c.get("args") or {}) for c in data.get("calls", [])]
+
+
+class StubModel:
+    """Rule-based stand-in for a local model: no weights, no network. Exercises the offline path in tests."""
+
+    name = "stub"
+
+    def generate(self, messages: List[Dict], max_tokens: int) -> Tuple[str, List[Tuple[str, Dict]]]:
+        user_turns = [m["content"] for m in messages if m["role"] == "user"]
+        # Context may be inlined ahead of the utterance ("...---\n\nUser: <utterance>")
+        utterance = user_turns[-1].rsplit("User: ", 1)[-1].strip() if user_turns else ""
+        text = utterance.lower().rstrip(".!?")
+        match = re.match(r"^(?:please )?(?:turn|switch) (on|off) (?:the )?(.+)$", text) or \
+            re.match(r"^(?:please )?(?:turn|switch) (?:the )?(.+) (on|off)$", text)
+        if match:
+            state, device = match.groups() if match.group(1) in ("on", "off") else match.groups()[::-1]
+            return "", [("control_device", {"device": device, "action": f"turn_{state}"})]
+        if "joke" in text:
+            return "", [("get_joke", {})]
+        if "weather" in text:
+            city = re.search(r"\bin ([a-z ]+)$", text)
+            return "", [("get_weather", {"city": city.group(1).title()} if city else {})]
+        return "I'm running offline right now, so I can only help with simple requests.", []
+
+
+def load_model(backend: str, model_path: Optional[str], n_ctx: int, threads: Optional[int]):
+    if backend == "stub":
+        return StubModel()
+    if backend == "llama":
+        return LlamaCppModel(model_path, n_ctx=n_ctx, threads=threads)
+    raise ValueError(f"Unknown local LLM backend '{backend}'")
+
+
+def worker_main(backend: str, model_path: Optional[str], n_ctx: int, threads: Optional[int]):
+    """Serve requests from stdin until it closes. Logs go to stderr; stdout carries only replies."""
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    model = load_model(backend, model_path, n_ctx, threads)
+    print(json.dumps({"ready": True, "backend": model.name}), flush=True)
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        try:
+            text, calls = model.generate(request["messages"], request.get("max_tokens", 256))
+            reply = {"id": request.get("id"), "text": text, "calls": [{"name": n, "args": a} for n, a in calls]}
+        except Exception as e:
+            reply = {"id": request.get("id"), "error": f"{type(e).__name__}: {e}"}
+        print(json.dumps(reply), flush=True)
+
+
+# --- Parent side -------------------------------------------------------------
+
+class LocalLLMWorker:
+    """One worker process; its model stays loaded between requests."""
+
+    def __init__(self, command: List[str], ready_timeout: float):
+        self.command = command
+        self.ready_timeout = ready_timeout
+        self.process = None
+        self.starting = False       # Pool bookkeeping, guarded by the pool's condition
+        self.busy = False
+        self.launch_failed = False
+        self._lines = queue.Queue()
+        self._stderr = collections.deque(maxlen=STDERR_TAIL_LINES)
+        self._stderr_thread = None
+        self._next_id = 0
+
+    def start(self):
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.PIPE, text=True, bufsize=1)
+        self._lines = queue.Queue()
+        self._stderr = collections.deque(maxlen=STDERR_TAIL_LINES)
+        threading.Thread(target=self._read, args=(self.process, self._lines), name="local-llm-reader", daemon=True).start()
+        self._stderr_thread = threading.Thread(target=self._read_stderr, args=(self.process, self._stderr),
+                                               name="local-llm-stderr", daemon=True)
+        self._stderr_thread.start()
+        try:
+            self._expect(lambda msg: msg.get("ready"), self.ready_timeout, "start")
+        except LocalLLMError as e:
+            tail = self.stderr_tail()
+            raise LocalLLMError(f"{e}; worker stderr:\n{tail}" if tail else str(e)) from None
+
+    @staticmethod
+    def _read(process: subprocess.Popen, lines: queue.Queue):
+        for line in process.stdout:
+            lines.put(line)
+        lines.put(None)  # EOF: the process exited
+
+    @staticmethod
+    def _read_stderr(process: subprocess.Popen, tail: collections.deque):
+        """Drain stderr (so the worker never blocks on it), keeping the last lines for error reports."""
+        for line in process.stderr:
+            tail.append(line.rstrip())
+
+    def stderr_tail(self) -> str:
+        """The worker's last stderr lines, e.g. a model load error."""
+        if self._stderr_thread is not None and self.process.poll() is not None:
+            self._stderr_thread.join(timeout=1.0)  # An exited worker's last lines may still be in the pipe
+        return "\n".join(self._stderr)
+
+    def _expect(self, matches, timeout: float, what: str) -> Dict:
+        ends_at = time.time() + timeout
+        while True:
+            remaining = ends_at - time.time()
+            if remaining <= 0:
+                raise LocalLLMError(f"local model did not {what} within {timeout:.0f}s")
+            try:
+                line = self._lines.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if line is None:
+                try:
+                    code = self.process.wait(timeout=1.0)
+                except subprocess.TimeoutExpired:
+                    code = None
+                raise LocalLLMError(f"local model worker exited (code {code})")
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Stray output from a native library
+            if matches(message):
+                return message
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def request(self, messages: List[Dict], max_tokens: int, timeout: float) -> Dict:
+        self._next_id += 1
+        request_id = self._next_id
+        try:
+            self.process.stdin.write(json.dumps({"id": request_id, "messages": messages, "max_tokens": max_tokens}) + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise LocalLLMError(f"local model worker is gone: {e}")
+        return self._expect(lambda msg: msg.get("id") == request_id, timeout, "answer")
+
+    def close(self):
+        if self.process and self.process.poll() is None:
+            self.process.kill()
+            self.process.wait(timeout=5)
+
+
+class LocalLLMPool:
+    """Warm local-model workers; each request goes to an idle one.
+
+    Workers start in the background so model loading does not delay boot. A
+    worker that times out or crashes is killed and relaunched: llama.cpp
+    cannot be interrupted mid-generation, and a stuck worker would hold its
+    slot. A worker whose launch failed is not retried, so a missing model
+    fails fast instead of costing a timeout per request.
+    """
+
+    def __init__(self, backend: str = "llama", model_path: Optional[str] = None, pool_size: int = 1,
+                 n_ctx: int = 2048, threads: Optional[int] = None, timeout: float = 30.0,
+                 max_tokens: int = 256, ready_timeout: float = 120.0):
+        self.backend = backend
+        self.model_path = model_path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+        self.command = [sys.executable, os.path.abspath(__file__), "--worker", "--backend", backend, "--ctx", str(n_ctx)]
+        if model_path:
+            self.command += ["--model", model_path]
+        if threads:
+            self.command += ["--threads", str(threads)]
+        self.ready_timeout = ready_timeout
+        self._workers = []
+        self._cond = threading.Condition()
+        self.latency = LatencyTracker()
+        self.stats = {'requests': 0, 'failures': 0, 'restarts': 0}
+        self.last_error = None
+
+    def available(self) -> bool:
+        if self.backend == "stub":
+            return True
+        return self.backend == "llama" and LLAMA_CPP_AVAILABLE and bool(self.model_path) and os.path.exists(self.model_path)
+
+    def start(self):
+        for _ in range(self.pool_size):
+            worker = LocalLLMWorker(self.command, self.ready_timeout)
+            self._workers.append(worker)
+            self._relaunch(worker)
+
+    def _relaunch(self, worker: LocalLLMWorker):
+        worker.starting, worker.busy, worker.launch_failed = True, False, False
+        threading.Thread(target=self._launch, args=(worker,), name="local-llm-start", daemon=True).start()
+
+    def _launch(self, worker: LocalLLMWorker):
+        try:
+            worker.start()
+            logger.info(f"Local LLM worker ready ({self.backend}).")
+        except Exception as e:
+            self.last_error = str(e)
+            worker.launch_failed = True
+            logger.warning(f"Local LLM worker failed to start: {e}")
+            worker.close()
+        with self._cond:
+            worker.starting = False
+            self._cond.notify_all()
+
+    def ready(self) -> bool:
+        """True when a worker is loaded and idle."""
+        with self._cond:
+            return any(w.alive() and not w.busy and not w.starting for w in self._workers)
+
+    def _take(self, timeout: float) -> Optional[LocalLLMWorker]:
+        ends_at = time.time() + timeout
+        with self._cond:
+            for worker in self._workers:
+                if not worker.alive() and not (worker.starting or worker.busy or worker.launch_failed):
+                    self.stats['restarts'] += 1
+                    self._relaunch(worker)  # Crashed while idle
+            while True:
+                for worker in self._workers:
+                    if worker.alive() and not worker.busy and not worker.starting:
+                        worker.busy = True
+                        return worker
+                if not any(w.starting or w.alive() for w in self._workers):
+                    return None  # Nothing will become ready
+                remaining = ends_at - time.time()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def _release(self, worker: LocalLLMWorker):
+        with self._cond:
+            worker.busy = False
+            self._cond.notify_all()
+
+    def generate(self, messages: List[Dict], timeout: Optional[float] = None) -> LLMReply:
+        """Reply from the local model. Raises LocalLLMError."""
+        timeout = timeout or self.timeout
+        started = time.time()
+        self.stats['requests'] += 1
+        worker = self._take(timeout)
+        if worker is None:
+            self.stats['failures'] += 1
+            raise LocalLLMError(f"no local model worker is ready ({self.last_error or 'still loading'})")
+        try:
+            message = worker.request(messages, self.max_tokens, max(0.1, timeout - (time.time() - started)))
+        except LocalLLMError as e:
+            self.stats['failures'] += 1
+            self.stats['restarts'] += 1
+            self.last_error = str(e)
+            worker.close()
+            with self._cond:
+                self._relaunch(worker)
+            raise
+        self._release(worker)
+        if message.get("error"):
+            self.stats['failures'] += 1
+            self.last_error = message["error"]
+            raise LocalLLMError(message["error"])
+        self.latency.record(time.time() - started)
+        reply = build_reply(message.get("text", ""), [(c.get("name", ""), c.get("args")) for c in message.get("calls", [])])
+        reply.source = "local"
+        return reply
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            **self.latency.get_stats(),
+            'backend': self.backend,
+            'workers_alive': sum(1 for w in self._workers if w.alive()),
+            'ready': self.ready(),
+            'last_error': self.last_error,
+        }
+
+    def close(self):
+        for worker in self._workers:
+            worker.close()
+
+
+class LLMBackendSelector:
+    """Orders the LLM backends per request by availability and latency.
+
+    Backends are listed in order of preference. Failures put a backend in an
+    exponentially growing cooldown, during which it goes last, so an outage
+    costs one failed request instead of a deadline per command. A backend
+    whose p95 exceeds `slow_p95_seconds` goes behind one that is measurably
+    faster. Every `probe_every`-th request keeps the preference order so a
+    demoted backend can recover.
+    """
+
+    def __init__(self, backends: List[str], slow_p95_seconds: float = 6.0, base_cooldown: float = 30.0,
+                 max_cooldown: float = 600.0, probe_every: int = 10, min_samples: int = 3):
+        self.backends = list(backends)
+        self.slow_p95_seconds = slow_p95_seconds
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.probe_every = probe_every
+        self.min_samples = min_samples
+        self._requests = 0
+        self._latency = {b: LatencyTracker() for b in self.backends}
+        self._health = {b: {'failures': 0, 'consecutive_failures': 0, 'cooldown_until': 0.0} for b in self.backends}
+        self._lock = threading.Lock()
+
+    def _p95(self, backend: str) -> Optional[float]:
+        tracker = self._latency[backend]
+        return tracker.percentile(95) if len(tracker) >= self.min_samples else None
+
+    def order(self, available: Optional[List[str]] = None) -> List[str]:
+        """Backends to try for the next request, best first."""
+        self._requests += 1
+        return self._order(available)
+
+    def _order(self, available: Optional[List[str]] = None) -> List[str]:
+        candidates = [b for b in self.backends if available is None or b in available]
+        now = time.time()
+        healthy = [b for b in candidates if self._health[b]['cooldown_until'] <= now]
+        cooling = [b for b in candidates if b not in healthy]
+        if self.probe_every and self._requests % self.probe_every == 0:
+            return healthy + cooling
+        fast = [b for b in healthy if not self._slower_than_alternative(b, healthy)]
+        return fast + [b for b in healthy if b not in fast] + cooling
+
+    def _slower_than_alternative(self, backend: str, healthy: List[str]) -> bool:
+        p95 = self._p95(backend)
+        if p95 is None or p95 <= self.slow_p95_seconds:
+            return False
+        return any(other != backend and self._p95(other) is not None and self._p95(other) < p95 for other in healthy)
+
+    def record(self, backend: str, seconds: float, ok: bool):
+        self._latency[backend].record(seconds)
+        with self._lock:
+            health = self._health[backend]
+            if ok:
+                health['consecutive_failures'] = 0
+                health['cooldown_until'] = 0.0
+                return
+            health['failures'] += 1
+            health['consecutive_failures'] += 1
+            cooldown = min(self.max_cooldown, self.base_cooldown * 2 ** (health['consecutive_failures'] - 1))
+            health['cooldown_until'] = time.time() + cooldown
+        logger.warning(f"LLM backend '{backend}' failed; trying it last for {cooldown:.0f}s.")
+
+    def get_stats(self) -> Dict:
+        now = time.time()
+        stats = {b: {**self._latency[b].get_stats(), 'failures': self._health[b]['failures'],
+                     'cooldown_remaining_s': round(max(0.0, self._health[b]['cooldown_until'] - now), 1)}
+                 for b in self.backends}
+        stats['order'] = self._order()
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Beemo's offline LLM worker.")
+    parser.add_argument('utterance', nargs='?', help="Ask the local model once and print the parsed reply")
+    parser.add_argument('--worker', action='store_true', help="Serve JSON requests on stdin (used by LocalLLMPool)")
+    parser.add_argument('--backend', default="llama", choices=["llama", "stub"])
+    parser.add_argument('--model', help="GGUF model file for the llama backend")
+    parser.add_argument('--ctx', type=int, default=2048, help="Context window in tokens")
+    parser.add_argument('--threads', type=int, help="CPU threads (default: all cores)")
+    args = parser.parse_args()
+
+    if args.worker:
+        worker_main(args.backend, args.model, args.ctx, args.threads)
+        return
+    if not args.utterance:
+        parser.error("an utterance is required unless --worker is given")
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    pool = LocalLLMPool(backend=args.backend, model_path=args.model, n_ctx=args.ctx, threads=args.threads)
+    if not pool.available():
+        print(f"Local backend '{args.backend}' is not available (llama-cpp-python installed and --model given?).")
+        sys.exit(1)
+    pool.start()
+    try:
+        print(pool.generate([{"role": "user", "content": args.utterance}], timeout=pool.ready_timeout))
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
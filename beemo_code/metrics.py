@@ -0,0 +1,107 @@
+import os
+import json
+import math
+import time
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+
+class LatencyTracker:
+    """Rolling window of latency samples (seconds) with percentile summaries."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Nearest-rank percentile of the current window, or None with no samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(0, min(len(samples) - 1, math.ceil(p / 100.0 * len(samples)) - 1))
+        return samples[rank]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def get_stats(self) -> Dict:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            'count': self.count,
+            'p50_ms': round(p50 * 1000, 1) if p50 is not None else None,
+            'p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+HISTOGRAM_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram plus rolling percentiles."""
+
+    def __init__(self, buckets_ms=HISTOGRAM_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)  # Last bucket is +inf
+        self.sum_seconds = 0.0
+        self.latency = LatencyTracker()
+
+    def observe(self, seconds: float):
+        ms = seconds * 1000
+        index = next((i for i, bound in enumerate(self.buckets_ms) if ms <= bound), len(self.buckets_ms))
+        self.counts[index] += 1
+        self.sum_seconds += seconds
+        self.latency.record(seconds)
+
+    def to_dict(self) -> Dict:
+        count = self.latency.count
+        labels = [f"le_{bound}ms" for bound in self.buckets_ms] + ["le_inf"]
+        return {
+            **self.latency.get_stats(),
+            'mean_ms': round(self.sum_seconds * 1000 / count, 1) if count else None,
+            'buckets': {label: n for label, n in zip(labels, self.counts) if n},
+        }
+
+
+class StageMetrics:
+    """Per-stage latency histograms, split by whether the audio came from a cache.
+
+    Stages are free-form names such as "speech.synthesis" or "boot.decode";
+    `cache_hit` is None for stages where caching does not apply.
+    """
+
+    def __init__(self):
+        self._histograms = {}  # (stage, cache label) -> Histogram
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float, cache_hit: Optional[bool] = None):
+        label = "n/a" if cache_hit is None else ("cache_hit" if cache_hit else "cache_miss")
+        with self._lock:
+            histogram = self._histograms.get((stage, label))
+            if histogram is None:
+                histogram = self._histograms[(stage, label)] = Histogram()
+            histogram.observe(seconds)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            items = sorted(self._histograms.items())
+        stats = {}
+        for (stage, label), histogram in items:
+            stats.setdefault(stage, {})[label] = histogram.to_dict()
+        return stats
+
+    def dump(self, path: str) -> str:
+        """Write the current metrics as JSON to `path` (atomically) and return the path."""
+        payload = {'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'stages': self.get_stats()}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(payload, f, indent=2)
+        os.replace(tmp_path, path)
+        return path
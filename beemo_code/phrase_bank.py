@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Pre-rendered phrase bank
+Pre-synthesizes fixed response phrases, template fragments ("Turned on", "to",
+"50%", ...) and device names, so templated device confirmations can be
+assembled from PCM fragments at runtime without a TTS network call.
+
+Install-time build:
+    python phrase_bank.py [--dir DIR] [--devices names.json]
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import argparse
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+from pydub import AudioSegment
+
+from speech_pipeline import split_sentences
+
+logger = logging.getLogger(__name__)
+
+PHRASE_BANK_DIR_DEFAULT = "/home/pi/beemo/robot/phrase_bank"
+
+# Whole responses spoken verbatim from run(), _switch_mode() and friends
+FIXED_PHRASES = [
+    "Hello! I'm Beemo, your smart home assistant. How can I help you today?",
+    "I'm listening for your commands.",
+    "Voice input is not available. Please use text input.",
+    "Warning: I'm having trouble accessing the microphone for continuous listening.",
+    "Switched to platform mode. Type 'help' for commands.",
+    "Switched to assistant mode.",
+    "Goodbye! Shutting down.",
+    "Shutting down as requested.",
+    "I encountered an unexpected problem. Please try again.",
+    "Rebooting system...",
+    "Shutting down...",
+]
+
+# Templates from _execute_device_command: (pattern, fragments); {slot} fragments come from the match
+TEMPLATES = [
+    (re.compile(r"^Set brightness of (?P<name>.+) to (?P<value>\d{1,3})%$", re.IGNORECASE), ["Set brightness of", "{name}", "to", "{value}%"]),
+    (re.compile(r"^Set (?P<name>.+) to (?P<value>\d{1,2})(?:\.0)?°C$", re.IGNORECASE), ["Set", "{name}", "to", "{value}°C"]),
+    (re.compile(r"^Turned on (?P<name>.+)$", re.IGNORECASE), ["Turned on", "{name}"]),
+    (re.compile(r"^Turned off (?P<name>.+)$", re.IGNORECASE), ["Turned off", "{name}"]),
+    (re.compile(r"^Unlocked (?P<name>.+)$", re.IGNORECASE), ["Unlocked", "{name}"]),
+    (re.compile(r"^Locked (?P<name>.+)$", re.IGNORECASE), ["Locked", "{name}"]),
+]
+TEMPLATE_FRAGMENTS = ["Set brightness of", "Set", "to", "Turned on", "Turned off", "Locked", "Unlocked"]
+VALUE_FRAGMENTS = [f"{n}%" for n in range(0, 101)] + [f"{t}°C" for t in range(5, 36)]
+
+FRAGMENT_GAP_MS = 60   # Pause between fragments of one sentence
+SENTENCE_GAP_MS = 250  # Pause between assembled sentences
+
+
+def normalize(text: str) -> str:
+    """Fragment lookup key: lowercase, single spaces, no surrounding punctuation."""
+    return re.sub(r"\s+", " ", text.strip().strip(".!?()").strip()).lower()
+
+
+class PhraseBank:
+    """On-disk store of pre-synthesized fragments plus runtime assembly of templated responses."""
+
+    def __init__(self, bank_dir: str = PHRASE_BANK_DIR_DEFAULT):
+        self.bank_dir = bank_dir
+        self._index_path = os.path.join(bank_dir, "index.json")
+        self._lock = threading.Lock()
+        self._index = {}      # normalized text -> file name
+        self._loaded = {}     # normalized text -> AudioSegment
+        self.stats = {'assembled': 0, 'misses': 0}
+        os.makedirs(bank_dir, exist_ok=True)
+        if os.path.exists(self._index_path):
+            try:
+                with open(self._index_path) as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Phrase bank index unreadable, starting empty: {e}")
+        logger.info(f"Phrase bank loaded: {len(self._index)} fragments in {bank_dir}")
+
+    def has(self, text: str) -> bool:
+        return normalize(text) in self._index
+
+    def build(self, texts: Iterable[str], synthesize: Callable[[str], AudioSegment]) -> int:
+        """Synthesize and store every fragment not already in the bank. Returns the number added."""
+        added = 0
+        for text in texts:
+            key = normalize(text)
+            if not key or key in self._index:
+                continue
+            try:
+                segment = synthesize(text)
+            except Exception as e:
+                logger.warning(f"Could not pre-render phrase '{text}': {e}")
+                continue
+            file_name = hashlib.sha256(key.encode('utf-8')).hexdigest()[:32] + ".wav"
+            segment.export(os.path.join(self.bank_dir, file_name), format='wav')
+            with self._lock:
+                self._index[key] = file_name
+                self._loaded[key] = segment
+            added += 1
+        if added:
+            self._save_index()
+            logger.info(f"Phrase bank: added {added} fragment(s), {len(self._index)} total.")
+        return added
+
+    def _save_index(self):
+        with self._lock:
+            tmp_path = self._index_path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self._index, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self._index_path)
+
+    def _fragment(self, text: str) -> Optional[AudioSegment]:
+        key = normalize(text)
+        segment = self._loaded.get(key)
+        if segment is None:
+            file_name = self._index.get(key)
+            if not file_name:
+                return None
+            try:
+                segment = AudioSegment.from_wav(os.path.join(self.bank_dir, file_name))
+            except Exception as e:
+                logger.warning(f"Phrase bank fragment '{text}' unreadable: {e}")
+                return None
+            self._loaded[key] = segment
+        return segment
+
+    def _assemble_part(self, part: str) -> Optional[AudioSegment]:
+        whole = self._fragment(part)
+        if whole is not None:
+            return whole
+        for pattern, fragments in TEMPLATES:
+            match = pattern.match(part)
+            if not match:
+                continue
+            pieces = [self._fragment(fragment.format(**match.groupdict())) for fragment in fragments]
+            if any(piece is None for piece in pieces):
+                return None
+            gap = AudioSegment.silent(duration=FRAGMENT_GAP_MS, frame_rate=pieces[0].frame_rate)
+            assembled = pieces[0]
+            for piece in pieces[1:]:
+                assembled = assembled + gap + piece
+            return assembled
+        return None
+
+    def assemble(self, text: str) -> Optional[AudioSegment]:
+        """Audio for `text` built purely from bank fragments, or None if any part is missing."""
+        whole = self._fragment(text)
+        if whole is not None:
+            self.stats['assembled'] += 1
+            return whole
+        parts = [normalize(p) for p in re.split(r"(?<=[.!?])\s+|[()]", text) if normalize(p)]
+        if not parts:
+            return None
+        segments = []
+        for part in parts:
+            segment = self._assemble_part(part)
+            if segment is None:
+                self.stats['misses'] += 1
+                return None
+            segments.append(segment)
+        gap = AudioSegment.silent(duration=SENTENCE_GAP_MS, frame_rate=segments[0].frame_rate)
+        assembled = segments[0]
+        for segment in segments[1:]:
+            assembled = assembled + gap + segment
+        self.stats['assembled'] += 1
+        return assembled
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'fragments': len(self._index)}
+
+
+def fixed_fragments(device_names: Iterable[str] = ()) -> List[str]:
+    """Everything the bank should contain for the given device names."""
+    texts = []
+    for phrase in FIXED_PHRASES:
+        texts.append(phrase)
+        texts.extend(split_sentences(phrase))  # speak_or_print synthesizes per sentence
+    texts.extend(TEMPLATE_FRAGMENTS)
+    texts.extend(VALUE_FRAGMENTS)
+    texts.extend(device_names)
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render Beemo's phrase bank.")
+    parser.add_argument('--dir', default=PHRASE_BANK_DIR_DEFAULT, help="Phrase bank directory")
+    parser.add_argument('--devices', help="JSON file with a list of device names to pre-render")
+    args = parser.parse_args()
+
+    import io
+    from gtts import gTTS
+    from audio_codec import decode_mp3_bytes, normalize_clip
+    from audio_output import OUTPUT_SAMPLE_RATE
+
+    def synthesize(text: str) -> AudioSegment:
+        buffer = io.BytesIO()
+        gTTS(text=text, lang='en').write_to_fp(buffer)
+        return normalize_clip(decode_mp3_bytes(buffer.getvalue()), OUTPUT_SAMPLE_RATE)
+
+    device_names = []
+    if args.devices:
+        with open(args.devices) as f:
+            device_names = json.load(f)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    bank = PhraseBank(args.dir)
+    added = bank.build(fixed_fragments(device_names), synthesize)
+    print(f"Phrase bank ready: {added} new fragment(s), {bank.get_stats()['fragments']} total.")
+
+
+if __name__ == "__main__":
+    main()
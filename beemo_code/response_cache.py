@@ -0,0 +1,144 @@
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Dropped before matching so "hey beemo, tell me a joke please" and "tell me a joke" share an entry
+FILLER_WORDS = {'hey', 'hi', 'beemo', 'bmo', 'please', 'ok', 'okay', 'so', 'um', 'uh'}
+# Answers that depend on the moment or on the previous turn must not be reused
+TIME_SENSITIVE = re.compile(r"\b(time|date|today|tonight|tomorrow|yesterday|now|day|clock)\b")
+CONTEXT_DEPENDENT = re.compile(r"\b(it|that|this|them|those|these|again|other|another|previous|last one)\b")
+# Function words a paraphrase may add or drop; every other word (names, numbers, ...) must match exactly
+STOP_WORDS = {
+    'a', 'an', 'the', 'of', 'in', 'on', 'at', 'to', 'for', 'with', 'about', 'is', 'are', 'was', 'be', 'do', 'does',
+    'what', "what's", 'whats', 'who', "who's", 'which', 'how', "how's", 'me', 'my', 'you', 'your', 'i', "i'd",
+    'can', 'could', 'would', 'will', 'tell', 'give', 'know', 'like', 'some', 'any', 'just', 'really', 'there',
+}
+MIN_SIMILARITY = 0.95  # Below this, near-identical questions with different answers collide
+
+
+def normalize_utterance(text: str) -> str:
+    words = re.findall(r"[a-z0-9']+", text.lower())
+    return " ".join(w for w in words if w not in FILLER_WORDS)
+
+
+def is_cacheable_query(text: str) -> bool:
+    normalized = normalize_utterance(text)
+    return bool(normalized) and not TIME_SENSITIVE.search(normalized) and not CONTEXT_DEPENDENT.search(normalized)
+
+
+def device_state_fingerprint(device_index: Iterable[Dict]) -> str:
+    """Short hash of every device's name, type and state; changes whenever any device changes."""
+    snapshot = sorted((d['id'], d['name'], d['type'], d.get('state', {})) for d in device_index)
+    payload = json.dumps(snapshot, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def content_words(normalized: str) -> FrozenSet[str]:
+    return frozenset(w for w in normalized.split() if w not in STOP_WORDS)
+
+
+def _ngrams(text: str, n: int) -> Set[str]:
+    padded = f" {text} "
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+
+class ResponseCache:
+    """LRU + TTL cache of LLM responses keyed by normalised utterance, device-state fingerprint and context.
+
+    The context is the previous user turn: an elliptical follow-up ("and in
+    celsius", "what about paris") means something else after each question,
+    so its answer is only reused after the same one.
+
+    By default only exact normalised utterances hit. With `similarity_threshold`
+    set (at least MIN_SIMILARITY), a miss falls back to the most similar cached
+    utterance under the same fingerprint and context (Jaccard similarity of character
+    n-grams), but only if both have the same content words: "capital of
+    austria" never matches "capital of australia". That leaves paraphrases
+    that differ in function words ("what's the weather like" / "what is the
+    weather"). Callers decide what is stored; responses with side effects
+    must not be.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 6 * 3600,
+                 similarity_threshold: Optional[float] = None, ngram: int = 3):
+        if similarity_threshold is not None and similarity_threshold < MIN_SIMILARITY:
+            raise ValueError(f"similarity_threshold must be at least {MIN_SIMILARITY} (got {similarity_threshold})")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.ngram = ngram
+        self._entries = OrderedDict()  # (utterance, fingerprint, context) -> (response, stored_at, ngrams, content words), LRU first
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'similar_hits': 0, 'misses': 0, 'stores': 0, 'expired': 0, 'evictions': 0}
+
+    def get(self, utterance: str, fingerprint: str, context: str = "") -> Optional[Any]:
+        key = (normalize_utterance(utterance), fingerprint, normalize_utterance(context))
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[1] > self.ttl_seconds:
+                del self._entries[key]
+                self.stats['expired'] += 1
+                entry = None
+            if entry:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[0]
+
+            if self.similarity_threshold:
+                similar_key = self._most_similar(key, now)
+                if similar_key:
+                    self._entries.move_to_end(similar_key)
+                    self.stats['similar_hits'] += 1
+                    logger.debug(f"Response cache: '{key[0]}' matched '{similar_key[0]}'")
+                    return self._entries[similar_key][0]
+
+            self.stats['misses'] += 1
+            return None
+
+    def _most_similar(self, lookup_key, now: float):
+        utterance = lookup_key[0]
+        grams = _ngrams(utterance, self.ngram)
+        content = content_words(utterance)
+        best_key, best_score = None, 0.0
+        for key, (_, stored_at, entry_grams, entry_content) in self._entries.items():
+            if key[1:] != lookup_key[1:] or now - stored_at > self.ttl_seconds or entry_content != content:
+                continue
+            score = len(grams & entry_grams) / len(grams | entry_grams)
+            if score > best_score:
+                best_key, best_score = key, score
+        return best_key if best_score >= self.similarity_threshold else None
+
+    def put(self, utterance: str, fingerprint: str, response: Any, context: str = ""):
+        normalized = normalize_utterance(utterance)
+        if not normalized:
+            return
+        key = (normalized, fingerprint, normalize_utterance(context))
+        with self._lock:
+            self._entries[key] = (response, time.time(), _ngrams(normalized, self.ngram), content_words(normalized))
+            self._entries.move_to_end(key)
+            self.stats['stores'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['similar_hits'] + self.stats['misses']
+            hits = self.stats['hits'] + self.stats['similar_hits']
+            return {
+                **self.stats,
+                'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+                'entries': len(self._entries),
+            }
@@ -0,0 +1,144 @@
+import re
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, List, Optional, Callable, Any, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Keywords in a partial transcript that make a service request likely; matched as whole words
+SERVICE_KEYWORDS = {
+    'weather': ['weather', 'forecast', 'temperature outside', 'rain', 'sunny'],
+    'news': ['news', 'headlines'],
+    'joke': ['joke', 'funny'],
+    'location': ['where am i', 'my location', 'current location'],
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, shared by partial and final transcript matching."""
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def contains_phrase(tokens: Sequence[str], phrase: str) -> bool:
+    """True if the words of `phrase` appear consecutively in `tokens` ("rain" does not match "train")."""
+    words = tokenize(phrase)
+    if not words:
+        return False
+    return any(list(tokens[i:i + len(words)]) == words for i in range(len(tokens) - len(words) + 1))
+
+
+def mentions_service(tokens: Sequence[str], service: str) -> bool:
+    return any(contains_phrase(tokens, keyword) for keyword in SERVICE_KEYWORDS[service])
+
+
+class SpeculativeIntentProcessor:
+    """Runs cheap, side-effect free work on Vosk partial transcripts.
+
+    While the user is still talking it resolves device names against the
+    device index and prefetches service data (weather, news, ...). The final transcript then either confirms the speculation
+    (results are committed and reused) or the results are discarded.
+    """
+
+    def __init__(self, device_index_provider: Callable[[], List[Dict]],
+                 service_prefetchers: Optional[Dict[str, Callable[[], Any]]] = None,
+                 max_workers: int = 2):
+        self.device_index_provider = device_index_provider
+        self.service_prefetchers = service_prefetchers or {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculation")
+        self._lock = threading.Lock()
+        self.stats = {'utterances': 0, 'committed': 0, 'discarded': 0, 'prefetch_hits': 0}
+        self._reset()
+
+    def _reset(self):
+        self.last_partial = ""
+        self.devices = {}           # device id -> device entry resolved from partials
+        self.prefetches = {}        # service name -> Future
+        self.started_at = None
+
+    def begin(self):
+        """Start speculating for a new utterance, dropping anything left over."""
+        with self._lock:
+            self._cancel_pending()
+            self._reset()
+            self.started_at = time.time()
+            self.stats['utterances'] += 1
+
+    def on_partial(self, partial_text: str):
+        """Called from the recognizer loop whenever the partial transcript changes."""
+        partial_text = partial_text.strip().lower()
+        if not partial_text or partial_text == self.last_partial:
+            return
+        with self._lock:
+            self.last_partial = partial_text
+            tokens = tokenize(partial_text)
+
+            # Pre-resolve device names from the index
+            for entry in self.device_index_provider() or []:
+                if entry['id'] not in self.devices and entry['tokens'] and \
+                        all(tok in tokens for tok in entry['tokens']):
+                    self.devices[entry['id']] = entry
+                    logger.debug(f"Speculatively resolved device '{entry['name']}' from partial '{partial_text}'")
+
+            # Prefetch service data once per utterance
+            for service in SERVICE_KEYWORDS:
+                if service in self.prefetches or service not in self.service_prefetchers:
+                    continue
+                if mentions_service(tokens, service):
+                    logger.debug(f"Speculatively prefetching '{service}' for partial '{partial_text}'")
+                    self.prefetches[service] = self.executor.submit(self.service_prefetchers[service])
+
+    def commit(self, final_text: str) -> Dict[str, Any]:
+        """Confirm speculation against the final transcript.
+
+        Returns a dict with the confirmed 'devices' (by id) and 'services'
+        (service name -> Future). Anything the final text does not confirm is
+        discarded.
+        """
+        tokens = tokenize(final_text or "")
+        with self._lock:
+            devices = {dev_id: entry for dev_id, entry in self.devices.items()
+                       if all(tok in tokens for tok in entry['tokens'])}
+            services = {}
+            for service, future in self.prefetches.items():
+                if mentions_service(tokens, service):
+                    services[service] = future
+                else:
+                    future.cancel()
+
+            if devices or services:
+                self.stats['committed'] += 1
+            else:
+                self.stats['discarded'] += 1
+            if self.started_at:
+                logger.info(f"Speculation committed {len(devices)} device(s) and {len(services)} service(s) "
+                            f"{time.time() - self.started_at:.2f}s after speech started")
+            self._reset()
+        return {'devices': devices, 'services': services}
+
+    def discard(self):
+        """Drop all speculative results (e.g. nothing was recognized)."""
+        with self._lock:
+            if self.devices or self.prefetches:
+                self.stats['discarded'] += 1
+            self._cancel_pending()
+            self._reset()
+
+    def _cancel_pending(self):
+        for future in self.prefetches.values():
+            future.cancel()
+
+    @staticmethod
+    def prefetched_result(future: Optional[Future], timeout: float = 0.0) -> Any:
+        """Return a prefetched value if it is ready within `timeout`, else None."""
+        if future is None or future.cancelled():
+            return None
+        try:
+            return future.result(timeout=timeout)
+        except Exception:
+            return None
+
+    def shutdown(self):
+        self.discard()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,286 @@
+import re
+import queue
+import logging
+import itertools
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Split after sentence punctuation followed by whitespace (so never inside numbers like 3.5),
+# except after these abbreviations or a single-letter initial
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+_LAST_WORD = re.compile(r'(\S+)\.$')
+ABBREVIATIONS = frozenset({
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'mt', 'ave', 'rd', 'no', 'vs', 'etc',
+    'e.g', 'i.e', 'approx', 'min', 'max', 'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug',
+    'sep', 'sept', 'oct', 'nov', 'dec', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun',
+})
+MIN_SENTENCE_CHARS = 20  # Shorter pieces are merged with the next one to save synthesis round trips
+
+# Speech queue priorities: lower is spoken first
+PRIORITY_URGENT = 0   # Errors, remote restart/shutdown notices
+PRIORITY_NORMAL = 5   # Responses and device feedback
+PRIORITY_LOW = 9      # Startup chatter and status messages
+
+
+def sentence_boundaries(text: str, end: Optional[int] = None) -> List[int]:
+    """Offsets in `text[:end]` where a new sentence starts."""
+    boundaries = []
+    for match in _SENTENCE_END.finditer(text, 0, len(text) if end is None else end):
+        word = _LAST_WORD.search(text, 0, match.start())
+        if word:
+            word = word.group(1).lower()
+            if word in ABBREVIATIONS or (len(word) == 1 and word.isalpha()):
+                continue
+        boundaries.append(match.end())
+    return boundaries
+
+
+def split_sentences(text: str, min_chars: int = MIN_SENTENCE_CHARS) -> List[str]:
+    """Split a response into sentences suitable for incremental synthesis."""
+    text = text.strip()
+    starts = [0] + sentence_boundaries(text)
+    pieces = [p.strip() for p in (text[a:b] for a, b in zip(starts, starts[1:] + [len(text)])) if p.strip()]
+    sentences = []
+    pending = ""
+    for piece in pieces:
+        pending = f"{pending} {piece}".strip() if pending else piece
+        if len(pending) >= min_chars:
+            sentences.append(pending)
+            pending = ""
+    if pending:
+        if sentences and len(pending) < min_chars:
+            sentences[-1] = f"{sentences[-1]} {pending}"
+        else:
+            sentences.append(pending)
+    return sentences
+
+
+def _word_key(word: str) -> str:
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+def unspoken_remainder(full_text: str, spoken_text: str) -> Optional[str]:
+    """The part of `full_text` after `spoken_text`, compared word by word ignoring case and punctuation.
+
+    Returns None if `spoken_text` is not a prefix of `full_text` in that sense.
+    """
+    full_words, spoken_words = full_text.split(), spoken_text.split()
+    spoken_keys = [key for key in map(_word_key, spoken_words) if key]
+    matched, position = 0, 0
+    while matched < len(spoken_keys) and position < len(full_words):
+        key = _word_key(full_words[position])
+        position += 1
+        if not key:
+            continue  # Stray punctuation such as a spaced-out dash
+        if key != spoken_keys[matched]:
+            return None
+        matched += 1
+    if matched < len(spoken_keys):
+        return None
+    return " ".join(full_words[position:])
+
+
+class StreamingSynthesizer:
+    """Synthesizes sentence N+1 in a background thread while sentence N plays.
+
+    `synthesize` turns one sentence into playable audio. The sentence source
+    may be a list or a generator that yields sentences as they become known.
+    """
+
+    _DONE = object()
+
+    def __init__(self, synthesize: Callable[[str], Any], lookahead: int = 1):
+        self.synthesize = synthesize
+        self.lookahead = lookahead
+
+    def stream(self, sentences: Iterable[str]) -> Iterator[Tuple[str, Any]]:
+        """Yield (sentence, audio) in order; audio is None if synthesis failed.
+
+        Closing the generator early (e.g. on barge-in) stops further synthesis.
+        """
+        ready = queue.Queue(maxsize=self.lookahead)
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    ready.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def produce():
+            try:
+                for sentence in sentences:
+                    if stop.is_set():
+                        break
+                    try:
+                        audio = self.synthesize(sentence)
+                    except Exception as e:
+                        logger.error(f"Synthesis failed for sentence '{sentence[:40]}': {e}", exc_info=True)
+                        audio = None
+                    put((sentence, audio))
+            except Exception as e:
+                logger.error(f"Sentence source failed: {e}", exc_info=True)
+            finally:
+                put(self._DONE)
+
+        producer = threading.Thread(target=produce, name="tts-synthesis", daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = ready.get()
+                if item is self._DONE:
+                    break
+                yield item
+        finally:
+            # A producer blocked on the queue notices this within 0.1 s; one mid-synthesis exits after it
+            stop.set()
+
+
+class SpeechQueue:
+    """Non-blocking speech: texts are queued by priority and spoken one at a time.
+
+    `speak` is the blocking speak function (returns True if the item was
+    played to the end); items are usually strings but are passed through as-is. `submit` returns a Future resolved with that result,
+    so callers can carry on while speech plays and wait only if they need to.
+    Items of equal priority are spoken in submission order.
+    """
+
+    _STOP = object()
+
+    def __init__(self, speak: Callable[[str], Any]):
+        self.speak = speak
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="speech-queue", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: Any, priority: int = PRIORITY_NORMAL) -> Future:
+        """Queue `text` (whatever `speak` accepts) and return a Future for its result."""
+        future = Future()
+        with self._lock:
+            self._pending += 1
+            self._idle.clear()
+        self._queue.put((priority, next(self._order), text, future))
+        return future
+
+    def cancel_pending(self, below_priority: int = PRIORITY_URGENT) -> int:
+        """Drop queued (not yet started) items whose priority is worse than `below_priority`."""
+        kept, cancelled = [], 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item[2] is not self._STOP and item[0] > below_priority:
+                item[3].cancel()
+                cancelled += 1
+                self._done_one()
+            else:
+                kept.append(item)
+        for item in kept:
+            self._queue.put(item)
+        return cancelled
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued has been spoken (or cancelled)."""
+        return self._idle.wait(timeout)
+
+    def is_idle(self) -> bool:
+        return self._idle.is_set()
+
+    def _done_one(self):
+        with self._lock:
+            self._pending -= 1
+            if self._pending <= 0:
+                self._pending = 0
+                self._idle.set()
+
+    def _run(self):
+        while True:
+            _, _, text, future = self._queue.get()
+            if text is self._STOP:
+                break
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(self.speak(text))
+                except Exception as e:
+                    logger.error(f"Queued speech failed: {e}", exc_info=True)
+                    future.set_exception(e)
+            self._done_one()
+
+    def close(self, timeout: float = 10.0):
+        """Let queued speech finish (up to `timeout`), then stop the worker."""
+        self.wait_idle(timeout)
+        self.cancel_pending(below_priority=-1)
+        self._queue.put((float('inf'), next(self._order), self._STOP, None))
+        self._thread.join(timeout=2.0)
+
+
+class ResponseStreamSplitter:
+    """Turns streamed LLM text into speakable sentences as they complete.
+
+    `raw` accumulates the full response text; tool calls arrive as separate
+    function-call parts and never appear in it.
+    """
+
+    def __init__(self, min_chars: int = MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self.raw = ""
+        self.spoken = ""          # Text handed out as sentences so far
+        self._pending = ""        # Text not yet emitted
+
+    def _emit(self, text: str) -> List[str]:
+        sentences = split_sentences(text, self.min_chars) if text.strip() else []
+        if sentences:
+            self.spoken = f"{self.spoken} {' '.join(sentences)}".strip()
+        return sentences
+
+    def feed(self, chunk: str) -> List[str]:
+        """Add a streamed chunk; returns the sentences completed by it."""
+        self.raw += chunk
+        self._pending += chunk
+        boundaries = sentence_boundaries(self._pending)
+        if not boundaries:
+            return []
+        cut = boundaries[-1]
+        complete, self._pending = self._pending[:cut], self._pending[cut:]
+        if len(complete.strip()) < self.min_chars:
+            self._pending = complete + self._pending  # Wait for more so short openers are merged
+            return []
+        return self._emit(complete)
+
+    def finish(self) -> List[str]:
+        """Flush whatever text remains once the stream has ended."""
+        remaining, self._pending = self._pending, ""
+        return self._emit(remaining)
+
+
+class SentenceChannel:
+    """Iterable handed to the speech pipeline while sentences are still being produced."""
+
+    _CLOSED = object()
+
+    def __init__(self):
+        self._queue = queue.Queue()
+
+    def put(self, sentence: str):
+        self._queue.put(sentence)
+
+    def close(self):
+        self._queue.put(self._CLOSED)
+
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            item = self._queue.get()
+            if item is self._CLOSED:
+                return
+            yield item
@@ -0,0 +1,43 @@
+import threading
+
+import pytest
+
+from audio_capture import SharedAudioRing, SharedAudioRingReader
+
+
+@pytest.fixture
+def ring():
+    ring = SharedAudioRing(slot_size=4, slots=4)
+    yield ring
+    ring.close()
+
+
+def write(ring, ready, *values):
+    for value in values:
+        ring.write(bytes([value]) * 4)
+        ready.release()
+
+
+def test_reader_returns_chunks_in_order(ring):
+    ready = threading.Semaphore(0)
+    reader = SharedAudioRingReader(ring, ready)
+    write(ring, ready, 1, 2)
+    assert bytes(reader.next_chunk(0.1)) == b"\x01" * 4
+    assert bytes(reader.next_chunk(0.1)) == b"\x02" * 4
+    assert reader.next_chunk(0.01) is None
+
+
+def test_full_ring_skips_the_slot_being_overwritten(ring):
+    ready = threading.Semaphore(0)
+    reader = SharedAudioRingReader(ring, ready)
+    write(ring, ready, 1, 2, 3, 4)  # Exactly one ring behind: chunk 1 is the next to be overwritten
+    assert bytes(reader.next_chunk(0.1)) == b"\x02" * 4
+    assert reader.dropped_chunks == 1
+
+
+def test_overrun_drops_everything_but_the_intact_chunks(ring):
+    ready = threading.Semaphore(0)
+    reader = SharedAudioRingReader(ring, ready)
+    write(ring, ready, *range(1, 11))
+    assert [bytes(reader.next_chunk(0.1))[0] for _ in range(3)] == [8, 9, 10]
+    assert reader.dropped_chunks == 7
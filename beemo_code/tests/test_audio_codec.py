@@ -0,0 +1,19 @@
+import logging
+
+import audio_codec
+
+
+def test_missing_decoder_is_reported_once(monkeypatch, caplog):
+    monkeypatch.setattr(audio_codec, 'MINIAUDIO_AVAILABLE', False)
+    monkeypatch.setattr(audio_codec, '_fallback_warned', False)
+    with caplog.at_level(logging.WARNING, logger=audio_codec.__name__):
+        assert audio_codec.check_mp3_decoder() is False
+        assert audio_codec.check_mp3_decoder() is False
+    assert len([r for r in caplog.records if 'miniaudio' in r.getMessage()]) == 1
+
+
+def test_in_process_decoder_is_silent(monkeypatch, caplog):
+    monkeypatch.setattr(audio_codec, 'MINIAUDIO_AVAILABLE', True)
+    with caplog.at_level(logging.WARNING, logger=audio_codec.__name__):
+        assert audio_codec.check_mp3_decoder() is True
+    assert not caplog.records
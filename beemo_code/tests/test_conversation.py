@@ -0,0 +1,80 @@
+import time
+import threading
+
+from conversation import ConversationManager, estimate_tokens
+
+
+def test_build_messages_puts_context_in_the_system_message():
+    conversation = ConversationManager("You are Beemo.")
+    conversation.add("user", "turn on the lamp")
+    messages = conversation.build_messages("Devices: lamp")
+    assert messages[0] == {"role": "system", "content": "You are Beemo.\n\nDevices: lamp"}
+    assert messages[1:] == [{"role": "user", "content": "turn on the lamp"}]
+
+
+def test_inline_context_keeps_the_system_prompt_stable():
+    conversation = ConversationManager("You are Beemo.")
+    conversation.add("user", "hi")
+    conversation.add("assistant", "Hello!")
+    conversation.add("user", "turn on the lamp")
+    messages = conversation.build_messages("Devices: lamp", inline_context=True)
+    assert messages[0] == {"role": "system", "content": "You are Beemo."}
+    assert messages[1]["content"] == "hi"
+    assert messages[-1]["content"] == "Devices: lamp\n\n---\n\nUser: turn on the lamp"
+    assert conversation.turns[-1]["content"] == "turn on the lamp"  # The history itself is untouched
+
+
+def test_history_is_folded_into_a_summary_within_budget():
+    conversation = ConversationManager("prompt", history_budget_tokens=30, summary_budget_tokens=50)
+    for i in range(6):
+        conversation.add("user", f"Question number {i} about the lights. More words here.")
+        conversation.add("assistant", f"Answer number {i}. The lights are fine.")
+    history_tokens = sum(estimate_tokens(t["content"]) for t in conversation.turns)
+    assert history_tokens <= 30 or len(conversation.turns) == conversation.min_recent_turns
+    assert conversation.turns[0]["role"] == "user"
+    assert "Answer number" in conversation.summary and "More words" not in conversation.summary
+    assert estimate_tokens(conversation.summary) <= 50
+    assert "Summary of the earlier conversation" in conversation.build_messages()[0]["content"]
+
+
+def test_background_summary_replaces_the_notes():
+    done = threading.Event()
+
+    def summarizer(previous, turns):
+        done.set()
+        return "User asked about lights."
+
+    conversation = ConversationManager("prompt", history_budget_tokens=10, summarizer=summarizer)
+    conversation.add("user", "a question that is long enough to overflow the budget")
+    conversation.add("assistant", "an answer that is also long enough to overflow it")
+    conversation.add("user", "next")
+    assert done.wait(2.0)
+    for _ in range(100):
+        if conversation.stats['summaries']:
+            break
+        time.sleep(0.01)
+    assert conversation.summary == "User asked about lights."
+
+
+def test_failed_summary_keeps_the_extractive_notes():
+    def summarizer(previous, turns):
+        raise TimeoutError("deadline exceeded")
+
+    conversation = ConversationManager("prompt", history_budget_tokens=10, summarizer=summarizer)
+    conversation.add("user", "a question that is long enough to overflow the budget")
+    conversation.add("assistant", "an answer that is also long enough to overflow it")
+    conversation.add("user", "next")
+    for _ in range(100):
+        if conversation.stats['summary_failures']:
+            break
+        time.sleep(0.01)
+    assert conversation.stats['summary_failures'] == 1
+    assert conversation.summary.startswith("User: a question")
+
+
+def test_last_user_turn():
+    conversation = ConversationManager("prompt")
+    assert conversation.last_user_turn() == ""
+    conversation.add("user", "what's the weather")
+    conversation.add("assistant", "Sunny.")
+    assert conversation.last_user_turn() == "what's the weather"
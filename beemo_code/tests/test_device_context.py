@@ -0,0 +1,71 @@
+import re
+
+from device_context import DeviceContextRanker
+from speculation import tokenize
+
+ROOMS = ['Living Room', 'Bedroom', 'Kitchen', 'Office', 'Hallway', 'Garage']
+KINDS = [('Lamp', 'light'), ('Fan', 'fan'), ('Thermostat', 'thermostat'), ('Ceiling Light', 'light')]
+
+
+def home(count=40):
+    devices = []
+    for i in range(count):
+        room = ROOMS[i % len(ROOMS)]
+        name, dev_type = KINDS[i % len(KINDS)]
+        full_name = f"{room} {name} {i}"
+        devices.append({'id': f"d{i}", 'name': full_name, 'location': room, 'type': dev_type,
+                        'state': {'isOn': True}, 'tokens': tokenize(full_name)})
+    return devices
+
+
+def listed_ids(context):
+    return set(re.findall(r"\bd\d+\b", context))
+
+
+def test_named_device_ranks_first_and_top_k_applies():
+    devices = home()
+    context = DeviceContextRanker(top_k=8).build("turn on the office fan 9", devices)
+    lines = context.splitlines()
+    assert lines[0] == "Devices most relevant to this request:"
+    assert "ID: d9," in lines[1]
+    assert lines[-1].startswith("(32 other devices not listed")
+
+
+def test_recently_used_device_is_preferred():
+    devices = home(12)
+    ranker = DeviceContextRanker(top_k=1)
+    ranker.record_use("d5")
+    assert "ID: d5," in ranker.build("turn it off", devices)
+
+
+def test_all_lights_lists_every_light():
+    devices = home()
+    ranker = DeviceContextRanker(top_k=8, budget_tokens=300)
+    context = ranker.build("turn off all the lights", devices)
+    lights = {dev['id'] for dev in devices if dev['type'] == 'light'}
+    assert len(lights) > 8
+    assert listed_ids(context) == lights
+    assert ranker.stats['broad_requests'] == 1
+
+
+def test_room_and_type_without_a_name_is_broad():
+    devices = home()
+    context = DeviceContextRanker(top_k=1).build("turn on the kitchen lights", devices)
+    expected = {dev['id'] for dev in devices if dev['location'] == 'Kitchen' and dev['type'] == 'light'}
+    assert len(expected) > 1
+    assert listed_ids(context) == expected
+
+
+def test_everything_falls_back_to_grouped_ids_then_counts():
+    devices = home()
+    context = DeviceContextRanker(budget_tokens=300).build("turn off everything", devices)
+    assert "- Kitchen, light:" in context
+    assert listed_ids(context) == {dev['id'] for dev in devices}
+
+    context = DeviceContextRanker(budget_tokens=20).build("turn off everything", devices)
+    assert context.startswith("Too many devices match")
+    assert "- Kitchen: " in context
+
+
+def test_no_devices():
+    assert DeviceContextRanker().build("hi", []) == "No smart home devices are currently synced or available."
@@ -0,0 +1,58 @@
+from intent_parser import LocalIntentParser, words_to_number
+from speculation import tokenize
+
+
+def device(dev_id, name, location, dev_type, **state):
+    return {'id': dev_id, 'name': name, 'location': location, 'type': dev_type,
+            'tokens': tokenize(name), 'state': state}
+
+
+DEVICES = [
+    device('l1', 'Kitchen Light', 'Kitchen', 'light', isOn=False, brightness=80),
+    device('l2', 'Lamp', 'Bedroom', 'light', isOn=True),
+    device('l3', 'Lamp', 'Office', 'light', isOn=True),
+    device('t1', 'Thermostat', 'Hallway', 'thermostat', thermostatTemperatureSetpoint=20),
+    device('k1', 'Front Door', 'Hallway', 'lock', isLocked=True),
+    device('f1', 'Fan', 'Bedroom', 'fan', isOn=False),
+]
+
+
+def parse(text):
+    return LocalIntentParser(lambda: DEVICES).parse(text)
+
+
+def test_words_to_number():
+    assert words_to_number("21.5") == 21.5
+    assert words_to_number("seventy two") == 72
+    assert words_to_number("twenty point five") == 20.5
+    assert words_to_number("a hundred") == 100
+    assert words_to_number("two seventy") is None
+
+
+def test_on_off_with_fillers():
+    assert parse("Please turn on the kitchen light") == [
+        {'device': 'l1', 'name': 'Kitchen Light', 'action': 'turn_on', 'value': None}]
+    assert parse("switch the fan off")[0]['action'] == 'turn_off'
+
+
+def test_verb_carries_over_a_list():
+    commands = parse("turn off the kitchen light and the fan")
+    assert [(c['device'], c['action']) for c in commands] == [('l1', 'turn_off'), ('f1', 'turn_off')]
+
+
+def test_location_disambiguates_same_name():
+    assert parse("turn off the bedroom lamp")[0]['device'] == 'l2'
+    assert parse("turn off the lamp") is None  # Two lamps: left to the LLM
+
+
+def test_set_picks_the_action_from_the_device_type():
+    assert parse("set the thermostat to twenty one")[0] == {
+        'device': 't1', 'name': 'Thermostat', 'action': 'set_temperature', 'value': 21.0}
+    assert parse("dim the kitchen light to 30 percent")[0]['value'] == 30
+
+
+def test_out_of_range_or_unsupported_is_rejected():
+    assert parse("set the thermostat to 90 degrees") is None
+    assert parse("lock the fan") is None
+    assert parse("dim the fan to 20 percent") is None
+    assert parse("what's the weather like") is None
@@ -0,0 +1,226 @@
+import threading
+import time
+
+import pytest
+
+from llm_client import AsyncLLMClient, LLMBusy, LLMCancelled, LLMTimeout
+
+
+@pytest.fixture
+def release():
+    event = threading.Event()
+    yield event
+    event.set()  # Let abandoned calls finish
+
+
+def make_client(call, **kwargs):
+    client = AsyncLLMClient(call, **kwargs)
+    return client
+
+
+def test_request_returns_the_result_and_records_latency():
+    client = make_client(lambda payload: payload * 2, deadline=1.0)
+    try:
+        assert client.request(21) == 42
+        assert client.get_stats()['count'] == 1
+    finally:
+        client.close()
+
+
+def test_call_errors_propagate():
+    def call(payload):
+        raise ValueError("bad request")
+
+    client = make_client(call, deadline=1.0)
+    try:
+        with pytest.raises(ValueError):
+            client.request("x")
+        assert client.stats['errors'] == 1
+    finally:
+        client.close()
+
+
+def test_slow_first_attempt_is_hedged(release):
+    calls = []
+
+    def call(payload):
+        calls.append(payload)
+        if len(calls) == 6:  # The first attempt of the sixth request hangs
+            release.wait(5)
+        else:
+            time.sleep(0.01)
+        return len(calls)
+
+    client = make_client(call, deadline=2.0, min_samples=5, min_hedge_delay=0.05)
+    try:
+        for _ in range(5):
+            client.request("warm-up")
+        started = time.monotonic()
+        assert client.request("slow") == 7
+        assert time.monotonic() - started < 1.0
+        assert client.stats['hedged'] == 1 and client.stats['hedge_wins'] == 1
+    finally:
+        client.close()
+
+
+def test_timeouts_add_no_latency_sample(release):
+    client = make_client(lambda payload: release.wait(5), deadline=0.1, max_workers=4)
+    try:
+        with pytest.raises(LLMTimeout):
+            client.request("x")
+        assert len(client.latency) == 0
+        assert client.stats['timeouts'] == 1
+    finally:
+        client.close()
+
+
+def test_abandoned_calls_make_new_requests_fail_fast(release):
+    def call(payload):
+        if payload == "hang":
+            release.wait(5)
+        return payload
+
+    client = make_client(call, deadline=0.1, max_workers=2)
+    try:
+        for _ in range(2):
+            with pytest.raises(LLMTimeout):
+                client.request("hang")
+        started = time.monotonic()
+        with pytest.raises(LLMBusy):
+            client.request("quick")
+        assert time.monotonic() - started < 0.05
+        release.set()
+        for _ in range(100):
+            if client.free_workers() == 2:
+                break
+            time.sleep(0.01)
+        assert client.request("quick") == "quick"
+    finally:
+        client.close()
+
+
+def test_cancel_all_interrupts_a_blocked_request(release):
+    client = make_client(lambda payload: release.wait(5), deadline=5.0)
+    try:
+        threading.Timer(0.1, client.cancel_all, args=("test",)).start()
+        started = time.monotonic()
+        with pytest.raises(LLMCancelled):
+            client.request("x")
+        assert time.monotonic() - started < 1.0
+    finally:
+        client.close()
+
+
+def test_stream_yields_every_chunk_and_frees_its_worker():
+    client = make_client(lambda payload: payload, deadline=1.0, max_workers=1)
+    try:
+        assert list(client.stream(lambda: iter(["a", "b", "c"]))) == ["a", "b", "c"]
+        for _ in range(100):
+            if client.free_workers() == 1:
+                break
+            time.sleep(0.01)
+        assert client.free_workers() == 1
+    finally:
+        client.close()
+
+
+def test_stream_errors_propagate():
+    def chunks():
+        yield "a"
+        raise ConnectionError("stream dropped")
+
+    client = make_client(lambda payload: payload, deadline=1.0)
+    try:
+        received = []
+        with pytest.raises(ConnectionError):
+            for chunk in client.stream(chunks):
+                received.append(chunk)
+        assert received == ["a"]
+    finally:
+        client.close()
+
+
+def test_stalled_stream_times_out_at_its_deadline(release):
+    def chunks():
+        yield "a"
+        release.wait(5)
+        yield "b"
+
+    client = make_client(lambda payload: payload, deadline=5.0)
+    try:
+        started = time.monotonic()
+        with pytest.raises(LLMTimeout):
+            list(client.stream(chunks, deadline=0.2))
+        assert time.monotonic() - started < 1.0
+    finally:
+        client.close()
+
+
+def test_cancel_all_interrupts_a_stalled_stream(release):
+    def chunks():
+        release.wait(5)
+        yield "late"
+
+    client = make_client(lambda payload: payload, deadline=5.0)
+    try:
+        threading.Timer(0.1, client.cancel_all, args=("test",)).start()
+        with pytest.raises(LLMCancelled):
+            list(client.stream(chunks))
+    finally:
+        client.close()
+
+
+def test_stream_without_a_first_chunk_is_hedged(release):
+    opened = []
+
+    def open_stream():
+        opened.append(len(opened))
+        if len(opened) == 6:  # The sixth stream stalls before its first chunk
+            release.wait(5)
+        return iter([f"stream {len(opened)}", "done"])
+
+    client = make_client(lambda payload: payload, deadline=2.0, min_samples=5, min_hedge_delay=0.05)
+    try:
+        for _ in range(5):
+            list(client.stream(open_stream))
+        started = time.monotonic()
+        assert list(client.stream(open_stream)) == ["stream 7", "done"]
+        assert time.monotonic() - started < 1.0
+        assert client.stats['hedged'] == 1 and client.stats['hedge_wins'] == 1
+        assert client.get_stats()['stream_hedge_delay_ms'] is not None
+    finally:
+        client.close()
+
+
+def test_stream_error_before_output_waits_for_the_hedge(release):
+    opened = []
+
+    def open_stream():
+        opened.append(None)
+        attempt = len(opened)
+
+        def chunks():
+            if attempt == 6:  # Fails after the hedge was opened, before the hedge has output
+                release.wait(0.15)
+                raise ConnectionError("first stream failed")
+            if attempt == 7:
+                release.wait(0.3)
+            yield "ok"
+        return chunks()
+
+    client = make_client(lambda payload: payload, deadline=2.0, min_samples=5, min_hedge_delay=0.05)
+    try:
+        for _ in range(5):
+            list(client.stream(open_stream))
+        assert list(client.stream(open_stream)) == ["ok"]
+    finally:
+        client.close()
+
+
+def test_close_twice_returns_at_once(caplog):
+    client = make_client(lambda payload: payload)
+    client.close()
+    started = time.monotonic()
+    client.close()
+    assert time.monotonic() - started < 0.1
+    assert "did not stop cleanly" not in caplog.text
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from llm_session import GeminiChatSession, build_contents
+from llm_tools import build_system_prompt
+
+SYSTEM = build_system_prompt(datetime(2024, 1, 1, 9, 30), "Home")
+
+
+def test_system_prompt_carries_time_and_location():
+    assert "09:30 AM on Monday, January 01, 2024" in SYSTEM
+    assert "Location: Home" in SYSTEM
+
+
+def test_build_contents_folds_the_system_prompt_into_the_first_user_turn():
+    contents = build_contents([
+        {"role": "system", "content": "Be brief."},
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "hello"},
+        {"role": "user", "content": "lights on"},
+    ])
+    assert [turn["role"] for turn in contents] == ["user", "model", "user"]
+    assert contents[0]["parts"][0]["text"] == "Be brief.\n\n---\n\nUser Question: hi"
+    assert contents[2]["parts"][0]["text"] == "lights on"
+
+
+def test_session_converts_only_new_turns():
+    session = GeminiChatSession("model", cache_min_tokens=10 ** 9)
+    session.system_prompt = SYSTEM  # reset() would need the SDK
+    history = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+    first = session.contents([{"role": "system", "content": SYSTEM}] + history[:1])
+    second = session.contents([{"role": "system", "content": SYSTEM}] + history + [{"role": "user", "content": "bye"}])
+    assert first == [{"role": "user", "parts": [{"text": "hi"}]}]
+    assert [turn["role"] for turn in second] == ["user", "model", "user"]
+    assert session.stats['turns_converted'] == 2 and session.stats['history_rebuilds'] == 0
+
+
+def test_session_rebuilds_history_after_a_fold():
+    session = GeminiChatSession("model", cache_min_tokens=10 ** 9)
+    session.system_prompt = SYSTEM
+    turns = [{"role": "user", "content": "a"}, {"role": "assistant", "content": "b"}, {"role": "user", "content": "c"}]
+    session.contents([{"role": "system", "content": SYSTEM}] + turns)
+    session.contents([{"role": "system", "content": SYSTEM}] + turns[2:] + [{"role": "assistant", "content": "d"},
+                                                                           {"role": "user", "content": "e"}])
+    assert session.stats['history_rebuilds'] == 1
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import pytest
+
+from llm_tools import DeviceCall, ServiceCall, ToolCallError, build_reply, parse_function_call, parse_response
+
+
+def response(*parts):
+    return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=list(parts)))])
+
+
+def text_part(text):
+    return SimpleNamespace(text=text, function_call=None)
+
+
+def call_part(name, args):
+    return SimpleNamespace(text="", function_call=SimpleNamespace(name=name, args=args))
+
+
+def test_device_calls_are_validated_and_typed():
+    assert parse_function_call("control_device", {"device": " lamp_1 ", "action": "TURN_ON"}) == \
+        DeviceCall("lamp_1", "turn_on", None)
+    assert parse_function_call("control_device", {"device": "t1", "action": "set_temperature", "value": "21"}) == \
+        DeviceCall("t1", "set_temperature", 21.0)
+    # A value on an on/off action is dropped
+    assert parse_function_call("control_device", {"device": "l1", "action": "turn_off", "value": 5}).value is None
+
+
+@pytest.mark.parametrize("name, args", [
+    ("control_device", {"action": "turn_on"}),
+    ("control_device", {"device": "l1", "action": "explode"}),
+    ("control_device", {"device": "l1", "action": "set_brightness"}),
+    ("get_news", {"category": "gossip"}),
+    ("launch_rockets", {}),
+])
+def test_invalid_calls_raise(name, args):
+    with pytest.raises(ToolCallError):
+        parse_function_call(name, args)
+
+
+def test_service_calls_map_to_service_params():
+    assert parse_function_call("get_weather", {"city": "Paris"}) == ServiceCall("weather", {"city": "Paris"})
+    assert parse_function_call("get_weather", None) == ServiceCall("weather", {"location": "current"})
+    assert parse_function_call("get_news", {"country": "GB"}) == \
+        ServiceCall("news", {"country": "gb", "category": None})
+    assert parse_function_call("get_joke", {}) == ServiceCall("joke", {})
+
+
+def test_parse_response_collects_text_and_calls_and_drops_invalid_ones():
+    reply = parse_response(response(
+        text_part("Turning them off. "),
+        call_part("control_device", {"device": "l1", "action": "turn_off"}),
+        call_part("control_device", {"device": "l2", "action": "dance"}),
+        text_part("Done."),
+    ))
+    assert reply.text == "Turning them off. Done."
+    assert reply.calls == [DeviceCall("l1", "turn_off", None)]
+    assert len(reply.errors) == 1 and "dance" in reply.errors[0]
+    assert reply.has_side_effects
+
+
+def test_empty_response_and_service_only_reply():
+    assert parse_response(SimpleNamespace(candidates=[])).text == ""
+    reply = build_reply("", [("get_joke", {})])
+    assert reply.calls == [ServiceCall("joke", {})] and not reply.has_side_effects
@@ -0,0 +1,107 @@
+import sys
+import time
+
+import pytest
+
+import local_llm
+from llm_tools import DeviceCall, ServiceCall
+from local_llm import LLMBackendSelector, LocalLLMError, LocalLLMPool, LocalLLMWorker, StubModel
+
+
+def user(text):
+    return [{"role": "system", "content": "prompt"}, {"role": "user", "content": text}]
+
+
+@pytest.mark.parametrize("utterance, call", [
+    ("turn off the kitchen light", ("control_device", {"device": "kitchen light", "action": "turn_off"})),
+    ("Switch the fan on.", ("control_device", {"device": "fan", "action": "turn_on"})),
+    ("tell me a joke", ("get_joke", {})),
+    ("what's the weather in new york", ("get_weather", {"city": "New York"})),
+])
+def test_stub_model_maps_simple_requests_to_calls(utterance, call):
+    assert StubModel().generate(user(utterance), 64) == ("", [call])
+
+
+def test_stub_model_reads_the_utterance_after_inlined_context():
+    messages = user("Relevant devices:\n- d1: Fan\n\n---\n\nUser: turn on the fan")
+    assert StubModel().generate(messages, 64)[1] == [("control_device", {"device": "fan", "action": "turn_on"})]
+
+
+def test_stub_model_answers_other_requests_with_text():
+    text, calls = StubModel().generate(user("what is the meaning of life"), 64)
+    assert text and calls == []
+
+
+def test_stub_pool_replies_through_a_worker_process():
+    pool = LocalLLMPool(backend="stub", ready_timeout=30.0)
+    assert pool.available()
+    pool.start()
+    try:
+        reply = pool.generate(user("turn on the hallway lamp"), timeout=30.0)
+        assert reply.source == "local"
+        assert reply.calls == [DeviceCall(device="hallway lamp", action="turn_on")]
+        reply = pool.generate(user("weather in paris"), timeout=5.0)
+        assert reply.calls == [ServiceCall(service="weather", params={"city": "Paris"})]
+        assert pool.get_stats()['requests'] == 2
+    finally:
+        pool.close()
+
+
+def test_pool_without_a_model_fails_fast():
+    pool = LocalLLMPool(backend="llama", model_path=None)
+    assert not pool.available()
+    with pytest.raises(LocalLLMError):
+        pool.generate(user("hello"), timeout=0.1)
+
+
+def test_selector_keeps_the_preference_order_while_healthy():
+    selector = LLMBackendSelector(['gemini', 'local'])
+    assert selector.order() == ['gemini', 'local']
+    assert selector.order(['local']) == ['local']
+
+
+def test_failed_backend_goes_last_until_it_succeeds():
+    selector = LLMBackendSelector(['gemini', 'local'], probe_every=0)
+    selector.record('gemini', 15.0, False)
+    assert selector.order() == ['local', 'gemini']
+    selector.record('gemini', 1.0, True)
+    assert selector.order() == ['gemini', 'local']
+
+
+def test_cooldown_doubles_with_consecutive_failures():
+    selector = LLMBackendSelector(['gemini', 'local'], base_cooldown=30.0, max_cooldown=100.0)
+    for expected in (30.0, 60.0, 100.0):
+        selector.record('gemini', 1.0, False)
+        remaining = selector.get_stats()['gemini']['cooldown_remaining_s']
+        assert expected - 1 < remaining <= expected
+
+
+def test_slow_backend_goes_behind_a_faster_one():
+    selector = LLMBackendSelector(['gemini', 'local'], slow_p95_seconds=6.0, probe_every=0, min_samples=3)
+    for _ in range(3):
+        selector.record('gemini', 9.0, True)
+        selector.record('local', 2.0, True)
+    assert selector.order() == ['local', 'gemini']
+
+
+def test_probe_request_keeps_the_preference_order():
+    selector = LLMBackendSelector(['gemini', 'local'], slow_p95_seconds=6.0, probe_every=2, min_samples=1)
+    selector.record('gemini', 9.0, True)
+    selector.record('local', 2.0, True)
+    assert selector.order() == ['local', 'gemini']
+    assert selector.order() == ['gemini', 'local']
+
+
+def test_cooldown_expires():
+    selector = LLMBackendSelector(['gemini', 'local'], base_cooldown=0.05, probe_every=0)
+    selector.record('gemini', 1.0, False)
+    assert selector.order()[0] == 'local'
+    time.sleep(0.1)
+    assert selector.order()[0] == 'gemini'
+
+
+def test_worker_startup_failure_reports_its_stderr():
+    worker = LocalLLMWorker([sys.executable, local_llm.__file__, "--worker", "--backend", "unknown"], ready_timeout=30.0)
+    with pytest.raises(LocalLLMError, match="stderr:(.|\n)*invalid choice"):
+        worker.start()
+    worker.close()
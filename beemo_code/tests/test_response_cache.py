@@ -0,0 +1,78 @@
+import pytest
+
+from response_cache import ResponseCache, device_state_fingerprint, is_cacheable_query, normalize_utterance
+
+NEAR_MISSES = [
+    ("capital of austria", "capital of australia"),
+    ("square root of sixteen", "square root of sixty"),
+    ("president of france", "president of frances"),
+    ("set a timer for 15 minutes", "set a timer for 50 minutes"),
+]
+
+
+def test_normalisation_drops_fillers():
+    assert normalize_utterance("Hey Beemo, tell me a joke please!") == "tell me a joke"
+
+
+def test_time_and_context_dependent_queries_are_not_cacheable():
+    assert is_cacheable_query("tell me a joke")
+    assert not is_cacheable_query("what's the date today")
+    assert not is_cacheable_query("say that again")
+
+
+def test_exact_hit_and_fingerprint_isolation():
+    cache = ResponseCache()
+    cache.put("Tell me a joke", "f1", "joke")
+    assert cache.get("hey beemo tell me a joke", "f1") == "joke"
+    assert cache.get("tell me a joke", "f2") is None
+
+
+def test_follow_up_only_hits_after_the_same_question():
+    cache = ResponseCache(similarity_threshold=0.95)
+    cache.put("and in celsius", "f", "21 degrees", context="what's the temperature in the bedroom")
+    assert cache.get("and in celsius", "f", "what's the temperature in the bedroom") == "21 degrees"
+    assert cache.get("and in celsius", "f", "how warm is the oven") is None
+    assert cache.get("and in celsius", "f") is None
+
+
+@pytest.mark.parametrize("stored, asked", NEAR_MISSES)
+def test_default_is_exact_only(stored, asked):
+    cache = ResponseCache()
+    cache.put(stored, "f", "answer")
+    assert cache.get(asked, "f") is None
+
+
+@pytest.mark.parametrize("stored, asked", NEAR_MISSES)
+def test_fuzzy_never_matches_different_content_words(stored, asked):
+    cache = ResponseCache(similarity_threshold=0.95)
+    cache.put(stored, "f", "answer")
+    assert cache.get(asked, "f") is None
+
+
+def test_fuzzy_matches_a_function_word_paraphrase():
+    cache = ResponseCache(similarity_threshold=0.95)
+    cache.put("what is the population of the largest city in the united kingdom of great britain", "f", "answer")
+    assert cache.get("what is the population of the largest city in united kingdom of great britain", "f") == "answer"
+    assert cache.stats['similar_hits'] == 1
+
+
+def test_low_threshold_is_refused():
+    with pytest.raises(ValueError):
+        ResponseCache(similarity_threshold=0.8)
+
+
+def test_ttl_and_lru_eviction():
+    cache = ResponseCache(max_entries=2, ttl_seconds=-1)
+    cache.put("one", "f", 1)
+    assert cache.get("one", "f") is None and cache.stats['expired'] == 1
+    cache = ResponseCache(max_entries=2)
+    for name in ("one", "two", "three"):
+        cache.put(name, "f", name)
+    assert cache.get("one", "f") is None and cache.get("three", "f") == "three"
+
+
+def test_fingerprint_changes_with_device_state():
+    devices = [{'id': 'l1', 'name': 'Lamp', 'type': 'light', 'state': {'isOn': True}}]
+    before = device_state_fingerprint(devices)
+    devices[0]['state']['isOn'] = False
+    assert device_state_fingerprint(devices) != before
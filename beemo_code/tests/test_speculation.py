@@ -0,0 +1,52 @@
+from speculation import SpeculativeIntentProcessor, contains_phrase, tokenize
+
+
+def make_processor(calls):
+    def prefetch(name):
+        def run():
+            calls.append(name)
+            return name
+        return run
+
+    return SpeculativeIntentProcessor(
+        device_index_provider=lambda: [{'id': 'd1', 'name': 'Kitchen Light', 'tokens': ['kitchen', 'light']}],
+        service_prefetchers={'weather': prefetch('weather'), 'news': prefetch('news')},
+    )
+
+
+def test_contains_phrase_matches_whole_words_only():
+    assert contains_phrase(tokenize("will it rain today"), "rain")
+    assert not contains_phrase(tokenize("the train is late"), "rain")
+    assert not contains_phrase(tokenize("brain teaser"), "rain")
+    assert contains_phrase(tokenize("where am I right now"), "where am i")
+    assert not contains_phrase(tokenize("where I am"), "where am i")
+
+
+def test_no_prefetch_for_substring_keyword():
+    calls = []
+    processor = make_processor(calls)
+    processor.begin()
+    processor.on_partial("when does the train leave")
+    assert processor.prefetches == {}
+    processor.shutdown()
+
+
+def test_prefetch_committed_when_final_confirms():
+    calls = []
+    processor = make_processor(calls)
+    processor.begin()
+    processor.on_partial("turn on the kitchen light and what's the weather")
+    result = processor.commit("turn on the kitchen light and what's the weather")
+    assert set(result['devices']) == {'d1'}
+    assert SpeculativeIntentProcessor.prefetched_result(result['services']['weather'], timeout=1.0) == 'weather'
+    processor.shutdown()
+
+
+def test_prefetch_discarded_when_final_differs():
+    processor = make_processor([])
+    processor.begin()
+    processor.on_partial("what's the news")
+    result = processor.commit("what's the newest phone")
+    assert result == {'devices': {}, 'services': {}}
+    assert processor.stats['discarded'] == 1
+    processor.shutdown()
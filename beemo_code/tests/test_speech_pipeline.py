@@ -0,0 +1,88 @@
+import threading
+import time
+
+from speech_pipeline import (PRIORITY_LOW, PRIORITY_URGENT, ResponseStreamSplitter, SpeechQueue, split_sentences,
+                             unspoken_remainder)
+
+
+def test_two_letter_word_ends_a_sentence():
+    assert split_sentences("Hi. The lights are on.", min_chars=0) == ["Hi.", "The lights are on."]
+    assert split_sentences("Ok. It is done.", min_chars=0) == ["Ok.", "It is done."]
+
+
+def test_abbreviations_and_initials_do_not_split():
+    text = "Dr. Smith lives on Main St. near you. J. Doe called, e.g. about the door."
+    assert split_sentences(text, min_chars=0) == ["Dr. Smith lives on Main St. near you.",
+                                                  "J. Doe called, e.g. about the door."]
+
+
+def test_decimal_numbers_do_not_split():
+    assert split_sentences("It is 21.5 degrees. Nice!", min_chars=0) == ["It is 21.5 degrees.", "Nice!"]
+
+
+def test_short_pieces_are_merged():
+    assert split_sentences("Sure. The kitchen light is now on. Done.") == ["Sure. The kitchen light is now on. Done."]
+    assert split_sentences("Sure thing, turning it on. The kitchen light is now on.") == [
+        "Sure thing, turning it on.", "The kitchen light is now on."]
+
+
+def test_stream_splitter_emits_sentences_as_they_complete():
+    splitter = ResponseStreamSplitter(min_chars=0)
+    assert splitter.feed("Hi. The li") == ["Hi."]
+    assert splitter.feed("ghts are on. Mr") == ["The lights are on."]
+    assert splitter.feed(". Smith is here") == []
+    assert splitter.finish() == ["Mr. Smith is here"]
+    assert splitter.spoken == "Hi. The lights are on. Mr. Smith is here"
+
+
+def test_speech_queue_speaks_by_priority_and_drains_on_close():
+    spoken = []
+
+    def speak(text):
+        time.sleep(0.01)
+        spoken.append(text)
+        return True
+
+    speech = SpeechQueue(speak)
+    speech.submit("first")
+    time.sleep(0.005)  # "first" is now playing
+    low = speech.submit("status", PRIORITY_LOW)
+    goodbye = speech.submit("Restarting", PRIORITY_URGENT)
+    speech.close(timeout=2.0)
+    assert spoken == ["first", "Restarting", "status"]
+    assert goodbye.result(timeout=0) is True and low.result(timeout=0) is True
+
+
+def test_unspoken_remainder_ignores_whitespace_and_punctuation():
+    full = "Sure!  The light is on.\nAnything else?"
+    assert unspoken_remainder(full, "Sure! The light is on.") == "Anything else?"
+    assert unspoken_remainder(full, "Sure. The light is on") == "Anything else?"
+    assert unspoken_remainder(full, full) == ""
+
+
+def test_unspoken_remainder_none_when_not_a_prefix():
+    assert unspoken_remainder("The light is on.", "The fan is on.") is None
+    assert unspoken_remainder("Hi.", "Hi. More text") is None
+
+
+def test_barge_in_drops_speech_queued_behind_the_interrupted_item():
+    spoken = []
+    speech = None
+    queued = threading.Event()
+
+    def speak(text):
+        spoken.append(text)
+        if text == "streamed answer":  # The user talks over it, as in EnhancedSmartHomeAI._speak_sentences
+            queued.wait(2.0)
+            speech.cancel_pending()
+            return False
+        return True
+
+    speech = SpeechQueue(speak)
+    speech.submit("streamed answer")
+    remainder = speech.submit("The kitchen light is now on.")
+    queued.set()
+    assert speech.wait_idle(timeout=2.0)
+    speech.close(timeout=1.0)
+    assert spoken == ["streamed answer"]
+    assert remainder.cancelled()
@@ -0,0 +1,24 @@
+import os
+import time
+
+from tts_cache import STALE_TMP_SECONDS, TTSCache
+
+
+def test_entries_survive_a_restart(tmp_path):
+    cache = TTSCache(str(tmp_path))
+    key = TTSCache.make_key("Hello")
+    cache.put(key, b"RIFF....", 'wav')
+    assert TTSCache(str(tmp_path)).get(key) == (b"RIFF....", 'wav')
+
+
+def test_startup_removes_stale_temp_files(tmp_path):
+    stale = tmp_path / "tmpabc123.tmp"
+    fresh = tmp_path / "tmpdef456.tmp"
+    stale.write_bytes(b"partial")
+    fresh.write_bytes(b"partial")
+    old = time.time() - STALE_TMP_SECONDS - 10
+    os.utime(stale, (old, old))
+    cache = TTSCache(str(tmp_path))
+    assert not stale.exists()
+    assert fresh.exists()  # May still be written by another process
+    assert cache.get_stats()['entries'] == 0
@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STALE_TMP_SECONDS = 60  # Temp files older than this were left by a crash mid-write
+
+
+class TTSCache:
+    """Content-addressed on-disk cache of synthesized speech.
+
+    Entries are keyed by a hash of (text, lang, voice, engine) and stored as
+    `<key>.<format>` files. The total size is bounded; the least recently used
+    entries are evicted first. File mtimes record recency so the LRU order
+    survives restarts.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 100 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (path, size, format), least recently used first
+        self._total_bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'bytes_served': 0, 'bytes_written': 0, 'evictions': 0}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(text: str, lang: str = 'en', voice: Optional[str] = None, engine: str = 'gtts',
+                 profile: Optional[str] = None) -> str:
+        """`profile` names the stored audio format/processing; changing it invalidates old entries."""
+        fields = [text.strip(), lang, voice, engine] + ([profile] if profile else [])
+        payload = json.dumps(fields, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _load_index(self):
+        files = []
+        removed_tmp = 0
+        for name in os.listdir(self.cache_dir):
+            key, _, fmt = name.partition('.')
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith('.tmp'):
+                try:
+                    if time.time() - os.stat(path).st_mtime > STALE_TMP_SECONDS:
+                        os.unlink(path)
+                        removed_tmp += 1
+                except OSError as e:
+                    logger.warning(f"Could not remove stale TTS cache temp file {name}: {e}")
+                continue
+            if len(key) != 64 or not fmt or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            files.append((stat.st_mtime, key, path, stat.st_size, fmt))
+        for _, key, path, size, fmt in sorted(files):
+            self._entries[key] = (path, size, fmt)
+            self._total_bytes += size
+        if removed_tmp:
+            logger.info(f"Removed {removed_tmp} temp file(s) left by interrupted TTS cache writes.")
+        logger.info(f"TTS cache loaded: {len(self._entries)} entries, {self._total_bytes / 1024:.0f} KiB in {self.cache_dir}")
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """Return (audio bytes, format) for a cached entry, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            path, size, fmt = entry
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                os.utime(path)  # Persist recency for the next start
+            except OSError as e:
+                logger.warning(f"TTS cache entry {key} unreadable, dropping it: {e}")
+                self._drop(key)
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            self.stats['bytes_served'] += size
+            return data, fmt
+
+    def put(self, key: str, data: bytes, fmt: str):
+        """Store audio for a key, evicting old entries to stay under max_bytes."""
+        if len(data) > self.max_bytes:
+            return
+        path = os.path.join(self.cache_dir, f"{key}.{fmt}")
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            # Write to a temp file and rename so a crash never leaves a truncated entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"Could not write TTS cache entry {key}: {e}")
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                return
+            self._entries[key] = (path, len(data), fmt)
+            self._total_bytes += len(data)
+            self.stats['bytes_written'] += len(data)
+            while self._total_bytes > self.max_bytes and self._entries:
+                oldest_key = next(iter(self._entries))
+                self._drop(oldest_key)
+                self.stats['evictions'] += 1
+
+    def _drop(self, key: str):
+        path, size, _ = self._entries.pop(key)
+        self._total_bytes -= size
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes_on_disk': self._total_bytes,
+                'max_bytes': self.max_bytes,
+            }
@@ -0,0 +1,401 @@
+import io
+import os
+import json
+import time
+import queue
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+import concurrent.futures
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from gtts import gTTS
+from pydub import AudioSegment
+
+from audio_codec import decode_mp3_bytes
+from metrics import LatencyTracker
+
+logger = logging.getLogger(__name__)
+
+
+class TTSEngineError(Exception):
+    """Raised when an engine cannot synthesize (unreachable, timed out, bad output)."""
+
+
+class TTSEngine:
+    """One way of turning text into an AudioSegment.
+
+    `name` and `voice` are part of the TTS cache key, so audio from different
+    engines or voices is never mixed up. If a `timings` dict is passed,
+    engines fill in the seconds spent on 'synthesis' and 'decode'.
+    """
+
+    name = "base"
+    remote = True  # Remote engines depend on the network and are subject to failover deadlines
+
+    def __init__(self, voice: Optional[str] = None, timeout: float = 8.0):
+        self.voice = voice
+        self.timeout = timeout
+
+    def available(self) -> bool:
+        return True
+
+    def synthesize(self, text: str, timings: Optional[Dict] = None) -> AudioSegment:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def _timed(timings: Optional[Dict], stage: str, started: float):
+        if timings is not None:
+            timings[stage] = time.time() - started
+
+
+class GTTSEngine(TTSEngine):
+    name = "gtts"
+
+    def __init__(self, lang: str = 'en', timeout: float = 8.0):
+        super().__init__(voice=None, timeout=timeout)
+        self.lang = lang
+
+    def synthesize(self, text: str, timings: Optional[Dict] = None) -> AudioSegment:
+        started = time.time()
+        mp3_buffer = io.BytesIO()
+        # Passed to requests: a stalled connection fails instead of holding an executor thread forever
+        gTTS(text=text, lang=self.lang, timeout=self.timeout).write_to_fp(mp3_buffer)
+        self._timed(timings, 'synthesis', started)
+        started = time.time()
+        segment = decode_mp3_bytes(mp3_buffer.getvalue())
+        self._timed(timings, 'decode', started)
+        return segment
+
+
+class ElevenLabsEngine(TTSEngine):
+    name = "elevenlabs"
+
+    def __init__(self, api_key: str, voice_id: str, api_url: str = "https://api.elevenlabs.io/v1/text-to-speech",
+                 model_id: str = "eleven_turbo_v2", timeout: float = 8.0):
+        super().__init__(voice=voice_id, timeout=timeout)
+        self.api_key = api_key
+        self.api_url = api_url
+        self.model_id = model_id
+        self._session = requests.Session()  # Keep-alive across sentences
+        self._session.headers.update({
+            "Accept": "audio/mpeg",
+            "Content-Type": "application/json",
+            "xi-api-key": api_key
+        })
+
+    def available(self) -> bool:
+        return bool(self.api_key and self.voice)
+
+    def synthesize(self, text: str, timings: Optional[Dict] = None) -> AudioSegment:
+        started = time.time()
+        response = self._session.post(
+            f"{self.api_url}/{self.voice}",
+            json={"text": text, "model_id": self.model_id},
+            timeout=self.timeout
+        )
+        if response.status_code != 200:
+            raise TTSEngineError(f"ElevenLabs returned {response.status_code}: {response.text[:200]}")
+        self._timed(timings, 'synthesis', started)
+        started = time.time()
+        segment = decode_mp3_bytes(response.content)
+        self._timed(timings, 'decode', started)
+        return segment
+
+
+class PiperProcess:
+    """A piper process that stays up between sentences, so its voice model is loaded once.
+
+    Uses piper's JSON input mode: each request names its output file and piper
+    prints the path once the WAV is written.
+    """
+
+    def __init__(self, model: str, out_dir: str):
+        self.out_dir = out_dir
+        self.process = subprocess.Popen(
+            ["piper", "--model", model, "--json-input", "--output_dir", out_dir],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1)
+        self._lines = queue.Queue()
+        threading.Thread(target=self._read, name="piper-reader", daemon=True).start()
+        self._next_id = 0
+
+    def _read(self):
+        for line in self.process.stdout:
+            self._lines.put(line.strip())
+        self._lines.put(None)  # EOF: the process exited
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def synthesize(self, text: str, timeout: float) -> bytes:
+        """WAV bytes for one sentence. Raises TTSEngineError; the process is unusable after a timeout."""
+        self._next_id += 1
+        path = os.path.join(self.out_dir, f"{os.getpid()}-{id(self)}-{self._next_id}.wav")
+        try:
+            self.process.stdin.write(json.dumps({"text": " ".join(text.split()), "output_file": path}) + "\n")
+            self.process.stdin.flush()
+            line = self._lines.get(timeout=timeout)
+        except queue.Empty:
+            raise TTSEngineError(f"piper timed out after {timeout}s")
+        except OSError as e:
+            raise TTSEngineError(f"piper is not running: {e}")
+        if line is None:
+            raise TTSEngineError(f"piper exited ({self.process.poll()})")
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError as e:
+            raise TTSEngineError(f"piper output missing: {e}")
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=2.0)
+        except Exception:
+            self.process.kill()
+
+
+class LocalTTSEngine(TTSEngine):
+    """Offline synthesis through piper or espeak-ng.
+
+    Piper runs as warm worker processes that keep the voice model loaded; a
+    worker that fails or times out is discarded and replaced on demand.
+    espeak-ng has no model to load and starts in milliseconds, so it still
+    runs once per sentence. At most `pool_size` synthesizer processes work at
+    once, so sentence lookahead cannot swamp the Pi's CPU while audio is playing.
+    """
+
+    name = "local"
+    remote = False
+
+    def __init__(self, backend: Optional[str] = None, voice: Optional[str] = None, piper_model: Optional[str] = None,
+                 pool_size: int = 2, timeout: float = 15.0):
+        if backend is None:
+            backend = "piper" if piper_model and shutil.which("piper") else \
+                next((b for b in ("espeak-ng", "espeak") if shutil.which(b)), None)
+        super().__init__(voice=voice or (piper_model if backend == "piper" else "en-us"), timeout=timeout)
+        self.backend = backend
+        self.piper_model = piper_model
+        self._pool = threading.BoundedSemaphore(pool_size)
+        self._idle_workers = queue.LifoQueue()  # Warm piper processes not in use
+        self._out_dir = None
+
+    def available(self) -> bool:
+        return bool(self.backend) and shutil.which(self.backend) is not None
+
+    def _run_piper(self, text: str) -> bytes:
+        try:
+            worker = self._idle_workers.get_nowait()
+        except queue.Empty:
+            if self._out_dir is None:
+                self._out_dir = tempfile.mkdtemp(prefix="beemo-piper-")
+            worker = PiperProcess(self.piper_model, self._out_dir)
+        try:
+            wav = worker.synthesize(text, self.timeout)
+        except TTSEngineError:
+            worker.close()
+            raise
+        if worker.alive():
+            self._idle_workers.put(worker)
+        return wav
+
+    def _run_espeak(self, text: str) -> bytes:
+        try:
+            result = subprocess.run([self.backend, "-v", self.voice, "--stdout", text],
+                                    capture_output=True, timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            raise TTSEngineError(f"{self.backend} timed out after {self.timeout}s")
+        if result.returncode != 0 or not result.stdout:
+            raise TTSEngineError(f"{self.backend} failed ({result.returncode}): {result.stderr.decode(errors='replace')[:200]}")
+        return result.stdout
+
+    def synthesize(self, text: str, timings: Optional[Dict] = None) -> AudioSegment:
+        started = time.time()
+        if not self.available():
+            raise TTSEngineError("No local TTS backend installed (espeak-ng or piper).")
+        with self._pool:
+            wav = self._run_piper(text) if self.backend == "piper" else self._run_espeak(text)
+        self._timed(timings, 'synthesis', started)
+        started = time.time()
+        segment = AudioSegment.from_file(io.BytesIO(wav), format='wav')
+        self._timed(timings, 'decode', started)
+        return segment
+
+    def close(self):
+        while True:
+            try:
+                self._idle_workers.get_nowait().close()
+            except queue.Empty:
+                break
+        if self._out_dir:
+            shutil.rmtree(self._out_dir, ignore_errors=True)
+
+
+class TTSEngineManager:
+    """Picks a TTS engine per sentence and fails over when one is slow or unreachable.
+
+    Engines are listed in order of preference. Each engine's latency is tracked
+    (p50/p95); a remote engine whose p95 exceeds `slow_p95_seconds` is tried
+    after faster ones, and once it has enough samples its calls are abandoned
+    after `deadline_factor` x p95. Failures put an engine in an exponentially
+    growing cooldown during which it is only used as a last resort. Every
+    `probe_every`-th call keeps the preference order so a demoted engine gets
+    fresh samples and can recover.
+
+    An abandoned remote call keeps running until the engine's own network
+    timeout ends it. Each remote engine may have at most `max_inflight` calls
+    running, abandoned ones included; a full engine is skipped rather than
+    queued behind its stalled calls, and the executor is sized so one engine
+    cannot take another's threads.
+    """
+
+    def __init__(self, engines: List[TTSEngine], slow_p95_seconds: float = 3.0, deadline_factor: float = 2.5,
+                 min_deadline: float = 2.0, base_cooldown: float = 15.0, max_cooldown: float = 300.0,
+                 probe_every: int = 20, min_samples: int = 3, max_inflight: int = 2):
+        self.engines = [e for e in engines if e.available()]
+        if not self.engines:
+            raise ValueError("No TTS engine available")
+        self.slow_p95_seconds = slow_p95_seconds
+        self.deadline_factor = deadline_factor
+        self.min_deadline = min_deadline
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.probe_every = probe_every
+        self.min_samples = min_samples  # Latency decisions need at least this many samples
+        self._calls = 0
+        self._latency = {e.name: LatencyTracker() for e in self.engines}
+        self._health = {e.name: {'failures': 0, 'consecutive_failures': 0, 'cooldown_until': 0.0, 'last_error': None}
+                        for e in self.engines}
+        self._lock = threading.Lock()
+        self.max_inflight = max_inflight
+        self._inflight = {e.name: 0 for e in self.engines}  # Remote calls running, including abandoned ones
+        # Remote calls run here so a hung request can be abandoned at its deadline
+        remote_count = sum(1 for e in self.engines if e.remote)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, remote_count * max_inflight),
+                                                               thread_name_prefix="tts-engine")
+        logger.info(f"TTS engines: {', '.join(e.name for e in self.engines)}")
+
+    def _cooling_down(self, engine: TTSEngine) -> bool:
+        return self._health[engine.name]['cooldown_until'] > time.time()
+
+    def _slow(self, engine: TTSEngine) -> bool:
+        tracker = self._latency[engine.name]
+        if not engine.remote or len(tracker) < self.min_samples:
+            return False
+        return tracker.percentile(95) > self.slow_p95_seconds
+
+    def candidates(self) -> List[TTSEngine]:
+        """Engines in the order they would be tried right now."""
+        healthy = [e for e in self.engines if not self._cooling_down(e)]
+        if self.probe_every and self._calls % self.probe_every == self.probe_every - 1:
+            return healthy + [e for e in self.engines if e not in healthy]
+        fast = [e for e in healthy if not self._slow(e)]
+        slow = [e for e in healthy if self._slow(e)]
+        cooling = [e for e in self.engines if self._cooling_down(e)]
+        return fast + slow + cooling
+
+    def _deadline(self, engine: TTSEngine) -> float:
+        tracker = self._latency[engine.name]
+        if not engine.remote or len(tracker) < self.min_samples:
+            return engine.timeout
+        return min(engine.timeout, max(self.min_deadline, tracker.percentile(95) * self.deadline_factor))
+
+    def synthesize(self, text: str, engines: Optional[List[TTSEngine]] = None,
+                   timings: Optional[Dict] = None) -> Tuple[AudioSegment, TTSEngine]:
+        """Synthesize with the first engine that succeeds. Raises TTSEngineError if all fail.
+
+        `timings` receives the successful engine's stage timings, plus
+        'failover' for time lost on engines that failed first.
+        """
+        errors = []
+        first_started = time.time()
+        self._calls += 1
+        for engine in engines or self.candidates():
+            started = time.time()
+            attempt = {}  # Per attempt: an abandoned call may still write to its dict later
+            try:
+                if engine.remote:
+                    if not self._reserve(engine):
+                        errors.append(f"{engine.name}: {self.max_inflight} earlier call(s) still running")
+                        continue  # Busy, not failed: no cooldown and no latency sample
+                    deadline = self._deadline(engine)
+                    future = self._executor.submit(engine.synthesize, text, attempt)
+                    future.add_done_callback(lambda _, name=engine.name: self._release(name))
+                    try:
+                        segment = future.result(timeout=deadline)
+                    except concurrent.futures.TimeoutError:
+                        future.cancel()
+                        raise TTSEngineError(f"no audio within {deadline:.1f}s")
+                else:
+                    segment = engine.synthesize(text, attempt)
+            except Exception as e:
+                self._record_failure(engine, e, time.time() - started)
+                errors.append(f"{engine.name}: {e}")
+                continue
+            self._record_success(engine, time.time() - started)
+            if timings is not None:
+                timings.update(attempt)
+                if errors:
+                    timings['failover'] = started - first_started
+            return segment, engine
+        raise TTSEngineError("All TTS engines failed: " + "; ".join(errors))
+
+    def _reserve(self, engine: TTSEngine) -> bool:
+        with self._lock:
+            if self._inflight[engine.name] >= self.max_inflight:
+                return False
+            self._inflight[engine.name] += 1
+            return True
+
+    def _release(self, name: str):
+        with self._lock:
+            self._inflight[name] -= 1
+
+    def _record_success(self, engine: TTSEngine, elapsed: float):
+        self._latency[engine.name].record(elapsed)
+        with self._lock:
+            self._health[engine.name]['consecutive_failures'] = 0
+            self._health[engine.name]['cooldown_until'] = 0.0
+
+    def _record_failure(self, engine: TTSEngine, error: Exception, elapsed: float):
+        # A timeout still says something about latency; record it so p95 reflects it
+        self._latency[engine.name].record(elapsed)
+        with self._lock:
+            health = self._health[engine.name]
+            health['failures'] += 1
+            health['consecutive_failures'] += 1
+            health['last_error'] = str(error)[:200]
+            cooldown = min(self.max_cooldown, self.base_cooldown * 2 ** (health['consecutive_failures'] - 1))
+            health['cooldown_until'] = time.time() + cooldown
+        logger.warning(f"TTS engine '{engine.name}' failed ({error}); cooling down for {cooldown:.0f}s.")
+
+    def get_stats(self) -> Dict:
+        now = time.time()
+        stats = {}
+        for engine in self.engines:
+            health = self._health[engine.name]
+            stats[engine.name] = {
+                **self._latency[engine.name].get_stats(),
+                'failures': health['failures'],
+                'cooldown_remaining_s': round(max(0.0, health['cooldown_until'] - now), 1),
+                'inflight': self._inflight[engine.name],
+                'last_error': health['last_error'],
+            }
+        stats['order'] = [e.name for e in self.candidates()]
+        return stats
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+        for engine in self.engines:
+            engine.close()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Voice pipeline benchmark
+Replays recorded utterances through VoiceDetectionManager (no microphone needed)
+and reports recognition latency, real-time factor, CPU per audio second and WER.
+
+All timings come from the recogniser side (VoiceDetectionManager.last_listen_timing),
+i.e. when audio was consumed, not when the file source queued it:
+  real_time_factor     Vosk decode time / audio decoded. Excludes waiting for audio
+                       and the 2 s wall-clock endpointing silence; valid at any --pace.
+                       This is the number to compare models and devices with.
+  throughput_rtf       Wall time until the recogniser consumed the end of the speech
+                       / speech duration. ~1.0 at --pace 1; at --pace 0 it shows how
+                       fast the pipeline gets through a backlog.
+  latency_seconds      End of speech consumed -> command returned. Dominated by the
+                       endpointing silence; meaningful at --pace 1.
+
+Usage:
+    python voice_benchmark.py <manifest.tsv | directory> [--model PATH] [--pace 0]
+
+A manifest is a TSV of "<audio path>\t<reference transcript>" lines. A directory
+is scanned for *.wav / *.raw files with a sibling .txt transcript.
+"""
+
+import os
+import sys
+import json
+import time
+import glob
+import argparse
+import logging
+from typing import List, Tuple
+
+from audio_sources import FileAudioSource
+from b import VoiceDetectionManager, VOSK_MODEL_PATH_DEFAULT
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def load_cases(target: str) -> List[Tuple[str, str]]:
+    """(audio path, reference transcript) pairs from a manifest or a directory."""
+    cases = []
+    if os.path.isdir(target):
+        for audio_path in sorted(glob.glob(os.path.join(target, '*.wav')) + glob.glob(os.path.join(target, '*.raw'))):
+            transcript_path = os.path.splitext(audio_path)[0] + '.txt'
+            if os.path.exists(transcript_path):
+                with open(transcript_path) as f:
+                    cases.append((audio_path, f.read().strip()))
+            else:
+                logger.warning(f"No transcript for {audio_path}, skipping.")
+    else:
+        base_dir = os.path.dirname(os.path.abspath(target))
+        with open(target) as f:
+            for line in f:
+                if not line.strip() or line.startswith('#'):
+                    continue
+                audio_path, transcript = line.rstrip('\n').split('\t', 1)
+                cases.append((os.path.join(base_dir, audio_path), transcript.strip()))
+    return cases
+
+
+def word_errors(reference: str, hypothesis: str) -> Tuple[int, int]:
+    """Word-level edit distance and reference length."""
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1,                          # deletion
+                             current[j - 1] + 1,                       # insertion
+                             previous[j - 1] + (ref_word != hyp_word))  # substitution
+        previous = current
+    return previous[-1], len(ref)
+
+
+def run_case(manager: VoiceDetectionManager, audio_path: str, reference: str, pace: float, timeout: int) -> dict:
+    source = FileAudioSource(audio_path, rate=manager.RATE, pace=pace)
+    manager.set_input_source(source)
+    if not manager.start_listening():
+        return {'file': audio_path, 'error': 'could not start listening'}
+
+    cpu_start = time.process_time()
+    hypothesis = manager.listen_for_command(timeout=timeout) or ""
+    cpu_seconds = time.process_time() - cpu_start
+    manager.stop_listening()
+
+    timing = manager.last_listen_timing
+    audio_seconds = source.duration_seconds
+    decoded_seconds = timing.get('audio_seconds', 0.0)
+    # First chunk the recogniser consumed that reached the end of the recording
+    speech_end_at = next((at for consumed, at in timing.get('consumed', []) if consumed >= audio_seconds), None)
+    errors, ref_words = word_errors(reference, hypothesis)
+    return {
+        'file': os.path.basename(audio_path),
+        'reference': reference,
+        'hypothesis': hypothesis,
+        'audio_seconds': round(audio_seconds, 2),
+        'latency_seconds': round(timing['finished_at'] - speech_end_at, 3) if speech_end_at else None,
+        'real_time_factor': round(timing['decode_seconds'] / decoded_seconds, 3) if decoded_seconds else None,
+        'throughput_rtf': round((speech_end_at - timing['started_at']) / audio_seconds, 3)
+        if speech_end_at and audio_seconds else None,
+        'cpu_per_audio_second': round(cpu_seconds / audio_seconds, 3) if audio_seconds else None,
+        'word_errors': errors,
+        'reference_words': ref_words,
+    }
+
+
+def summarize(results: List[dict]) -> dict:
+    ok = [r for r in results if 'error' not in r]
+    if not ok:
+        return {'cases': len(results), 'failed': len(results)}
+    latencies = sorted(r['latency_seconds'] for r in ok if r['latency_seconds'] is not None)
+    total_audio = sum(r['audio_seconds'] for r in ok)
+    throughput = [r['throughput_rtf'] for r in ok if r['throughput_rtf'] is not None]
+    return {
+        'cases': len(results),
+        'failed': len(results) - len(ok),
+        'wer': round(sum(r['word_errors'] for r in ok) / max(1, sum(r['reference_words'] for r in ok)), 4),
+        'latency_p50': latencies[len(latencies) // 2] if latencies else None,
+        'latency_max': latencies[-1] if latencies else None,
+        'real_time_factor_mean': round(sum((r['real_time_factor'] or 0) * r['audio_seconds'] for r in ok) / total_audio, 3)
+        if total_audio else None,
+        'throughput_rtf_max': max(throughput) if throughput else None,
+        'cpu_per_audio_second_mean': round(sum(r['cpu_per_audio_second'] * r['audio_seconds'] for r in ok) / total_audio, 3)
+        if total_audio else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Beemo voice pipeline on recorded audio.")
+    parser.add_argument('cases', help="TSV manifest or directory of recordings with .txt transcripts")
+    parser.add_argument('--model', default=VOSK_MODEL_PATH_DEFAULT, help="Vosk model directory")
+    parser.add_argument('--pace', type=float, default=1.0, help="1 = real time, N = N times faster, 0 = as fast as possible")
+    parser.add_argument('--timeout', type=int, default=60, help="Per-utterance listen timeout in seconds")
+    parser.add_argument('--output', help="Write per-case results and summary as JSON to this file")
+    args = parser.parse_args()
+
+    cases = load_cases(args.cases)
+    if not cases:
+        print("No benchmark cases found.")
+        sys.exit(1)
+
+    manager = VoiceDetectionManager(model_path=args.model,
+                                    input_source=FileAudioSource(cases[0][0], pace=args.pace))
+    results = []
+    try:
+        for audio_path, reference in cases:
+            result = run_case(manager, audio_path, reference, args.pace, args.timeout)
+            results.append(result)
+            print(json.dumps(result))
+    finally:
+        manager.cleanup()
+
+    summary = summarize(results)
+    print(json.dumps({'summary': summary}, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'results': results, 'summary': summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
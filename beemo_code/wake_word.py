@@ -0,0 +1,134 @@
+import re
+import json
+import time
+import logging
+import collections
+from typing import Dict, List, Optional
+
+import vosk
+
+from audio_capture import EnergyVAD
+
+logger = logging.getLogger(__name__)
+
+# "Beemo" spelled with words from the small English model's vocabulary; out-of-vocabulary
+# phrases ("beemo", "bimo") are silently dropped from a Vosk grammar
+DEFAULT_WAKE_PHRASES = ["be mo", "bee mo", "b mo"]
+
+
+def missing_words(model: vosk.Model, phrases: List[str]) -> Optional[List[str]]:
+    """Words of `phrases` that are not in the model's vocabulary, or None if the model cannot tell."""
+    find_word = getattr(model, 'vosk_model_find_word', None) or getattr(model, 'find_word', None)
+    if find_word is None:
+        return None
+    words = {word for phrase in phrases for word in phrase.split()}
+    return sorted(word for word in words if find_word(word) < 0)
+
+
+class WakeWordDetector:
+    """Lightweight keyword spotting for "Beemo" using a small Vosk grammar.
+
+    A grammar-restricted recognizer decodes against a handful of phrases
+    instead of the full vocabulary, and an energy gate skips it entirely on
+    silence. The full recognizer only runs in the command window opened by a
+    detection. Duty cycle and CPU per stage are tracked in `stats`.
+    """
+
+    def __init__(self, model: vosk.Model, rate: int, phrases: Optional[List[str]] = None,
+                 energy_threshold: float = 300.0, pre_roll_chunks: int = 2):
+        self.model = model
+        self.rate = rate
+        self.phrases = self._in_vocabulary(model, phrases or DEFAULT_WAKE_PHRASES)
+        self.grammar = json.dumps(self.phrases + ["[unk]"])
+        self.vad = EnergyVAD(energy_threshold, hangover_chunks=3)
+        self.recognizer = self._new_recognizer()
+        # Last few chunks, replayed into the full recognizer so "Beemo, turn on..." keeps its start
+        self.recent_chunks = collections.deque(maxlen=pre_roll_chunks)
+        alternatives = "|".join(re.escape(p) for p in self.phrases)
+        self._detect_pattern = re.compile(r"\b(?:" + alternatives + r")\b")
+        self._phrase_pattern = re.compile(r"^\s*(?:hey\s+|ok\s+|okay\s+)?(?:" + alternatives + r")\b[\s,]*")
+        self.stats = {
+            'audio_seconds': 0.0,        # All audio seen while waiting for the wake word
+            'kws_seconds': 0.0,          # Audio actually decoded by the keyword spotter
+            'kws_cpu_seconds': 0.0,
+            'command_seconds': 0.0,      # Audio decoded by the full recognizer
+            'command_cpu_seconds': 0.0,
+            'activations': 0,
+        }
+
+    @staticmethod
+    def _in_vocabulary(model: vosk.Model, phrases: List[str]) -> List[str]:
+        """Drop phrases the grammar could never produce, and say so."""
+        missing = missing_words(model, phrases)
+        if not missing:
+            return list(phrases)
+        kept = [p for p in phrases if not set(p.split()) & set(missing)]
+        logger.warning(f"Wake phrases with words missing from the Vosk model's vocabulary ({', '.join(missing)}) "
+                       f"are ignored: {[p for p in phrases if p not in kept]}")
+        if not kept:
+            logger.error("No wake phrase is in the model's vocabulary; keeping them all, but detection is unlikely.")
+            return list(phrases)
+        return kept
+
+    def _new_recognizer(self) -> vosk.KaldiRecognizer:
+        return vosk.KaldiRecognizer(self.model, self.rate, self.grammar)
+
+    def _chunk_seconds(self, data) -> float:
+        return len(data) / (2.0 * self.rate)  # int16 mono
+
+    def process(self, data) -> bool:
+        """Feed one chunk; returns True when the wake word is heard."""
+        seconds = self._chunk_seconds(data)
+        self.stats['audio_seconds'] += seconds
+        # Shared-memory views are copied: the ring slot is reused once the reader moves on
+        chunk = data if isinstance(data, bytes) else bytes(data)
+        self.recent_chunks.append(chunk)
+        if not self.vad.is_speech(chunk):
+            return False
+
+        cpu_start = time.thread_time()
+        if self.recognizer.AcceptWaveform(chunk):
+            text = json.loads(self.recognizer.Result()).get('text', '')
+        else:
+            text = json.loads(self.recognizer.PartialResult()).get('partial', '')
+        self.stats['kws_cpu_seconds'] += time.thread_time() - cpu_start
+        self.stats['kws_seconds'] += seconds
+
+        if self._detect_pattern.search(text):
+            self.stats['activations'] += 1
+            self.recognizer = self._new_recognizer()  # Reset for the next activation
+            logger.info(f"Wake word detected ('{text}').")
+            return True
+        return False
+
+    def take_pre_roll(self) -> List[bytes]:
+        """Chunks leading up to the detection, oldest first."""
+        chunks = list(self.recent_chunks)
+        self.recent_chunks.clear()
+        return chunks
+
+    def record_command_window(self, audio_seconds: float, cpu_seconds: float):
+        self.stats['command_seconds'] += audio_seconds
+        self.stats['command_cpu_seconds'] += cpu_seconds
+
+    def strip_wake_word(self, command: str) -> str:
+        """Remove a leading "Beemo" (or "hey Beemo") from a transcribed command."""
+        return self._phrase_pattern.sub("", command, count=1).strip()
+
+    def get_stats(self) -> Dict:
+        """Duty cycle and CPU figures for the wake-word and command stages."""
+        stats = self.stats
+        audio = stats['audio_seconds'] + stats['command_seconds']
+        report = {
+            'activations': stats['activations'],
+            'audio_seconds': round(audio, 1),
+            # Fraction of audio time the full recognizer was running
+            'full_recognizer_duty_cycle': round(stats['command_seconds'] / audio, 3) if audio else 0.0,
+            'kws_duty_cycle': round(stats['kws_seconds'] / audio, 3) if audio else 0.0,
+            # CPU seconds spent per second of audio in each stage
+            'kws_cpu_per_audio_second': round(stats['kws_cpu_seconds'] / stats['audio_seconds'], 4)
+            if stats['audio_seconds'] else 0.0,
+            'command_cpu_per_audio_second': round(stats['command_cpu_seconds'] / stats['command_seconds'], 4)
+            if stats['command_seconds'] else 0.0,
+        }
+        return report